@@ -11,9 +11,26 @@ from visualization.evaluation_visualizer import EvaluationVisualizer
 from metrics import WindowClassificationMeasurements, ClassificationMeasurements, \
     MultiTargetClassificationMeasurements, WindowMultiTargetClassificationMeasurements, RegressionMeasurements, \
     WindowRegressionMeasurements, MultiTargetRegressionMeasurements, \
-    WindowMultiTargetRegressionMeasurements, RunningTimeMeasurements
+    WindowMultiTargetRegressionMeasurements, RunningTimeMeasurements, SegmentedMeasurements
 import utils.constants as constants
-from utils.shared_data import SharedData as Data
+
+# Getters of the ranking metrics, also computed at the cutoffs of the evaluator, and their names in the summary
+_RANKING_GETTERS = {constants.HIT_RATE: 'get_hit_rate',
+                    constants.RECALL: 'get_recall',
+                    constants.PRECISION: 'get_precision',
+                    constants.F1_SCORE: 'get_f1_score',
+                    constants.MRR: 'get_mrr',
+                    constants.NDCG: 'get_ndcg'}
+_RANKING_NAMES = {constants.HIT_RATE: 'HitRate',
+                  constants.RECALL: 'Recall',
+                  constants.PRECISION: 'Precision',
+                  constants.F1_SCORE: 'F1',
+                  constants.MRR: 'Mrr',
+                  constants.NDCG: 'NDCG'}
+_SEGMENT_NAMES = {constants.SEGMENT_POSITION: 'Position',
+                  constants.SEGMENT_SESSION_LENGTH: 'Session length',
+                  constants.SEGMENT_EVENT_TYPE: 'Event type',
+                  constants.SEGMENT_POPULARITY: 'Popularity decile'}
 
 
 class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
@@ -43,6 +60,11 @@ class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
         self.output_file = None
         self.show_plot = False
         self.restart_stream = True
+        self.rec_size = 10
+        self.cutoffs = []
+        self.eval_sample_rate = 1.0
+        self.rank_sample_size = 0
+        self.segments = []
         self.test_size = 0
         self.dynamic_test_set = False
         self.data_points_for_classification = False
@@ -50,10 +72,13 @@ class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
         # Metrics
         self.mean_eval_measurements = None
         self.current_eval_measurements = None
+        self.segmented_measurements = None
+        self._session_counter = None  # Number of events of each session, for the session_length segments
         self._data_dict = None
         self._data_buffer = None
         self._file_buffer = ''
         self._file_buffer_size = 0
+        self._snapshots = None  # Updates of the data buffer, recorded when set to a list
 
         # Misc
         self._method = None
@@ -68,6 +93,7 @@ class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
         self._end_time = -1
 
         self.visualizer = None
+        self.context = None  # Shared data of the evaluation, passed to the models
         self.n_sliding = 0
         self.global_sample_count = 0
 
@@ -135,7 +161,7 @@ class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
         """
         raise NotImplementedError
 
-    def _init_evaluation(self, stream, model, model_names=None):
+    def _init_evaluation(self, stream, model, model_names=None, configure=True):
 
         self.model = model if isinstance(model, list) else [model]
         if isinstance(stream, Stream):
@@ -148,14 +174,14 @@ class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
             for m in model:
                 if not hasattr(m, 'predict'):
                     raise NotImplementedError('{} does not have a predict() method.'.format(m))
-                if hasattr(m, 'configure'):
-                    m.configure()
+                if configure and hasattr(m, 'configure'):
+                    m.configure(context=self.context)
         else:
             self.n_models = 1
             if not hasattr(model, 'predict'):
                 raise NotImplementedError('{} does not have a predict() method.'.format(model))
-            if hasattr(model, 'configure'):
-                model.configure()
+            if configure and hasattr(model, 'configure'):
+                model.configure(context=self.context)
 
         if model_names is None:
             self.model_names = ['M{}'.format(i) for i in range(self.n_models)]
@@ -249,12 +275,20 @@ class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
         """
         self.mean_eval_measurements = []
         self.current_eval_measurements = []
+        self.segmented_measurements = []
 
         if self._task_type == constants.CLASSIFICATION:
             for i in range(self.n_models):
-                self.mean_eval_measurements.append(ClassificationMeasurements(targets=Data.classes))
+                self.mean_eval_measurements.append(ClassificationMeasurements(targets=self.context.classes,
+                                                                              reservoir_size=self.rank_sample_size,
+                                                                              rec_size=self.rec_size,
+                                                                              cutoffs=self.cutoffs))
                 self.current_eval_measurements.append(
-                    WindowClassificationMeasurements(targets=Data.classes, window_size=self.n_sliding))
+                    WindowClassificationMeasurements(targets=self.context.classes, window_size=self.n_sliding,
+                                                     rec_size=self.rec_size, cutoffs=self.cutoffs))
+                if self.segments:
+                    self.segmented_measurements.append(SegmentedMeasurements(segments=self.segments,
+                                                                             rec_size=self.rec_size))
 
         elif self._task_type == constants.MULTI_TARGET_CLASSIFICATION:
             for i in range(self.n_models):
@@ -291,6 +325,8 @@ class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
             elif metric == constants.MODEL_SIZE:
                 data_ids = ['model_size']
             self._data_dict[metric] = data_ids
+        for metric_id, _, _ in self._get_cutoff_metrics():
+            self._data_dict[metric_id] = [constants.MEAN, constants.CURRENT]
 
         self._data_buffer = EvaluationDataBuffer(data_dict=self._data_dict)
 
@@ -396,6 +432,16 @@ class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
                     values[0].append(self.mean_eval_measurements[i].get_mrr())
                     values[1].append(self.current_eval_measurements[i].get_mrr())
 
+            elif metric == constants.HIT_RATE:
+                for i in range(self.n_models):
+                    values[0].append(self.mean_eval_measurements[i].get_hit_rate())
+                    values[1].append(self.current_eval_measurements[i].get_hit_rate())
+
+            elif metric == constants.NDCG:
+                for i in range(self.n_models):
+                    values[0].append(self.mean_eval_measurements[i].get_ndcg())
+                    values[1].append(self.current_eval_measurements[i].get_ndcg())
+
             elif metric == constants.GMEAN:
                 for i in range(self.n_models):
                     values[0].append(self.mean_eval_measurements[i].get_g_mean())
@@ -474,6 +520,22 @@ class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
                 self._data_buffer.update_data(sample_id=sample_id, metric_id=metric, data_id=constants.CURRENT,
                                               value=values[1])
 
+        # Ranking metrics at the other cutoffs, from the same results
+        for metric_id, metric, cutoff in self._get_cutoff_metrics():
+            getter = _RANKING_GETTERS[metric]
+            self._data_buffer.update_data(sample_id=sample_id, metric_id=metric_id, data_id=constants.MEAN,
+                                          value=[getattr(self.mean_eval_measurements[i], getter)(cutoff)
+                                                 for i in range(self.n_models)])
+            self._data_buffer.update_data(sample_id=sample_id, metric_id=metric_id, data_id=constants.CURRENT,
+                                          value=[getattr(self.current_eval_measurements[i], getter)(cutoff)
+                                                 for i in range(self.n_models)])
+
+        if self._snapshots is not None:
+            self._snapshots.append((sample_id, {(metric, data_id): self._data_buffer.get_data(metric_id=metric,
+                                                                                             data_id=data_id)
+                                                for metric, data_ids in self._data_dict.items()
+                                                for data_id in data_ids}))
+
         shift = 0
         if self._method == 'prequential':
             shift = -self.batch_size  # Adjust index due to training after testing
@@ -498,7 +560,7 @@ class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
                 f.write("\n# {}".format(" ".join([line.strip() for line in self.get_info().splitlines()])))
                 f.write("\n# TEST CONFIGURATION END")
                 header = '\nid'
-                for metric in self.metrics:
+                for metric in self._get_metric_ids():
                     if metric == constants.ACCURACY:
                         for i in range(self.n_models):
                             header += ',mean_acc_[{0}],current_acc_[{0}]'.format(self.model_names[i])
@@ -537,7 +599,7 @@ class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
         if self.output_file is not None:
             # Note: Must follow order set in _init_file()
             line = str(self._data_buffer.sample_id)
-            for metric in self.metrics:
+            for metric in self._get_metric_ids():
                 if metric == constants.TRUE_VS_PREDICTED:
                     true_value = self._data_buffer.get_data(metric_id=metric, data_id=constants.Y_TRUE)
                     pred_values = self._data_buffer.get_data(metric_id=metric, data_id=constants.Y_PRED)
@@ -580,6 +642,17 @@ class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
             self._file_buffer = ''
             self._file_buffer_size = 0
 
+    def _write_segments(self):
+        """ Appends the results of the models by segment (see segments) to the output file, as comment lines. """
+        if self.output_file is not None and self.segmented_measurements:
+            with open(self.output_file, 'a') as f:
+                f.write("\n# SEGMENTS BEGIN")
+                for i in range(self.n_models):
+                    for segment, label, n_events, recall, mrr in self._get_segment_results(i):
+                        f.write("\n# [{}] {}={} events={} recall@{k}={:.6f} mrr@{k}={:.6f}".format(
+                            self.model_names[i], segment, label, n_events, recall, mrr, k=self.rec_size))
+                f.write("\n# SEGMENTS END")
+
     def _init_plot(self):
         """ Initialize plot to display the evaluation results.
 
@@ -591,7 +664,8 @@ class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
                                                    metrics=self.metrics,
                                                    n_models=self.n_models,
                                                    model_names=self.model_names,
-                                                   data_dict=self._data_dict)
+                                                   data_dict=self._data_dict,
+                                                   rec_size=self.rec_size)
 
     def _reset_globals(self):
         self.global_sample_count = 0
@@ -600,6 +674,8 @@ class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
         if self._end_time - self._start_time > self.max_time:
             print('\nTime limit reached ({:.2f}s). Evaluation stopped.'.format(self.max_time))
         print('Processed samples: {}'.format(self.global_sample_count))
+        if self.eval_sample_rate < 1:
+            print('Evaluated sessions: {:.1%} sample (with 95% confidence intervals)'.format(self.eval_sample_rate))
         print('Mean performance:')
         for i in range(self.n_models):
             if constants.ACCURACY in self.metrics:
@@ -609,23 +685,41 @@ class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
             if constants.PRECISION in self.metrics:
                 print('{} - Precision@{}    : {:.4f}'.format(
                     self.model_names[i],
-                    Data.rec_size,
+                    self.rec_size,
                     self._data_buffer.get_data(metric_id=constants.PRECISION, data_id=constants.MEAN)[i]))
             if constants.RECALL in self.metrics:
-                print('{} - Recall@{}    : {:.4f}'.format(
+                print('{} - Recall@{}    : {:.4f}{}'.format(
                     self.model_names[i],
-                    Data.rec_size,
-                    self._data_buffer.get_data(metric_id=constants.RECALL, data_id=constants.MEAN)[i]))
+                    self.rec_size,
+                    self._data_buffer.get_data(metric_id=constants.RECALL, data_id=constants.MEAN)[i],
+                    self._format_margin(self.mean_eval_measurements[i].get_recall_margin())))
             if constants.F1_SCORE in self.metrics:
                 print('{} - F1@{}    : {:.4f}'.format(
                     self.model_names[i],
-                    Data.rec_size,
+                    self.rec_size,
                     self._data_buffer.get_data(metric_id=constants.F1_SCORE, data_id=constants.MEAN)[i]))
             if constants.MRR in self.metrics:
-                print('{} - Mrr@{}    : {:.4f}'.format(
+                print('{} - Mrr@{}    : {:.4f}{}'.format(
+                    self.model_names[i],
+                    self.rec_size,
+                    self._data_buffer.get_data(metric_id=constants.MRR, data_id=constants.MEAN)[i],
+                    self._format_margin(self.mean_eval_measurements[i].get_mrr_margin())))
+            if constants.HIT_RATE in self.metrics:
+                print('{} - HitRate@{}    : {:.4f}'.format(
                     self.model_names[i],
-                    Data.rec_size,
-                    self._data_buffer.get_data(metric_id=constants.MRR, data_id=constants.MEAN)[i]))
+                    self.rec_size,
+                    self._data_buffer.get_data(metric_id=constants.HIT_RATE, data_id=constants.MEAN)[i]))
+            if constants.NDCG in self.metrics:
+                print('{} - NDCG@{}    : {:.4f}'.format(
+                    self.model_names[i],
+                    self.rec_size,
+                    self._data_buffer.get_data(metric_id=constants.NDCG, data_id=constants.MEAN)[i]))
+            for metric_id, metric, cutoff in self._get_cutoff_metrics():
+                print('{} - {}@{}    : {:.4f}'.format(
+                    self.model_names[i],
+                    _RANKING_NAMES[metric],
+                    cutoff,
+                    self._data_buffer.get_data(metric_id=metric_id, data_id=constants.MEAN)[i]))
             if constants.KAPPA in self.metrics:
                 print('{} - Kappa        : {:.4f}'.format(
                     self.model_names[i],
@@ -689,6 +783,30 @@ class StreamEvaluator(BaseSKMObject, metaclass=ABCMeta):
                 print('{} - Size (kB)          : {:.4f}'.format(
                     self.model_names[i], self._data_buffer.get_data(metric_id=constants.MODEL_SIZE,
                                                                     data_id='model_size')[i]))
+        if self.segmented_measurements:
+            print('Performance by segment (Recall@{0} / Mrr@{0}):'.format(self.rec_size))
+            for i in range(self.n_models):
+                for segment, label, n_events, recall, mrr in self._get_segment_results(i):
+                    print('{} - {} {}    : {:.4f} / {:.4f} ({} events)'.format(
+                        self.model_names[i], _SEGMENT_NAMES[segment], label, recall, mrr, n_events))
+
+    def _get_cutoff_metrics(self):
+        """ Returns the (metric id, metric, cutoff) of the ranking metrics computed at the cutoffs of the evaluator. """
+        return [('{}@{}'.format(metric, cutoff), metric, cutoff)
+                for metric in self.metrics if metric in constants.RANKING_METRICS
+                for cutoff in self.cutoffs]
+
+    def _get_segment_results(self, model_idx):
+        """ Returns the (segment, label, number of events, recall, MRR) of the non-empty segments of a model. """
+        return self.segmented_measurements[model_idx].get_results(session_lengths=self._session_counter)
+
+    def _get_metric_ids(self):
+        """ Returns the ids of the metrics in the evaluation data buffer, in the order of the output file. """
+        return self.metrics + [metric_id for metric_id, _, _ in self._get_cutoff_metrics()]
+
+    def _format_margin(self, margin):
+        """ Formats the 95% margin of error of a mean metric, shown when only a sample of sessions is evaluated. """
+        return ' (+/- {:.4f})'.format(margin) if self.eval_sample_rate < 1 else ''
 
     def get_measurements(self, model_idx=None):
         """ Get measurements from the evaluation.
@@ -1,13 +1,18 @@
 import os
+import copy
+import random
 import warnings
 import re
+import zlib
 from timeit import default_timer as timer
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 import numpy as np
 from evaluation.base_evaluator import StreamEvaluator
 from utils import constants
-from utils.data_structures import InstanceWindow
-from utils.shared_data import SharedData as Data
+from utils.data_structures import RingInstanceWindow, SessionStore, ItemDictionary
+from utils.shared_data import EvaluationContext
 
 
 class EvaluatePrequential(StreamEvaluator):
@@ -37,9 +42,21 @@ class EvaluatePrequential(StreamEvaluator):
 
     n_skip: int (Default: 0)
         The number of samples to skip before the evaluation.
+        Streams that implement seek() skip them without reading them.
+
+    start_time: float or str (Default: None)
+        If set, the evaluation starts at the first event at or after this timestamp (epoch value, or ISO-8601
+        string), before skipping n_skip samples. Requires time_column_index and a stream that implements
+        seek_time(), such as MemmapStream or SessionFileStream, and timestamps in ascending order.
 
     n_keep: int (Default: 1000)
         The number of samples to keep in the observation history window.
+        If None, the window is only bounded by keep_duration.
+
+    keep_duration: float (Default: None)
+        If set, the events older than this duration (in the units of the time column, relative to the
+        last event) are evicted from the observation history window, all at once. Requires time_column_index
+        and timestamps in ascending order. With n_keep=None, the size of the window follows the traffic.
 
     allow_repeated: boolean (Default: True)
         Whether to allow repeated recommendations (in the same session)
@@ -65,9 +82,44 @@ class EvaluatePrequential(StreamEvaluator):
     rec_size: list (Default=10)
         The size of the recommendation list.
 
+    cutoffs: list (Default=None)
+        Other recommendation list sizes at which the ranking metrics ('hitrate', 'recall', 'precision', 'F1',
+        'mrr' and 'ndcg') are also computed, in the same run: the models are asked for the longest list once,
+        and the metrics at each cutoff are computed from the rank of the true item in that list. They are
+        written to the output file as e.g. mean_recall@20_[model]. Only the first rec_size items of each list
+        are tracked as recommended (see allow_repeated), so that the metrics at rec_size are those of a run
+        without cutoffs. With allow_repeated=False, the metrics at the other cutoffs thus differ from those of
+        separate runs with rec_size set to each cutoff, which would track lists of that size. Note that
+        BeerEnsemble learns from the longest list.
+
+    eval_sample_rate: float (Default=1.0)
+        The fraction of sessions on which the models are evaluated (all of the events are still used for
+        training). Sessions are selected by a stable hash of their identifiers, so the same sessions are
+        evaluated in every run. When less than 1, recall and MRR are reported with 95% confidence intervals.
+
+    rank_sample_size: int (Default=0)
+        The number of reciprocal ranks kept per model in a uniform random sample of the results, e.g. to plot
+        their distribution (see ClassificationMeasurements.get_rrank_sample()). Memory does not depend on the
+        number of samples processed.
+
+    segments: list (Default=None)
+        | Kinds of segments of the evaluated events by which recall and MRR are also reported, in the summary and
+        | at the end of the output file (see metrics.SegmentedMeasurements):
+        | 'position': position of the event in its session (1, 2, 3, 4, 5, 6-10, 11-20, 21+),
+        | 'session_length': length of the session of the event, in the same buckets,
+        | 'event_type': event type (requires event_column_index),
+        | 'popularity': popularity decile of the true item (1 for the 10% most popular items).
+
+    open_catalog: bool (Default=False)
+        If True, items are indexed the first time they are seen in the stream, and the models grow with the
+        catalog. Otherwise, the catalog is built from all the target values of the stream before the evaluation.
+
     batch_size: int (Default: 1)
         The number of samples to pass at a time to the model(s).
-        Currently not used.
+        Each batch is split into micro-batches of events from distinct sessions, so that the events of a session
+        are still processed in order. All the events of a micro-batch are tested before any of them is used for
+        training. Models that declare `supports_batch = True` get the whole micro-batch at once (the session
+        vectors of its rows are in `context.session_vectors`), the others get one event at a time.
 
     pretrain_size: int (Default: 200)
         The number of samples to use to train the model before starting the evaluation.
@@ -76,12 +128,20 @@ class EvaluatePrequential(StreamEvaluator):
     max_time: float (Default: float("inf"))
         The maximum duration of the simulation (in seconds).
 
+    n_jobs: int (Default: 1)
+        The number of worker processes among which the models are split. Each worker evaluates its group of models
+        over the whole stream, with its own shared data and observation window, and the results are merged back
+        into a single summary, output file and plot. -1 means using all processors. Models that share components
+        (e.g. a BeerEnsemble and its standalone components) are kept in the same group.
+
     metrics: list, optional (Default: ['recall', 'mrr'])
         | The list of metrics to track during the evaluation. Also defines the metrics that will be displayed in plots
           and/or logged into the output file. Valid options are
         | 'precision'
         | 'recall'
         | 'mrr'
+        | 'hitrate'
+        | 'ndcg'
         | 'F1'
         | 'running_time'
 
@@ -105,15 +165,23 @@ class EvaluatePrequential(StreamEvaluator):
                  event_column_index=None,
                  rec_triggers=None,
                  rec_size=10,
+                 cutoffs=None,
+                 eval_sample_rate=1.0,
+                 rank_sample_size=0,
+                 segments=None,
+                 open_catalog=False,
                  allow_repeated=False,
                  allow_reminders=False,
                  n_wait=200,
                  n_keep=1000,
+                 keep_duration=None,
                  n_skip=0,
+                 start_time=None,
                  max_samples=100000,
                  batch_size=1,
                  pretrain_size=0,
                  max_time=float("inf"),
+                 n_jobs=1,
                  metrics=['recall', 'mrr'],
                  output_file=None,
                  show_plot=False,
@@ -123,23 +191,42 @@ class EvaluatePrequential(StreamEvaluator):
         super().__init__()
         self._method = 'prequential'
         self.rec_size = rec_size  # D
+        self.cutoffs = [] if cutoffs is None else sorted(set(cutoffs))
+        self.eval_sample_rate = eval_sample_rate
+        self.rank_sample_size = rank_sample_size
+        self.segments = [] if segments is None else list(segments)
+        self.open_catalog = open_catalog
         self.allow_repeated = allow_repeated
         self.allow_reminders = allow_reminders
         self.rec_triggers = rec_triggers
         self.n_wait = n_wait
         self.n_keep = n_keep
+        self.keep_duration = keep_duration
         self.n_skip = n_skip
+        self.start_time = start_time
         self.max_samples = max_samples
         self.pretrain_size = pretrain_size
         self.batch_size = batch_size
         self.max_time = max_time
+        self.n_jobs = n_jobs
         self.output_file = output_file
         self.show_plot = show_plot
         self.data_points_for_classification = data_points_for_classification
         self.sid = session_column_index
         self.tid = time_column_index
         self.eid = event_column_index
-        self.observation_window = InstanceWindow(max_size=self.n_keep)
+        if self.keep_duration is not None and self.tid is None:
+            raise ValueError('keep_duration requires time_column_index.')
+        for segment in self.segments:
+            if segment not in constants.SEGMENTS:
+                raise ValueError('Unknown segment {} (expected one of {}).'.format(segment, constants.SEGMENTS))
+        if constants.SEGMENT_EVENT_TYPE in self.segments and self.eid is None:
+            raise ValueError('The event_type segments require event_column_index.')
+        self.observation_window = None  # Created for each evaluation, see _init_window()
+        self.session_store = None
+        self._session_counter = Counter()
+        self._evaluation_count = 0
+        self._encode_targets = True
 
         if metrics is None and data_points_for_classification is False:
             self.metrics = [constants.ACCURACY]
@@ -177,16 +264,36 @@ class EvaluatePrequential(StreamEvaluator):
 
         """
 
-        # Populate shared data
-        Data.sid = self.sid
-        Data.tid = self.tid
-        Data.eid = self.eid
-        Data.window = self.observation_window
-        Data.classes = np.unique(stream.target_values)
-        Data.class_ids = list(range(len(Data.classes)))
-        Data.allow_reminders = self.allow_reminders
-        Data.allow_repeated = self.allow_repeated
-        Data.rec_size = self.rec_size
+        if self.start_time is not None and (self.tid is None or not hasattr(stream, 'seek_time')):
+            raise ValueError('start_time requires time_column_index and a stream that implements seek_time().')
+        if not self.open_catalog and getattr(stream, 'item_dictionary', None) is None and stream.target_values is None:
+            raise ValueError('{} does not provide its target values, use open_catalog=True.'.format(stream.name))
+        if self.n_jobs != 1 and not stream.is_restartable():
+            raise ValueError('{} cannot be restarted, and thus not read by several workers.'.format(stream.name))
+
+        self._init_window()
+
+        # Populate shared data (passed to the models, and accessible through SharedData in this thread)
+        self.context = EvaluationContext(sid=self.sid,
+                                         tid=self.tid,
+                                         eid=self.eid,
+                                         allow_reminders=self.allow_reminders,
+                                         allow_repeated=self.allow_repeated,
+                                         rec_size=max([self.rec_size] + self.cutoffs),
+                                         display_size=self.rec_size,
+                                         window=self.observation_window).activate()
+        self._encode_targets = getattr(stream, 'item_dictionary', None) is None
+        if not self._encode_targets:  # The stream provides its item dictionary and already encoded targets
+            self.context.items = stream.item_dictionary
+            self.context.classes = self.context.items.items
+        elif self.open_catalog:
+            self.context.items = ItemDictionary(allow_new=True)
+        else:
+            self.context.items = ItemDictionary(stream.target_values)
+            self.context.classes = self.context.items.items
+
+        if self.n_jobs != 1 and isinstance(model, list) and len(model) > 1:
+            return self._evaluate_parallel(stream=stream, model=model, model_names=model_names)
 
         self._init_evaluation(model=model, stream=stream, model_names=model_names)
 
@@ -232,8 +339,14 @@ class EvaluatePrequential(StreamEvaluator):
         else:
             test_cols = [self.sid, self.tid]
 
+        if self.start_time is not None:
+            self.stream.seek_time(self.start_time, self.tid)
+
         if self.n_skip > 0:
-            self.stream.next_sample(self.n_skip)
+            if hasattr(self.stream, 'seek'):
+                self.stream.seek(self.stream.sample_idx + self.n_skip)
+            else:
+                self.stream.next_sample(self.n_skip)
 
         actual_max_samples = self.stream.n_remaining_samples()
         if actual_max_samples == -1 or actual_max_samples > self.max_samples:
@@ -243,6 +356,7 @@ class EvaluatePrequential(StreamEvaluator):
             print('Pre-training on {} sample(s).'.format(self.pretrain_size))
 
             X, y = self.stream.next_sample(self.pretrain_size)
+            y = self._encode(y)
             session_counter.update(X[:, self.sid])
 
             # Pre-training
@@ -253,6 +367,7 @@ class EvaluatePrequential(StreamEvaluator):
                     self.running_time_measurements[i].compute_training_time_end()
                     self.running_time_measurements[i].update_time_measurements(self.pretrain_size)
                 self.observation_window.add_element(X[j:j + 1], y[j:j + 1])
+                self.session_store.append(X[j, self.sid], y[j])
             self.global_sample_count += self.pretrain_size
 
         update_count = 0
@@ -264,64 +379,26 @@ class EvaluatePrequential(StreamEvaluator):
                (self._end_time - self._start_time < self.max_time) &
                (self.stream.has_more_samples())):
             try:
-                X, y = self.stream.next_sample(self.batch_size)  # Batches are currently not supported
-                prediction = [None] * self.n_models
-                try:  # In case of no pre-training, the observation window is empty
-                    window_sessions = Data.window.get_attributes_matrix()[:, self.sid]
-                except IndexError:
-                    window_sessions = np.array([])
-                if self.eid is not None:
-                    event_type = X[0, [self.eid]][0]
-                session = X[0, [self.sid]][0]
-                session_counter[session] += 1
-                Data.session_vector = self._get_indexed_session_vector(session)
-                inputs_exist = X is not None and y is not None
-                is_rec_trigger = (self.rec_triggers is None or
-                                  self.eid is None or
-                                  event_type in self.rec_triggers)
-                is_known_session = session in window_sessions
-                if inputs_exist and is_rec_trigger and is_known_session:
-                    # Evaluate only on known sessions and on events that are recommendation triggers
-                    evaluation_count += 1
-                    for i in range(self.n_models):
-                        try:
-                            self.running_time_measurements[i].compute_testing_time_begin()
-                            X_test = np.full(X.shape, None)
-                            X_test[:, test_cols] = X[:, test_cols]  # Set all but test columns to None
-
-                            # Generate and index recommendations
-                            prediction[i] = self.model[i].predict(X_test)[0]
-                            if len(prediction[i]) == 0:
-                                pred_ids = np.array([-1])
-                            else:
-                                pred_ids = np.searchsorted(Data.classes, prediction[i])[:self.rec_size]
-
-                            # Get index of true label
-                            y_idx = np.searchsorted(Data.classes, y[0])
-                            # Calculate metrics
-                            self.mean_eval_measurements[i].add_result(y_idx, pred_ids)
-                            self.current_eval_measurements[i].add_result(y_idx, pred_ids)
-                            self.running_time_measurements[i].compute_testing_time_end()
-                        except TypeError:
-                            raise TypeError("Unexpected prediction value from {}"
-                                            .format(type(self.model[i]).__name__))
-
-                if y is not None:
-                    # Train
-                    for i in range(self.n_models):
-                        self.running_time_measurements[i].compute_training_time_begin()
-                        self.model[i].partial_fit(X, y)
-                        self.running_time_measurements[i].compute_training_time_end()
-                        self.running_time_measurements[i].update_time_measurements(self.batch_size)
-
-                self.global_sample_count += self.batch_size
+                batch_size = min(self.batch_size, actual_max_samples - self.global_sample_count)
+                X, y = self.stream.next_sample(batch_size)
+                if X is None or y is None:
+                    break
+                y = self._encode(y)  # Items are indexed once, models only see indices
+                last_evaluation_count = evaluation_count
+
+                # Events of the same session are processed in order, in consecutive micro-batches
+                for start, stop in self._split_batch(X[:, self.sid]):
+                    evaluation_count += self._test_then_train(X[start:stop], y[start:stop],
+                                                              test_cols, session_counter)
+
+                self.global_sample_count += len(y)
                 self._check_progress(actual_max_samples)
-                self.observation_window.add_element(X, y)  # Add event to the sliding window
 
                 if ((self.global_sample_count % self.n_wait) == 0 or
                         (self.global_sample_count >= self.max_samples) or
                         (self.global_sample_count / self.n_wait > update_count + 1) or
-                        (evaluation_count == 1)):
+                        (evaluation_count == 1) or
+                        (last_evaluation_count < 1 <= evaluation_count)):
                     self._update_metrics()
                     update_count += 1
 
@@ -332,8 +409,17 @@ class EvaluatePrequential(StreamEvaluator):
                     self._update_metrics()
                 break
 
+        self._session_counter = session_counter
+        self._evaluation_count = evaluation_count
+        self._finish_evaluation()
+
+        return self.model
+
+    def _finish_evaluation(self):
+        """ Flushes the outputs and prints the evaluation summary. """
         # Flush file buffer, in case it contains data
         self._flush_file_buffer()
+        self._write_segments()
 
         self.evaluation_summary()
 
@@ -343,17 +429,233 @@ class EvaluatePrequential(StreamEvaluator):
             pass
 
         print('training time window: {}'.format(self.n_keep))
-        print('number of sessions: {}'.format(len(session_counter)))
-        print('number of evaluations: {}'.format(evaluation_count))
-        print('avg. session size: {0:.2f}'.format(np.mean(list(session_counter.values()))))
+        if self.keep_duration is not None:
+            print('training time window duration: {}'.format(self.keep_duration))
+        print('number of sessions: {}'.format(len(self._session_counter)))
+        print('number of evaluations: {}'.format(self._evaluation_count))
+        print('avg. session size: {0:.2f}'.format(np.mean(list(self._session_counter.values()))))
         # evaluated_sessions_sizes = [c for c in session_counter.values() if c != 1]
         # print('average session size: {0:.2f}'.format(np.mean(evaluated_sessions_sizes)))
-        
-        if self.restart_stream:
+
+        if self.restart_stream and self.stream.is_restartable():
             self.stream.restart()
 
+    def _evaluate_parallel(self, stream, model, model_names=None):
+        """ Evaluates groups of models in worker processes and merges their results.
+
+        Each worker runs a copy of this evaluator on its group of models, and records every update of its
+        evaluation data buffer. Since all workers process the same samples, the updates happen at the same
+        sample ids: they are merged (per-model values in the original model order) and replayed into the data
+        buffer, output file and plot of this evaluator.
+
+        """
+        self._init_evaluation(model=model, stream=stream, model_names=model_names, configure=False)
+        if not self._check_configuration():
+            return None
+        self._reset_globals()
+        self._init_metrics()
+        self._init_plot()
+        self._init_file()
+
+        groups = self._get_model_groups()
+        worker = copy.copy(self)  # Sent to the workers, without the models and the plot
+        worker.model = None
+        worker.visualizer = None
+        worker.context = None
+        print('Prequential Evaluation ({} workers)'.format(len(groups)))
+        self._start_time = timer()
+        with ProcessPoolExecutor(max_workers=len(groups)) as executor:
+            # The workers start from the random state of this process, so that the results are reproducible
+            random_state = (random.getstate(), np.random.get_state())
+            futures = [executor.submit(_evaluate_group, worker, stream,
+                                       [self.model[i] for i in group], [self.model_names[i] for i in group],
+                                       random_state)
+                       for group in groups]
+            results = [future.result() for future in futures]
+        self._end_time = timer()
+
+        # Per-model results, from the order of the groups back to the order of the models
+        order = np.argsort([i for group in groups for i in group])
+        for attribute in ['model', 'mean_eval_measurements', 'current_eval_measurements',
+                          'running_time_measurements'] + (['segmented_measurements'] if self.segments else []):
+            merged = [value for result in results for value in result[attribute]]
+            setattr(self, attribute, [merged[i] for i in order])
+        first = groups.index(next(group for group in groups if 0 in group))
+
+        updates = [dict(result['snapshots']) for result in results]
+        for sample_id, _ in results[first]['snapshots']:
+            if all(sample_id in update for update in updates):
+                for metric, data_id in updates[first][sample_id]:
+                    values = [update[sample_id][(metric, data_id)] for update in updates]
+                    if all(isinstance(value, list) for value in values):
+                        merged = [value for group_values in values for value in group_values]
+                        value = [merged[i] for i in order]
+                    else:  # Not per-model (e.g. true values), take it from the group of the first model
+                        value = values[first]
+                    self._data_buffer.update_data(sample_id=sample_id, metric_id=metric,
+                                                  data_id=data_id, value=value)
+                self._update_outputs(sample_id)
+
+        self.global_sample_count = results[first]['global_sample_count']
+        self._session_counter = results[first]['session_counter']
+        self._evaluation_count = results[first]['evaluation_count']
+        self._finish_evaluation()
+
+        if self.show_plot:
+            self.visualizer.hold()
+
         return self.model
 
+    def _get_model_groups(self):
+        """ Splits the models into groups of similar size, one per worker. """
+        clusters = []  # Models that share components must stay together
+        for i in range(self.n_models):
+            linked = [cluster for cluster in clusters
+                      if any(self._share_components(self.model[i], self.model[j]) for j in cluster)]
+            clusters = [cluster for cluster in clusters if cluster not in linked]
+            clusters.append(sorted([i] + [j for cluster in linked for j in cluster]))
+
+        n_jobs = self.n_jobs if self.n_jobs > 0 else max(1, os.cpu_count() + 1 + self.n_jobs)
+        groups = [[] for _ in range(min(n_jobs, len(clusters)))]
+        for cluster in sorted(clusters, key=len, reverse=True):
+            min(groups, key=len).extend(cluster)
+        return sorted(sorted(group) for group in groups)
+
+    @staticmethod
+    def _share_components(model_1, model_2):
+        components_1 = getattr(model_1, 'cf_components', [])
+        components_2 = getattr(model_2, 'cf_components', [])
+        return (any(c is model_2 for c in components_1) or any(c is model_1 for c in components_2) or
+                any(c_1 is c_2 for c_1 in components_1 for c_2 in components_2))
+
+    def _encode(self, y):
+        """ Maps the targets read from the stream to item indices (unless the stream already did it). """
+        return self.context.items.encode(y) if self._encode_targets else y
+
+    def _test_then_train(self, X, y, test_cols, session_counter):
+        """ Tests and then trains the models on a micro-batch of events from distinct sessions.
+
+        Parameters
+        ----------
+        X: numpy.ndarray of shape (n_samples, n_features)
+            The events, at most one per session.
+
+        y: numpy.ndarray of shape (n_samples,)
+            The indices of the items of the events.
+
+        test_cols: list
+            The columns of X that are visible to the models at test time.
+
+        session_counter: Counter
+            Counts the events of each session.
+
+        Returns
+        -------
+        int
+            The number of evaluated events.
+
+        """
+        sessions = X[:, self.sid]
+        session_counter.update(sessions)
+        session_vectors = [self.session_store.get_vector(session) for session in sessions]
+
+        # Evaluate only on known (and sampled) sessions and on events that are recommendation triggers
+        is_known_session = np.fromiter((session in self.session_store for session in sessions),
+                                       dtype=bool, count=len(sessions))
+        if self.rec_triggers is None or self.eid is None:
+            is_rec_trigger = True
+        else:
+            is_rec_trigger = np.isin(X[:, self.eid], self.rec_triggers)
+        if self.eval_sample_rate < 1:
+            is_known_session &= _session_fraction(sessions) < self.eval_sample_rate
+        test_rows = np.flatnonzero(is_known_session & is_rec_trigger)
+
+        if len(test_rows) > 0:
+            X_test = np.full((len(test_rows), X.shape[1]), None)
+            X_test[:, test_cols] = X[np.ix_(test_rows, test_cols)]  # Set all but test columns to None
+            test_vectors = [session_vectors[row] for row in test_rows]
+            y_test = np.asarray(y[test_rows])
+            if self.segments:
+                test_sessions = sessions[test_rows].tolist()
+                positions = np.array([session_counter[session] for session in test_sessions])  # Counted above
+                event_types = None if self.eid is None else X[test_rows, self.eid]
+            for i in range(self.n_models):
+                try:
+                    self.running_time_measurements[i].compute_testing_time_begin()
+                    # Generate recommendations (item indices)
+                    predictions = self._predict_batch(self.model[i], X_test, test_vectors)
+                    pred_ids = _pad_predictions(predictions, self.context.rec_size)
+                    # Calculate metrics (with per-session totals when sampling sessions, for the margins of error)
+                    self.mean_eval_measurements[i].add_results(y_test, pred_ids, sessions=(
+                        sessions[test_rows].tolist() if self.eval_sample_rate < 1 else None))
+                    self.current_eval_measurements[i].add_results(y_test, pred_ids)
+                    if self.segments:
+                        self.segmented_measurements[i].add_results(y_test, pred_ids, positions=positions,
+                                                                   sessions=test_sessions, event_types=event_types)
+                    self.running_time_measurements[i].compute_testing_time_end()
+                except TypeError:
+                    raise TypeError("Unexpected prediction value from {}"
+                                    .format(type(self.model[i]).__name__))
+
+        # Before training on the micro-batch, evict the events that all but its last event replace in the sliding
+        # window, as a single event would have evicted them before being trained on. The evictions by the last
+        # event are then notified when it is added, with the whole micro-batch in the window.
+        if len(y) > 1:
+            self.observation_window.make_room(len(y) - 1, None if self.keep_duration is None else X[-2, self.tid])
+
+        # Train
+        for i in range(self.n_models):
+            self.running_time_measurements[i].compute_training_time_begin()
+            self._partial_fit_batch(self.model[i], X, y, session_vectors)
+            self.running_time_measurements[i].compute_training_time_end()
+            self.running_time_measurements[i].update_time_measurements(len(y))
+
+        for j in range(len(y)):
+            self.observation_window.add_element(X[j:j + 1], y[j:j + 1])  # Add event to the sliding window
+            self.session_store.append(sessions[j], y[j])
+
+        return len(test_rows)
+
+    def _predict_batch(self, model, X, session_vectors):
+        """Predicts with a single call if the model supports batches, or else one event at a time."""
+        if getattr(model, 'supports_batch', False):
+            self.context.session_vectors = session_vectors
+            self.context.session_vector = session_vectors[-1]
+            return model.predict(X)
+        predictions = []
+        for j in range(len(X)):
+            self.context.session_vectors = session_vectors[j:j + 1]
+            self.context.session_vector = session_vectors[j]
+            predictions.append(model.predict(X[j:j + 1])[0])
+        return predictions
+
+    def _partial_fit_batch(self, model, X, y, session_vectors):
+        """Trains with a single call if the model supports batches, or else one event at a time."""
+        if getattr(model, 'supports_batch', False):
+            self.context.session_vectors = session_vectors
+            self.context.session_vector = session_vectors[-1]
+            model.partial_fit(X, y)
+        else:
+            for j in range(len(y)):
+                self.context.session_vectors = session_vectors[j:j + 1]
+                self.context.session_vector = session_vectors[j]
+                model.partial_fit(X[j:j + 1], y[j:j + 1])
+
+    @staticmethod
+    def _split_batch(sessions):
+        """Splits a batch into consecutive micro-batches in which every session appears at most once."""
+        bounds = []
+        start = 0
+        batch_sessions = set()
+        for j, session in enumerate(sessions):
+            if session in batch_sessions:
+                bounds.append((start, j))
+                start = j
+                batch_sessions.clear()
+            batch_sessions.add(session)
+        bounds.append((start, len(sessions)))
+        return bounds
+
     def partial_fit(self, X, y, classes=None, sample_weight=None):
         """ Partially fit all the models on the given data.
 
@@ -364,6 +666,7 @@ class EvaluatePrequential(StreamEvaluator):
 
         y: Array-like
             An array-like containing the recommendation labels / target values for all samples in X.
+            The labels are mapped to item indices before being passed to the models.
 
         classes: list
             Stores all the classes that may be encountered during the recommendation task. Not used for regressors.
@@ -379,6 +682,8 @@ class EvaluatePrequential(StreamEvaluator):
         """
 
         if self.model is not None:
+            if y is not None:
+                y = self.context.items.encode(y)
             for i in range(self.n_models):
                 if self._task_type == constants.CLASSIFICATION or \
                         self._task_type == constants.MULTI_TARGET_CLASSIFICATION:
@@ -400,7 +705,7 @@ class EvaluatePrequential(StreamEvaluator):
         Returns
         -------
         list of numpy.ndarray
-            Model(s) predictions
+            Model(s) predictions, as item indices (use context.items.decode() to get the item identifiers)
 
         """
         predictions = None
@@ -418,11 +723,86 @@ class EvaluatePrequential(StreamEvaluator):
 
         return info
 
-    @staticmethod
-    def _get_indexed_session_vector(session):
-        """Builds session representation containing indices of consumed items."""
-        _, y_slice = Data.window.get_slice(session, Data.sid)
-        try:
-            return np.searchsorted(Data.classes, y_slice[:, 0])
-        except IndexError:
-            return np.array([])
+    def _init_window(self):
+        """ Creates an empty observation window and session store, so that each evaluation starts afresh.
+
+        The models subscribe to the window of the evaluation they are configured for: the models configured
+        for a previous evaluation are not notified of the evictions of this one.
+
+        """
+        self.observation_window = RingInstanceWindow(max_size=self.n_keep,
+                                                     index_column=self.sid,
+                                                     target_dtype=np.int32,
+                                                     columns=self._get_window_columns(),
+                                                     max_age=self.keep_duration,
+                                                     time_column=self.tid)
+        self.session_store = SessionStore()
+        self.observation_window.subscribe(self.session_store.forget)
+        self._session_counter = Counter()
+
+    def _get_window_columns(self):
+        """Data types of the columns kept in the observation window. Other columns are not stored.
+
+        Timestamps may be fractional, and are kept as floats. The window raises a ValueError for the event
+        types out of the range of int8 (and for non-integer session identifiers or event types).
+
+        """
+        columns = {self.sid: np.int64}
+        if self.tid is not None:
+            columns[self.tid] = np.float64
+        if self.eid is not None:
+            columns[self.eid] = np.int8
+        return columns
+
+
+def _pad_predictions(predictions, rec_size):
+    """ Stacks the recommendation lists into a matrix of rec_size columns, padding the shorter lists with -1. """
+    pred_ids = np.full((len(predictions), rec_size), -1, dtype=np.int64)
+    for j, prediction in enumerate(predictions):
+        prediction = prediction[:rec_size]
+        pred_ids[j, :len(prediction)] = prediction
+    return pred_ids
+
+
+def _session_fraction(sessions):
+    """ Maps session identifiers to stable pseudo-random numbers in [0, 1) (splitmix64 hash). """
+    sessions = np.asarray(sessions)
+    if sessions.dtype.kind in 'biuf':
+        keys = sessions.astype(np.float64).view(np.uint64)
+    else:
+        keys = np.fromiter((zlib.crc32(str(session).encode()) for session in sessions), dtype=np.uint64,
+                           count=len(sessions))
+    keys = keys + np.uint64(0x9E3779B97F4A7C15)
+    keys = (keys ^ (keys >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    keys = (keys ^ (keys >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    keys = keys ^ (keys >> np.uint64(31))
+    return (keys >> np.uint64(11)).astype(np.float64) / 2.0 ** 53
+
+
+def _evaluate_group(evaluator, stream, model, model_names, random_state):
+    """ Evaluates a group of models in a worker process (see n_jobs parameter of EvaluatePrequential).
+
+    Returns
+    -------
+    dict
+        The trained models, their measurements and the recorded updates of the evaluation data buffer.
+
+    """
+    evaluator.n_jobs = 1
+    evaluator.output_file = None
+    evaluator.show_plot = False
+    evaluator.restart_stream = False
+    evaluator._snapshots = []
+    random.setstate(random_state[0])
+    np.random.set_state(random_state[1])
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        model = evaluator.evaluate(stream=stream, model=model, model_names=model_names)
+    return {'model': model,
+            'mean_eval_measurements': evaluator.mean_eval_measurements,
+            'current_eval_measurements': evaluator.current_eval_measurements,
+            'running_time_measurements': evaluator.running_time_measurements,
+            'segmented_measurements': evaluator.segmented_measurements,
+            'snapshots': evaluator._snapshots,
+            'global_sample_count': evaluator.global_sample_count,
+            'session_counter': evaluator._session_counter,
+            'evaluation_count': evaluator._evaluation_count}
@@ -1,6 +1,6 @@
 import sys
 sys.path.append("..")
-from skmultiflow.data import FileStream
+from streams import MemmapStream
 from evaluation.evaluate_prequential import EvaluatePrequential
 from recommendation.random import RandomClassifier
 from recommendation.popular import PopularClassifier
@@ -10,8 +10,8 @@ from recommendation.ht_wrapper import HTWrapper
 from recommendation.beer import BeerEnsemble
 from recommendation.sknn import SKNNClassifier
 
-# Create stream
-stream = FileStream("../data/clef_1M100K.csv")
+# Create stream (parsed once into a binary cache, memory-mapped in later runs)
+stream = MemmapStream("../data/clef_1M100K.csv")
 stream.prepare_for_use()
 
 # Instantiate recommenders
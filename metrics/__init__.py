@@ -10,8 +10,9 @@ from .measure_collection import WindowClassificationMeasurements
 from .measure_collection import WindowRegressionMeasurements
 from .measure_collection import WindowMultiTargetClassificationMeasurements
 from .measure_collection import WindowMultiTargetRegressionMeasurements
+from .measure_collection import SegmentedMeasurements
 from .measure_collection import RunningTimeMeasurements
-from .measure_collection import ConfusionMatrix
+from utils.data_structures import ConfusionMatrix
 from .measure_collection import MOLConfusionMatrix
 from .measure_collection import hamming_score
 from .measure_collection import exact_match
@@ -22,6 +23,7 @@ __all__ = ["ClassificationMeasurements", "RegressionMeasurements",
            "WindowClassificationMeasurements", "WindowRegressionMeasurements",
            "WindowMultiTargetClassificationMeasurements",
            "WindowMultiTargetRegressionMeasurements",
+           "SegmentedMeasurements",
            "RunningTimeMeasurements",
            "ConfusionMatrix", "MOLConfusionMatrix", "hamming_score",
            "exact_match", "j_index"]
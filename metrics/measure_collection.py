@@ -1,8 +1,60 @@
 import numpy as np
-from utils.data_structures import FastBuffer, FastComplexBuffer, ConfusionMatrix, MOLConfusionMatrix
+from utils.data_structures import FastBuffer, FastComplexBuffer, WindowAccumulator, GroupedAccumulator, \
+    MOLConfusionMatrix
 from skmultiflow.utils import check_weights
 from timeit import default_timer as timer
 from utils.shared_data import SharedData as Data
+import utils.constants as constants
+
+
+# Gains of a result, totaled at each cutoff by the ranking metrics
+_HIT, _RRANK, _DCG = 0, 1, 2
+_RANK_GAINS = (_HIT, _RRANK, _DCG)
+
+# Upper bounds of the buckets of session positions and lengths (1, 2, 3, 4, 5, 6-10, 11-20, 21+)
+_BUCKET_BOUNDS = np.array([1, 2, 3, 4, 5, 10, 20])
+_N_DECILES = 10
+
+
+def _rank_gains(rank, cutoffs, weight=1.0):
+    """ Returns the gains of a result (weighted hit, reciprocal rank and discounted gain) at each cutoff,
+    given the 0-based rank of the true item in the recommendation list. """
+    return np.outer((weight, 1 / (rank + 1), 1 / np.log2(rank + 2)), rank < cutoffs)
+
+
+def _get_ranks(y_true, y_pred):
+    """ Returns the 0-based ranks of the true items in the recommendation lists (rows of y_pred, padded
+    with -1), or inf for the lists in which the true item is not found exactly once. """
+    hits = y_pred == y_true[:, None]
+    ranks = hits.argmax(axis=1).astype(float)
+    ranks[hits.sum(axis=1) != 1] = np.inf
+    return ranks
+
+
+def _batch_rank_gains(ranks, cutoffs, weights):
+    """ Returns the gains of several results at each cutoff, as an array of shape (n_results, 3, n_cutoffs),
+    given the ranks of the true items (see _get_ranks()). """
+    gains = np.stack((weights, 1 / (ranks + 1), 1 / np.log2(ranks + 2)), axis=1)
+    return gains[:, :, None] * (ranks[:, None] < cutoffs)[:, None, :]
+
+
+def _bucket_label(bucket):
+    """ Returns the label of a bucket of session positions or lengths (see _BUCKET_BOUNDS). """
+    if bucket == len(_BUCKET_BOUNDS):
+        return '{}+'.format(_BUCKET_BOUNDS[-1] + 1)
+    lower = 1 if bucket == 0 else _BUCKET_BOUNDS[bucket - 1] + 1
+    upper = _BUCKET_BOUNDS[bucket]
+    return str(upper) if lower == upper else '{}-{}'.format(lower, upper)
+
+
+def _cutoff_column(measurements, cutoff):
+    """ Returns the column of the totals of a cutoff (the first column holds those of rec_size). """
+    if cutoff is None or cutoff == measurements.rec_size:
+        return 0
+    try:
+        return 1 + measurements.cutoffs.index(cutoff)
+    except ValueError:
+        raise ValueError('The metrics are not computed at cutoff {}.'.format(cutoff))
 
 
 class ClassificationMeasurements(object):
@@ -10,8 +62,11 @@ class ClassificationMeasurements(object):
     to be able to provide, at any given moment, any relevant metric about
     that classifier.
 
-    It combines a ConfusionMatrix object, with some additional statistics,
-    to compute a range of performance metrics.
+    It keeps running totals of the results (hits, reciprocal ranks and
+    discounted gains, at each cutoff), from which it computes a range of
+    performance metrics. Memory does not grow with the number of results,
+    nor with the number of items (nor, beyond max_sessions, with the number
+    of sessions).
 
     In order to keep statistics updated, the class won't require lots of
     information, but two: the predictions and true labels.
@@ -24,26 +79,48 @@ class ClassificationMeasurements(object):
     dtype: data type (Default: numpy.int64)
         The data type of the existing labels.
 
+    reservoir_size: int (Default: 0)
+        The number of reciprocal ranks kept in a uniform random sample of all the
+        results (reservoir sampling), e.g. to plot their distribution.
+
+    random_state: int, RandomState instance or None (Default: None)
+        The seed of the reservoir sampling. It does not use the global numpy random state.
+
+    rec_size: int (Default: None)
+        The cutoff of the metrics, when none is given to the getters. If None, the rec_size
+        of the shared data.
+
+    cutoffs: list (Default: None)
+        Other cutoffs at which the ranking metrics are computed, from the same recommendation
+        lists (which must then be at least as long as the largest cutoff).
+
+    max_sessions: int (Default: 100000)
+        The maximum number of sessions whose results are totaled separately (see add_result()).
+        Beyond that, the totals of the least recently active sessions are folded into the sums
+        needed by the margins of error. A folded session that continues counts as a new session.
+
     Examples
     --------
 
     """
 
-    def __init__(self, targets=None, dtype=np.int64):
+    def __init__(self, targets=None, dtype=np.int64, reservoir_size=0, random_state=None, rec_size=None,
+                 cutoffs=None, max_sessions=100000):
         super().__init__()
         if targets is not None:
             self.n_targets = len(targets)
         else:
             self.n_targets = 2
-        self.confusion_matrix = ConfusionMatrix(self.n_targets, dtype)
-        self.rranks = []
-        self.last_true_label = None
-        self.last_prediction = None
-        self.last_sample = None
-        self.sample_count = 0
-        self.majority_classifier = 0
-        self.correct_no_change = 0
         self.targets = targets
+        self.dtype = dtype
+        self.reservoir_size = reservoir_size
+        self.random_state = random_state
+        self.rec_size = Data.rec_size if rec_size is None else rec_size
+        self.cutoffs = [] if cutoffs is None else list(cutoffs)
+        self.max_sessions = max_sessions
+        self._cutoffs = np.array([self.rec_size] + self.cutoffs)
+        self._random = np.random.RandomState(random_state)
+        self.reset()
 
     def reset(self):
         if self.targets is not None:
@@ -54,11 +131,15 @@ class ClassificationMeasurements(object):
         self.last_prediction = None
         self.last_sample = None
         self.sample_count = 0
-        self.majority_classifier = 0
-        self.correct_no_change = 0
-        self.confusion_matrix.restart(self.n_targets)
-
-    def add_result(self, y_true, y_pred, weight=1.0):
+        self.rank_totals = np.zeros((len(_RANK_GAINS), len(self._cutoffs)))  # Gain, cutoff -> total
+        self.rrank_square_sum = 0.0
+        self.session_totals = {}  # Session -> [hits, sum of reciprocal ranks, number of results], least recent first
+        self.n_folded_sessions = 0
+        self.folded_sums = np.zeros(3)  # Sums of the totals of the folded sessions
+        self.folded_products = np.zeros((3, 3))  # Sums of the products of the totals of the folded sessions
+        self.rrank_reservoir = np.zeros(self.reservoir_size)
+
+    def add_result(self, y_true, y_pred, weight=1.0, session=None):
         """ Updates its statistics with the results of a prediction.
 
         Parameters
@@ -72,23 +153,92 @@ class ClassificationMeasurements(object):
         weight: float
             Sample's weight
 
+        session: float (Default: None)
+            Session of the sample. If given, results are also totaled per session (see get_recall_margin()).
+
         """
         check_weights(weight)
         rank = np.where(y_pred == y_true)[0]
+        rrank = 0.0
         if rank.size == 1:  # Relevant item exists
-            self.rranks.append(1 / (rank[0] + 1))  # Works for next-item prediction
-            self.confusion_matrix.update(y_true, y_true, weight=weight)  # True positive
-        else:
-            self.confusion_matrix.update(y_true, y_pred[0], weight=weight)  # False positive
-
+            self.rank_totals += _rank_gains(rank[0], self._cutoffs, weight)
+            if rank[0] < self.rec_size:
+                rrank = 1 / (rank[0] + 1)  # Works for next-item prediction
+                self.rrank_square_sum += rrank * rrank
+
+        if session is not None:
+            self._add_session_result(session, rrank)
+        if self.reservoir_size > 0:
+            self._sample_rrank(self.sample_count, rrank)
         self.sample_count += 1
 
-        if self.last_true_label == y_true:
-            self.correct_no_change += weight
-
         self.last_true_label = y_true
         self.last_prediction = y_pred
 
+    def add_results(self, y_true, y_pred, weights=None, sessions=None):
+        """ Updates its statistics with the results of a batch of predictions, with vectorized operations.
+
+        Parameters
+        ----------
+        y_true: numpy.ndarray of shape (n_samples,)
+            Indices of the true labels
+
+        y_pred: numpy.ndarray of shape (n_samples, N)
+            Indices of the top-N predicted labels of each sample (shorter lists are padded with -1)
+
+        weights: numpy.ndarray of shape (n_samples,) (Default: None)
+            Samples' weights. If None, uniform weights are assumed.
+
+        sessions: array-like of shape (n_samples,) (Default: None)
+            Sessions of the samples. If given, results are also totaled per session (see get_recall_margin()).
+
+        """
+        if len(y_true) == 1:  # Cheaper without the batch overhead
+            self.add_result(y_true[0], y_pred[0], 1.0 if weights is None else weights[0],
+                            None if sessions is None else sessions[0])
+            return
+        weights = np.ones(len(y_true)) if weights is None else weights
+        gains = _batch_rank_gains(_get_ranks(y_true, y_pred), self._cutoffs, weights)
+        self.rank_totals += gains.sum(axis=0)
+        rranks = gains[:, _RRANK, 0]  # At rec_size
+        self.rrank_square_sum += np.dot(rranks, rranks)
+
+        if sessions is not None:
+            for session, rrank in zip(sessions, rranks.tolist()):
+                self._add_session_result(session, rrank)
+        if self.reservoir_size > 0:
+            for sample_count, rrank in enumerate(rranks.tolist(), self.sample_count):
+                self._sample_rrank(sample_count, rrank)
+        self.sample_count += len(y_true)
+
+        self.last_true_label = y_true[-1]
+        self.last_prediction = y_pred[-1]
+
+    def _add_session_result(self, session, rrank):
+        totals = self.session_totals.pop(session, None)  # Re-inserted as the most recently active session
+        if totals is None:
+            totals = [0, 0.0, 0]
+            if len(self.session_totals) >= self.max_sessions:
+                self._fold_session(next(iter(self.session_totals)))
+        self.session_totals[session] = totals
+        if rrank > 0:
+            totals[0] += 1
+            totals[1] += rrank
+        totals[2] += 1
+
+    def _fold_session(self, session):
+        """ Adds the totals of a session to the sums of the folded sessions, and forgets them. """
+        totals = np.array(self.session_totals.pop(session), dtype=float)
+        self.n_folded_sessions += 1
+        self.folded_sums += totals
+        self.folded_products += np.outer(totals, totals)
+
+    def _sample_rrank(self, sample_count, rrank):
+        """ Keeps the reciprocal rank of the sample_count-th result in the reservoir with the right probability. """
+        position = sample_count if sample_count < self.reservoir_size else self._random.randint(sample_count + 1)
+        if position < self.reservoir_size:
+            self.rrank_reservoir[position] = rrank
+
     def get_last(self):
         return self.last_true_label, self.last_prediction
 
@@ -101,66 +251,184 @@ class ClassificationMeasurements(object):
             The accuracy.
 
         """
-        sum_value = self.confusion_matrix.get_sum_main_diagonal()
-        try:
-            return sum_value / self.sample_count
-        except ZeroDivisionError:
-            return 0.0
+        return self._get_mean(_HIT, None)
 
-    def get_f1_score(self):
+    def get_f1_score(self, cutoff=None):
         """ Compute the F1-score of the classifier.
 
+        Parameters
+        ----------
+        cutoff: int (Default: None)
+            The length of the recommendation list (rec_size if None).
+
         Returns
         -------
         float
             The F1-score
         """
-        precision = self.get_precision()
-        recall = self.get_recall()
+        precision = self.get_precision(cutoff)
+        recall = self.get_recall(cutoff)
         if recall + precision == 0:
             return 0.0
         else:
             return 2 * (precision * recall) / (precision + recall)
 
-    def get_precision(self):
+    def get_precision(self, cutoff=None):
         """ Compute the precision of the classifier.
 
+        Parameters
+        ----------
+        cutoff: int (Default: None)
+            The length of the recommendation list (rec_size if None).
 
         Returns
         -------
         float
             The precision
         """
-        return self.get_accuracy() / Data.rec_size
+        return self.get_hit_rate(cutoff) / (self.rec_size if cutoff is None else cutoff)
 
-    def get_recall(self):
+    def get_recall(self, cutoff=None):
         """ Compute the recall of the classifier.
 
+        Parameters
+        ----------
+        cutoff: int (Default: None)
+            The length of the recommendation list (rec_size if None).
+
         Notes
         -------
-        For next-item prediction task, it is equivalent to accuracy
+        For next-item prediction task, it is equivalent to accuracy and hit rate
 
         Returns
         -------
         float
             The recall.
         """
+        return self.get_hit_rate(cutoff)
+
+    def get_hit_rate(self, cutoff=None):
+        """ Compute the hit rate of the classifier, i.e. the fraction of results with the true item in the list.
+
+        Parameters
+        ----------
+        cutoff: int (Default: None)
+            The length of the recommendation list (rec_size if None).
 
-        return self.get_accuracy()
+        Returns
+        -------
+        float
+            The hit rate.
+        """
+        return self._get_mean(_HIT, cutoff)
 
-    def get_mrr(self):
+    def get_mrr(self, cutoff=None):
         """ Compute the mean reciprocal rank of the classifier.
 
+        Parameters
+        ----------
+        cutoff: int (Default: None)
+            The length of the recommendation list (rec_size if None).
+
         Returns
         -------
         float
             The mean reciprocal rank.
         """
-        return sum(self.rranks) / self.sample_count
+        return self._get_mean(_RRANK, cutoff)
 
-    @property
-    def _matrix(self):
-        return self.confusion_matrix.matrix
+    def get_ndcg(self, cutoff=None):
+        """ Compute the normalized discounted cumulative gain of the classifier (with one relevant item).
+
+        Parameters
+        ----------
+        cutoff: int (Default: None)
+            The length of the recommendation list (rec_size if None).
+
+        Returns
+        -------
+        float
+            The NDCG.
+        """
+        return self._get_mean(_DCG, cutoff)
+
+    def _get_mean(self, gain, cutoff):
+        try:
+            return self.rank_totals[gain, _cutoff_column(self, cutoff)] / self.sample_count
+        except ZeroDivisionError:
+            return 0.0
+
+    def get_rrank_sample(self):
+        """ Returns the reciprocal ranks of a uniform random sample of the results (0 for misses).
+
+        Notes
+        -------
+        The sample holds at most reservoir_size results, in no particular order.
+
+        Returns
+        -------
+        numpy.ndarray
+            The sampled reciprocal ranks.
+        """
+        return self.rrank_reservoir[:min(self.sample_count, self.reservoir_size)]
+
+    def get_recall_margin(self, z=1.96):
+        """ Compute the margin of error of the recall (normal approximation).
+
+        Parameters
+        ----------
+        z: float (Default: 1.96)
+            The quantile of the standard normal distribution (1.96 for a 95% confidence interval).
+
+        Notes
+        -------
+        If sessions were passed to add_result(), the sessions are taken as the sampling units,
+        since the results of the events of a session are correlated.
+
+        Returns
+        -------
+        float
+            The half-width of the confidence interval of the recall.
+        """
+        return self._get_margin(0, self.get_recall(), z, self.rank_totals[_HIT, 0])
+
+    def get_mrr_margin(self, z=1.96):
+        """ Compute the margin of error of the mean reciprocal rank (normal approximation).
+
+        Parameters
+        ----------
+        z: float (Default: 1.96)
+            The quantile of the standard normal distribution (1.96 for a 95% confidence interval).
+
+        Notes
+        -------
+        If sessions were passed to add_result(), the sessions are taken as the sampling units,
+        since the results of the events of a session are correlated.
+
+        Returns
+        -------
+        float
+            The half-width of the confidence interval of the mean reciprocal rank.
+        """
+        return self._get_margin(1, self.get_mrr(), z, self.rrank_square_sum)
+
+    def _get_margin(self, column, mean, z, square_sum):
+        if self.session_totals or self.n_folded_sessions > 0:  # Sampling units: sessions
+            totals = np.array(list(self.session_totals.values()), dtype=float).reshape(-1, 3)
+            n_units = self.n_folded_sessions + len(totals)
+            sums = self.folded_sums + totals.sum(axis=0)
+            products = self.folded_products + np.dot(totals.T, totals)
+            # Variance of a ratio estimator (sum of the values over sum of the counts of the sampling units),
+            # from the sum of the squared residuals (value - mean * count) of the sessions
+            square_error = products[column, column] - 2 * mean * products[column, 2] + mean * mean * products[2, 2]
+            n_results = sums[2]
+        else:  # Sampling units: single results (from the running totals)
+            n_units = n_results = self.sample_count
+            square_error = square_sum - n_units * mean * mean
+        if n_units < 2:
+            return 0.0
+        variance = n_units / (n_units - 1) * max(square_error, 0.0) / n_results ** 2
+        return z * np.sqrt(variance)
 
     def get_info(self):
         return '{}:'.format(type(self).__name__) + \
@@ -186,9 +454,11 @@ class WindowClassificationMeasurements(object):
     about one classifier. It can provide, as requested, any of the relevant
     current metrics about the classifier, measured inside the window.
 
-    To keep track of statistics inside a window, the class will use a
-    ConfusionMatrix object, alongside FastBuffers, to simulate fixed sized
-    windows of the important classifier's attributes.
+    To keep track of statistics inside a window, the class keeps the gains
+    of the last `window_size` results (hit flag, reciprocal rank and discounted
+    gain, at each cutoff) in a WindowAccumulator, with their running sums.
+    Updating the window and reading the metrics thus cost O(1), and memory
+    does not depend on the number of items.
 
     Its functionality is somewhat similar to those of the
     ClassificationMeasurements class. The difference is that the statistics
@@ -207,55 +477,47 @@ class WindowClassificationMeasurements(object):
         The width of the window. Determines how many samples the object
         can see.
 
+    rec_size: int (Default: None)
+        The cutoff of the metrics, when none is given to the getters. If None, the rec_size
+        of the shared data.
+
+    cutoffs: list (Default: None)
+        Other cutoffs at which the ranking metrics are computed, from the same recommendation
+        lists (which must then be at least as long as the largest cutoff).
+
     Examples
     --------
 
     """
 
-    def __init__(self, targets=None, dtype=np.int64, window_size=200):
+    def __init__(self, targets=None, dtype=np.int64, window_size=200, rec_size=None, cutoffs=None):
         super().__init__()
         if targets is not None:
             self.n_targets = len(targets)
         else:
             self.n_targets = 2
-        self.confusion_matrix = ConfusionMatrix(self.n_targets, dtype)
-        self.last_class = None
-        self.rranks = FastBuffer(window_size)
-
         self.targets = targets
+        self.dtype = dtype
         self.window_size = window_size
-        self.true_labels = FastBuffer(window_size)
-        self.predictions = FastBuffer(window_size)
-        self.temp = 0
+        self.rec_size = Data.rec_size if rec_size is None else rec_size
+        self.cutoffs = [] if cutoffs is None else list(cutoffs)
+        self._cutoffs = np.array([self.rec_size] + self.cutoffs)
+        self._miss = np.zeros(len(_RANK_GAINS) * len(self._cutoffs))
+        self.results = WindowAccumulator(window_size, width=len(self._miss))  # Gains, cutoff by cutoff
         self.last_prediction = None
         self.last_true_label = None
         self.last_sample = None
 
-        self.majority_classifier = 0
-        self.correct_no_change = 0
-        self.majority_classifier_correction = FastBuffer(window_size)
-        self.correct_no_change_correction = FastBuffer(window_size)
-
     def reset(self):
         if self.targets is not None:
             self.n_targets = len(self.targets)
         else:
             self.n_targets = 2
-
-        self.true_labels = FastBuffer(self.window_size)
-        self.predictions = FastBuffer(self.window_size)
-        self.temp = 0
+        self.results.clear()
         self.last_prediction = None
         self.last_true_label = None
         self.last_sample = None
 
-        self.majority_classifier = 0
-        self.correct_no_change = 0
-        self.confusion_matrix.restart(self.n_targets)
-        self.majority_classifier_correction = FastBuffer(self.window_size)
-        self.correct_no_change_correction = FastBuffer(self.window_size)
-        self.rranks = FastBuffer(self.window_size)
-
     def add_result(self, y_true, y_pred, weight=1.0):
         """ Updates its statistics with the results of a prediction.
         If needed it will remove samples from the observation window.
@@ -272,35 +534,39 @@ class WindowClassificationMeasurements(object):
             Sample's weight
         """
         check_weights(weight)
-        old_true = self.true_labels.add_element(np.array([y_true]))
-
         rank = np.where(y_pred == y_true)[0]
         if rank.size == 1:  # Relevant item exists
-            self.rranks.add_element(np.array([1 / (rank[0] + 1)]))
-            self.confusion_matrix.update(y_true, y_true, weight=weight)
-            old_predict = self.predictions.add_element(np.array([y_true]))  # Add correct prediction
+            self.results.add_element(_rank_gains(rank[0], self._cutoffs, weight).ravel())
         else:
-            self.rranks.add_element(np.array([0]))
-            self.confusion_matrix.update(y_true, y_pred[0], weight=weight)
-            old_predict = self.predictions.add_element(np.array([y_pred[0]]))  # Add some incorrect prediction
-
-        # Verify if it's needed to decrease the count of any label
-        # pair in the confusion matrix
-        if (old_true is not None) and (old_predict is not None):
-            self.temp += 1
-            self.confusion_matrix.remove(old_true[0], old_predict[0])
-            self.correct_no_change += self.correct_no_change_correction.peek()
-
-        # Verify if it's needed to decrease the correct_no_change
-        if (self.last_true_label == y_true) and (self.last_true_label is not None):
-            self.correct_no_change += weight
-            self.correct_no_change_correction.add_element([-1])
-        else:
-            self.correct_no_change_correction.add_element([0])
+            self.results.add_element(self._miss)
 
         self.last_true_label = y_true
         self.last_prediction = y_pred
 
+    def add_results(self, y_true, y_pred, weights=None):
+        """ Updates its statistics with the results of a batch of predictions, with vectorized operations.
+
+        Parameters
+        ----------
+        y_true: numpy.ndarray of shape (n_samples,)
+            Indices of the true labels
+
+        y_pred: numpy.ndarray of shape (n_samples, N)
+            Indices of the top-N predicted labels of each sample (shorter lists are padded with -1)
+
+        weights: numpy.ndarray of shape (n_samples,) (Default: None)
+            Samples' weights. If None, uniform weights are assumed.
+        """
+        if len(y_true) == 1:  # Cheaper without the batch overhead
+            self.add_result(y_true[0], y_pred[0], 1.0 if weights is None else weights[0])
+            return
+        weights = np.ones(len(y_true)) if weights is None else weights
+        gains = _batch_rank_gains(_get_ranks(y_true, y_pred), self._cutoffs, weights)
+        self.results.add_elements(gains.reshape(len(y_true), -1))
+
+        self.last_true_label = y_true[-1]
+        self.last_prediction = y_pred[-1]
+
     def get_last(self):
         return self.last_true_label, self.last_prediction
 
@@ -313,68 +579,113 @@ class WindowClassificationMeasurements(object):
             The window/current accuracy.
 
         """
-        sum_value = self.confusion_matrix.get_sum_main_diagonal()
-        try:
-            if sum_value > self.window_size:
-                print('sum value: {}'.format(sum_value))
-                print('window size: {}'.format(self.window_size))
-            return sum_value / self.true_labels.get_current_size()
-        except ZeroDivisionError:
-            return 0.0
+        return self._get_mean(_HIT, None)
 
-    def get_f1_score(self):
+    def get_f1_score(self, cutoff=None):
         """ Compute the F1-score of the classifier.
 
+        Parameters
+        ----------
+        cutoff: int (Default: None)
+            The length of the recommendation list (rec_size if None).
+
         Returns
         -------
         float
             The F1-score
         """
-        precision = self.get_precision()
-        recall = self.get_recall()
+        precision = self.get_precision(cutoff)
+        recall = self.get_recall(cutoff)
         if recall + precision == 0:
             return 0.0
         else:
             return 2 * (precision * recall) / (precision + recall)
 
-    def get_precision(self):
+    def get_precision(self, cutoff=None):
         """ compute the precision of the classifier.
 
+        Parameters
+        ----------
+        cutoff: int (Default: None)
+            The length of the recommendation list (rec_size if None).
 
         Returns
         -------
         float
             The precision
         """
-        return self.get_accuracy() / Data.rec_size
+        return self.get_hit_rate(cutoff) / (self.rec_size if cutoff is None else cutoff)
 
-    def get_recall(self):
+    def get_recall(self, cutoff=None):
         """ Compute the recall of the classifier..
 
+        Parameters
+        ----------
+        cutoff: int (Default: None)
+            The length of the recommendation list (rec_size if None).
+
         Returns
         -------
         float
             The recall.
         """
-        return self.get_accuracy()
+        return self.get_hit_rate(cutoff)
+
+    def get_hit_rate(self, cutoff=None):
+        """ Compute the hit rate of the classifier.
+
+        Parameters
+        ----------
+        cutoff: int (Default: None)
+            The length of the recommendation list (rec_size if None).
+
+        Returns
+        -------
+        float
+            The hit rate.
+        """
+        return self._get_mean(_HIT, cutoff)
 
-    def get_mrr(self):
+    def get_mrr(self, cutoff=None):
         """ Compute the mean reciprocal rank of the classifier.
 
+        Parameters
+        ----------
+        cutoff: int (Default: None)
+            The length of the recommendation list (rec_size if None).
+
         Returns
         -------
         float
             The mean reciprocal rank.
         """
-        return sum(self.rranks.get_queue()) / self.rranks.get_current_size()
+        return self._get_mean(_RRANK, cutoff)
 
-    @property
-    def _matrix(self):
-        return self.confusion_matrix.matrix
+    def get_ndcg(self, cutoff=None):
+        """ Compute the normalized discounted cumulative gain of the classifier (with one relevant item).
+
+        Parameters
+        ----------
+        cutoff: int (Default: None)
+            The length of the recommendation list (rec_size if None).
+
+        Returns
+        -------
+        float
+            The NDCG.
+        """
+        return self._get_mean(_DCG, cutoff)
+
+    def _get_mean(self, gain, cutoff):
+        try:
+            column = gain * len(self._cutoffs) + _cutoff_column(self, cutoff)
+            return self.results.get_sum(column) / self.results.get_current_size()
+        except ZeroDivisionError:
+            return 0.0
 
     @property
     def sample_count(self):
-        return self.true_labels.get_current_size()
+        return self.results.get_current_size()
 
     def get_info(self):
         return '{}:'.format(type(self).__name__) + \
@@ -384,18 +695,176 @@ class WindowClassificationMeasurements(object):
                ' - precision: {:.6f}'.format(self.get_precision()) + \
                ' - recall: {:.6f}'.format(self.get_recall())
 
-        # return '{}:'.format(type(self).__name__) + \
-        #         ' - sample_count: {}'.format(self.sample_count) + \
-        #         ' - window_size: {}'.format(self.window_size) + \
-        #         ' - accuracy: {:.6f}'.format(self.get_accuracy()) + \
-        #         ' - kappa: {:.6f}'.format(self.get_kappa()) + \
-        #         ' - kappa_t: {:.6f}'.format(self.get_kappa_t()) + \
-        #         ' - kappa_m: {:.6f}'.format(self.get_kappa_m()) + \
-        #         ' - f1-score: {:.6f}'.format(self.get_f1_score()) + \
-        #         ' - precision: {:.6f}'.format(self.get_precision()) + \
-        #         ' - recall: {:.6f}'.format(self.get_recall()) + \
-        #         ' - G-mean: {:.6f}'.format(self.get_g_mean()) + \
-        #         ' - majority_class: {}'.format(self.get_majority_class())
+
+class SegmentedMeasurements(object):
+    """ Keeps the recall and MRR of a recommender broken down by segments of the
+    evaluated events, over the whole stream.
+
+    Each kind of segment keeps a GroupedAccumulator of the hits and reciprocal
+    ranks of the results, keyed by segment id, so that a result is added in
+    (amortized) constant time and no per-event record is kept:
+
+    * ``'position'``: the position of the event in its session, in buckets (1, 2, 3, 4, 5, 6-10, 11-20, 21+).
+    * ``'session_length'``: the length of the session of the event, in the same buckets. Since sessions may
+      not be over when their events are evaluated, the results are totaled per session, and the sessions are
+      bucketed by their length when the results are read. Only the `max_sessions` most recently active sessions
+      are kept: the totals of the others are added to the bucket of their length so far (the position of their
+      last evaluated event), and a session that continues afterwards counts as a new session.
+    * ``'event_type'``: the event type of the event (any number, mapped to a group id on first sight).
+    * ``'popularity'``: the popularity decile of the true item. The results are totaled per item, and the
+      items are split into deciles of the number of their evaluated events when the results are read (1 for
+      the 10% most popular items).
+
+    Parameters
+    ----------
+    segments: list
+        The kinds of segments (see utils.constants.SEGMENTS).
+
+    rec_size: int (Default: None)
+        The recommendation list size (a.k.a. cutoff) of the metrics. If None, the size set in
+        the shared data is used.
+
+    max_sessions: int (Default: 100000)
+        The maximum number of sessions whose results are totaled separately, for the 'session_length' segments.
+
+    Raises
+    ------
+    ValueError: If a kind of segment is unknown.
+
+    """
+
+    def __init__(self, segments, rec_size=None, max_sessions=100000):
+        super().__init__()
+        for segment in segments:
+            if segment not in constants.SEGMENTS:
+                raise ValueError('Unknown segment {} (expected one of {}).'.format(segment, constants.SEGMENTS))
+        self.segments = list(segments)
+        self.rec_size = Data.rec_size if rec_size is None else rec_size
+        self.max_sessions = max_sessions
+        self.totals = {segment: GroupedAccumulator(width=2) for segment in self.segments}  # Hits, rranks
+        # Session -> [hits, sum of reciprocal ranks, number of results, last position], least recently active first
+        self.session_totals = {}
+        self._event_type_groups = {}  # Event type -> group id, in the event_type totals
+        self.sample_count = 0
+
+    def add_results(self, y_true, y_pred, positions=None, sessions=None, event_types=None):
+        """ Updates the totals of the segments of a batch of results.
+
+        Parameters
+        ----------
+        y_true: numpy.ndarray of shape (n_samples,)
+            Indices of the true labels
+
+        y_pred: numpy.ndarray of shape (n_samples, N)
+            Indices of the top-N predicted labels of each sample (shorter lists are padded with -1)
+
+        positions: numpy.ndarray of shape (n_samples,) (Default: None)
+            1-based positions of the samples in their sessions (required by the 'position' and 'session_length'
+            segments)
+
+        sessions: array-like of shape (n_samples,) (Default: None)
+            Sessions of the samples (required by the 'session_length' segments)
+
+        event_types: numpy.ndarray of shape (n_samples,) (Default: None)
+            Event types of the samples (required by the 'event_type' segments)
+
+        """
+        ranks = _get_ranks(y_true, y_pred)
+        hits = ranks < self.rec_size
+        rows = np.column_stack((hits, hits / (ranks + 1)))
+        for segment, totals in self.totals.items():
+            if segment == constants.SEGMENT_POSITION:
+                groups = np.searchsorted(_BUCKET_BOUNDS, positions)
+            elif segment == constants.SEGMENT_SESSION_LENGTH:
+                for session, (hit, rrank), position in zip(sessions, rows.tolist(), np.asarray(positions).tolist()):
+                    self._add_session_result(session, hit, rrank, position)
+                continue  # Added to the totals of their length when the sessions are folded
+            elif segment == constants.SEGMENT_EVENT_TYPE:
+                types, inverse = np.unique(event_types, return_inverse=True)
+                type_groups = np.array([self._event_type_groups.setdefault(event_type, len(self._event_type_groups))
+                                        for event_type in types.tolist()], dtype=np.int64)
+                groups = type_groups[inverse.ravel()]
+            else:
+                groups = y_true
+            totals.add_elements(groups, rows)
+        self.sample_count += len(y_true)
+
+    def _add_session_result(self, session, hit, rrank, position):
+        session_totals = self.session_totals.pop(session, None)  # Re-inserted as the most recently active session
+        if session_totals is None:
+            session_totals = [0.0, 0.0, 0, 0]
+            if len(self.session_totals) >= self.max_sessions:
+                self._fold_session(next(iter(self.session_totals)))
+        self.session_totals[session] = session_totals
+        session_totals[0] += hit
+        session_totals[1] += rrank
+        session_totals[2] += 1
+        session_totals[3] = position
+
+    def _fold_session(self, session):
+        """ Adds the results of a session to the 'session_length' segment of its length so far, and forgets it. """
+        hits, rranks, count, length = self.session_totals.pop(session)
+        self.totals[constants.SEGMENT_SESSION_LENGTH].add_element(np.searchsorted(_BUCKET_BOUNDS, length),
+                                                                  [hits, rranks], count=count)
+
+    def get_results(self, session_lengths=None):
+        """ Returns the results of the non-empty segments.
+
+        Parameters
+        ----------
+        session_lengths: dict (Default: None)
+            The number of events of each session. If None, or for the sessions it does not contain, the
+            position of the last evaluated event of the session is taken as its length.
+
+        Returns
+        -------
+        list
+            The (kind of segment, segment label, number of events, recall, MRR) of each segment.
+
+        """
+        results = []
+        for segment, totals in self.totals.items():
+            sums, counts = totals.get_sums(), totals.get_counts()
+            labels = None
+            if segment == constants.SEGMENT_POSITION:
+                labels = [_bucket_label(bucket) for bucket in range(len(counts))]
+            elif segment == constants.SEGMENT_SESSION_LENGTH:
+                n_buckets = len(_BUCKET_BOUNDS) + 1
+                open_totals = np.array(list(self.session_totals.values()), dtype=float).reshape(-1, 4)
+                lengths = [totals[3] if session_lengths is None else session_lengths.get(session, totals[3])
+                           for session, totals in self.session_totals.items()]
+                buckets = np.searchsorted(_BUCKET_BOUNDS, lengths).astype(np.int64)
+                session_sums, session_counts = _group_sums(buckets, open_totals[:, :2], open_totals[:, 2], n_buckets)
+                sums = session_sums + np.pad(sums, ((0, n_buckets - len(sums)), (0, 0)), 'constant')
+                counts = session_counts + np.pad(counts, (0, n_buckets - len(counts)), 'constant')
+                labels = [_bucket_label(bucket) for bucket in range(n_buckets)]
+            elif segment == constants.SEGMENT_EVENT_TYPE:
+                event_types = sorted(self._event_type_groups)
+                order = [self._event_type_groups[event_type] for event_type in event_types]
+                sums, counts = sums[order], counts[order]
+                labels = ['{:g}'.format(event_type) for event_type in event_types]
+            elif segment == constants.SEGMENT_POPULARITY:
+                items = np.flatnonzero(counts)
+                items = items[np.argsort(-counts[items], kind='stable')]  # From the most popular
+                deciles = np.arange(len(items)) * _N_DECILES // max(len(items), 1)
+                sums, counts = _group_sums(deciles, sums[items], counts[items], _N_DECILES)
+                labels = [str(decile + 1) for decile in range(_N_DECILES)]
+            for group in np.flatnonzero(counts):
+                results.append((segment, str(group) if labels is None else labels[group], int(counts[group]),
+                                sums[group, 0] / counts[group], sums[group, 1] / counts[group]))
+        return results
+
+    def get_info(self):
+        return '{}:'.format(type(self).__name__) + \
+               ' - sample_count: {}'.format(self.sample_count) + \
+               ' - segments: {}'.format(self.segments)
+
+
+def _group_sums(groups, sums, counts, n_groups):
+    """ Totals the sums and counts of fine-grained groups (e.g. sessions) into n_groups coarser groups. """
+    group_sums = np.column_stack([np.bincount(groups, weights=sums[:, column], minlength=n_groups)
+                                  for column in range(sums.shape[1])])
+    return group_sums, np.bincount(groups, weights=counts, minlength=n_groups).astype(np.int64)
 
 
 class MultiTargetClassificationMeasurements(object):
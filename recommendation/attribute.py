@@ -3,7 +3,7 @@ from skmultiflow.utils import get_dimensions
 import numpy as np
 from collections import Counter
 from collections import defaultdict
-from utils.shared_data import SharedData as Data
+from utils.shared_data import SharedData
 import pandas as pd
 
 pd.set_option('mode.chained_assignment', None)
@@ -24,16 +24,22 @@ class AttributeClassifier(BaseSKMObject, ClassifierMixin):
 
     def __init__(self, attr_data):
         super().__init__()
+        self._data = SharedData  # Replaced by the evaluation context in configure()
         self.counter = Counter()  # popularity counter
-        attr_data.iloc[:, 0] = attr_data.iloc[:, 0].apply(self._get_idx)
         self.attr_data = attr_data
+        self._item_attr_data = None  # attr_data with item indices
         self._rec_tracker = defaultdict(list)
 
+    def configure(self, context=None, **kwargs):
+        self._data = SharedData.current() if context is None else context
+        self._item_attr_data = self.attr_data.copy()
+        self._item_attr_data.iloc[:, 0] = self._data.items.encode(self.attr_data.iloc[:, 0].values)
+
     def partial_fit(self, X, y, classes=None, sample_weight=None):
         if y is not None:
             row_cnt, _ = get_dimensions(X)
             for i in range(row_cnt):
-                self.counter[self._get_idx(y[i])] += 1  # total popularity
+                self.counter[y[i]] += 1  # total popularity
         return self
 
     def predict(self, X):
@@ -45,15 +51,15 @@ class AttributeClassifier(BaseSKMObject, ClassifierMixin):
             if len(nonzero > 0):
                 sorted_desc = np.argsort(y_proba[i][nonzero])[::-1]
                 sorted_ids = nonzero[sorted_desc]
-                if not Data.allow_reminders:
-                    sorted_ids = sorted_ids[~np.isin(sorted_ids, Data.session_vector)]
-                if not Data.allow_repeated:
-                    session = X[i, Data.sid]
+                if not self._data.allow_reminders:
+                    sorted_ids = sorted_ids[~np.isin(sorted_ids, self._data.session_vector)]
+                if not self._data.allow_repeated:
+                    session = X[i, self._data.sid]
                     sorted_ids = sorted_ids[~np.isin(sorted_ids, self._rec_tracker[session])]
-                    self._rec_tracker[session].extend(sorted_ids[:Data.rec_size])
-                y_pred = Data.classes[sorted_ids[:Data.rec_size]]
+                    self._rec_tracker[session].extend(sorted_ids[:self._data.display_size])
+                y_pred = sorted_ids[:self._data.rec_size]
             else:
-                y_pred = np.array([])
+                y_pred = np.array([], dtype=int)
             predictions.append(y_pred)
         return np.array(predictions)
 
@@ -61,10 +67,10 @@ class AttributeClassifier(BaseSKMObject, ClassifierMixin):
         predictions = []
         r, _ = get_dimensions(X)
         for i in range(r):
-            y_proba = np.zeros(len(Data.classes))
-            y_prev_idx = Data.session_vector[-1]
-            value = self.attr_data[self.attr_data.iloc[:, 0] == y_prev_idx].iat[0, 1]
-            y_pred_df = self.attr_data[self.attr_data.iloc[:, 1] == value]
+            y_proba = np.zeros(len(self._data.items))
+            y_prev_idx = self._data.session_vector[-1]
+            value = self._item_attr_data[self._item_attr_data.iloc[:, 0] == y_prev_idx].iat[0, 1]
+            y_pred_df = self._item_attr_data[self._item_attr_data.iloc[:, 1] == value]
             y_pred_idx_df = y_pred_df.iloc[:, 0]
             max_count = max(self.counter.values())
             y_pred_proba = np.fromiter(((self.counter[y] + 1.0) / max_count
@@ -73,9 +79,5 @@ class AttributeClassifier(BaseSKMObject, ClassifierMixin):
             predictions.append(y_proba)
         return np.array(predictions)
 
-    @staticmethod
-    def _get_idx(y):
-        return np.where(Data.classes == y)[0][0]
-
     def __str__(self):
         return f'{__class__.__name__} ({self.attr_data.columns[1]})'
@@ -9,7 +9,9 @@ from collections import deque
 from collections import namedtuple
 from collections import defaultdict
 import random
-from utils.shared_data import SharedData as Data
+from utils.shared_data import SharedData
+
+Predictor = namedtuple('Predictor', ['id_', 'group'])  # Module level, so that the ensemble can be pickled
 
 
 class BeerEnsemble(BaseSKMObject, MetaEstimatorMixin):
@@ -37,6 +39,7 @@ class BeerEnsemble(BaseSKMObject, MetaEstimatorMixin):
 
     def __init__(self, cf_components=[], attr_file=None, boundaries=[], verbose=False):
         super().__init__()
+        self._data = SharedData  # Replaced by the evaluation context in configure()
         self.cf_components = cf_components
         self.attr_file = attr_file
         self.verbose = verbose
@@ -55,11 +58,12 @@ class BeerEnsemble(BaseSKMObject, MetaEstimatorMixin):
         if len(self.cf_components) == 0 and not attr_file:
             raise ValueError('The ensemble is empty. Please provide at least one component.')
 
-    def configure(self, **kwargs):
+    def configure(self, context=None, **kwargs):
+        self._data = SharedData.current() if context is None else context
         self.components = self.cf_components + self._build_attr_components()
         for c in self.components:
             if hasattr(c, 'configure'):
-                c.configure(**kwargs)
+                c.configure(context=self._data, **kwargs)
         self.sampler = self.Sampler(self.components, self.boundaries)
 
     def _build_attr_components(self):
@@ -67,8 +71,9 @@ class BeerEnsemble(BaseSKMObject, MetaEstimatorMixin):
         if self.attr_file is not None:
             try:
                 attr_df = pd.read_csv(self.attr_file)
-                # retain only observed items
-                attr_df = attr_df[attr_df.iloc[:, 0].isin(Data.classes)]
+                if not self._data.items.allow_new:
+                    # retain only observed items (an open catalog takes in all the others)
+                    attr_df = attr_df[attr_df.iloc[:, 0].isin(self._data.items.items)]
                 attr_components = [AttributeClassifier(attr_df.iloc[:, [0, i]])
                                    for i in range(1, len(attr_df.columns))]
             except FileNotFoundError:
@@ -131,7 +136,7 @@ class BeerEnsemble(BaseSKMObject, MetaEstimatorMixin):
             self.responses.clear()
             self.current_predictions.clear()
             self.current_sleeping.clear()
-            for rank in range(Data.rec_size):
+            for rank in range(self._data.rec_size):
                 self._predict_single_item(X[i:i + 1, :])
             y_pred = np.fromiter(self.current_predictions.keys(), dtype=int)
         predictions.append(y_pred)
@@ -155,25 +160,25 @@ class BeerEnsemble(BaseSKMObject, MetaEstimatorMixin):
             y_proba = self.responses[predictor.id_]
         except KeyError:
             y_proba = self.components[predictor.id_].predict_proba(X)
-            y_proba[0][Data.session_vector[-1]] = 0.0
+            y_proba[0][self._data.session_vector[-1]] = 0.0
             self.responses[predictor.id_] = y_proba
         num_predicted = np.count_nonzero(y_proba[0])
         if num_predicted > 0:
             interval = self._get_interval(predictor)
             sorted_ids = y_proba[0].argsort()[::-1][:num_predicted]
-            session = X[0, Data.sid]
-            for i in sorted_ids:
-                item = Data.classes[i]
+            session = X[0, self._data.sid]
+            for item in sorted_ids:
                 # if best prediction is below interval, no point to continue
-                if y_proba[0][i] < interval[0]:
+                if y_proba[0][item] < interval[0]:
                     return None
-                elif y_proba[0][i] <= interval[1] and \
+                elif y_proba[0][item] <= interval[1] and \
                         item not in self.current_predictions:
-                    if not Data.allow_reminders and i in Data.session_vector:
+                    if not self._data.allow_reminders and item in self._data.session_vector:
                         continue
-                    if not Data.allow_repeated and i in self._rec_tracker[session]:
+                    if not self._data.allow_repeated and item in self._rec_tracker[session]:
                         continue
-                    self._rec_tracker[session].add(i)
+                    if len(self.current_predictions) < self._data.display_size:  # Shown to the user
+                        self._rec_tracker[session].add(item)
                     return item
 
     def _get_interval(self, predictor):
@@ -214,7 +219,6 @@ class BeerEnsemble(BaseSKMObject, MetaEstimatorMixin):
 
         def __init__(self, components, boundaries=[]):
             self.predictors = OrderedDict()
-            Predictor = namedtuple('Predictor', ['id_', 'group'])
             for i, component in enumerate(components):
                 if component.__class__.__name__ == 'AttributeClassifier':
                     # TODO: split attribute-based components
@@ -5,7 +5,7 @@ from collections import defaultdict
 import numpy as np
 from collections import Counter
 from skmultiflow.trees import HoeffdingTree
-from utils.shared_data import SharedData as Data
+from utils.shared_data import SharedData
 
 
 class HTWrapper(BaseSKMObject, ClassifierMixin):
@@ -40,6 +40,7 @@ class HTWrapper(BaseSKMObject, ClassifierMixin):
                  max_session_size=20
                  ):
         super().__init__()
+        self._data = SharedData  # Replaced by the evaluation context in configure()
         self.ht = estimator
         self.w_mc = weight_mc
         self.w_inv = weight_inv
@@ -47,8 +48,9 @@ class HTWrapper(BaseSKMObject, ClassifierMixin):
         self.max_session_size = max_session_size
         self._rec_tracker = defaultdict(list)
 
-    def configure(self, **kwargs):
-        self.ht.classes = list(range(len(Data.classes)))
+    def configure(self, context=None, **kwargs):
+        self._data = SharedData.current() if context is None else context
+        self.ht.classes = list(range(len(self._data.items)))
         self.ht.set_params(nominal_attributes=[0])
         self.ht.partial_fit(np.array([[-1]]), np.array([0]))
 
@@ -56,9 +58,9 @@ class HTWrapper(BaseSKMObject, ClassifierMixin):
         if y is not None:
             row_cnt, _ = get_dimensions(X)
             for i in range(row_cnt):
-                y_idx = np.searchsorted(Data.classes, y)
-                if Data.session_vector is not None:
-                    session_vector = Data.session_vector[-self.max_session_size:]
+                y_idx = y[i:i + 1]
+                if self._data.session_vector is not None:
+                    session_vector = self._data.session_vector[-self.max_session_size:]
                     for pos, y_o_idx in enumerate(session_vector):
                         if y_o_idx == session_vector[-1]:
                             w = self.w_mc
@@ -74,28 +76,29 @@ class HTWrapper(BaseSKMObject, ClassifierMixin):
     def predict(self, X):
         predictions = deque()
         r, _ = get_dimensions(X)
-        y_proba = np.zeros((r, len(Data.classes)))
+        y_proba = np.zeros((r, len(self._data.items)))
         for i in range(r):
-            session_vector = Data.session_vector[-self.max_session_size:]
+            session_vector = self._data.session_vector[-self.max_session_size:]
             for pos, y_o_idx in enumerate(session_vector):
                 weight = self.w_mc if y_o_idx == session_vector[-1] else 1
                 y_proba_current = self.ht.predict_proba(np.array([[y_o_idx]]))
                 y_proba_current *= weight / (len(session_vector) - pos)
-                y_proba += y_proba_current
-            y_proba[i][Data.session_vector[-1]] = 0.0
+                # The tree only knows the classes seen so far in an open catalog
+                y_proba[:, :y_proba_current.shape[1]] += y_proba_current[:, :y_proba.shape[1]]
+            y_proba[i][self._data.session_vector[-1]] = 0.0
             nonzero = np.flatnonzero(y_proba[i])
             if len(nonzero > 0):
                 sorted_desc = np.argsort(y_proba[i][nonzero])[::-1]
                 sorted_ids = nonzero[sorted_desc]
-                if not Data.allow_reminders:
-                    sorted_ids = sorted_ids[~np.isin(sorted_ids, Data.session_vector)]
-                if not Data.allow_repeated:
-                    session = X[i, Data.sid]
+                if not self._data.allow_reminders:
+                    sorted_ids = sorted_ids[~np.isin(sorted_ids, self._data.session_vector)]
+                if not self._data.allow_repeated:
+                    session = X[i, self._data.sid]
                     sorted_ids = sorted_ids[~np.isin(sorted_ids, self._rec_tracker[session])]
-                    self._rec_tracker[session].extend(sorted_ids[:Data.rec_size])
-                y_pred = Data.classes[sorted_ids[:Data.rec_size]]
+                    self._rec_tracker[session].extend(sorted_ids[:self._data.display_size])
+                y_pred = sorted_ids[:self._data.rec_size]
             else:
-                y_pred = np.array([])
+                y_pred = np.array([], dtype=int)
             predictions.append(y_pred)
         return np.array(predictions)
 
@@ -2,11 +2,16 @@ from skmultiflow.core import BaseSKMObject, ClassifierMixin
 from skmultiflow.utils import get_dimensions
 from collections import deque
 import numpy as np
+from utils.shared_data import SharedData
 
 
 class OracleClassifier(BaseSKMObject, ClassifierMixin):
     """Oracle recommender for testing purposes.
 
+    Notes
+    ----------
+    Recommends the targets of the current stream batch, so it is only exact with batch_size=1.
+
     Parameters
     ----------
     stream: Stream
@@ -15,8 +20,12 @@ class OracleClassifier(BaseSKMObject, ClassifierMixin):
 
     def __init__(self, stream):
         super().__init__()
+        self._data = SharedData  # Replaced by the evaluation context in configure()
         self.stream = stream
 
+    def configure(self, context=None, **kwargs):
+        self._data = SharedData.current() if context is None else context
+
     def partial_fit(self, X, y, classes=None, sample_weight=None):
         return
 
@@ -24,6 +33,8 @@ class OracleClassifier(BaseSKMObject, ClassifierMixin):
         predictions = deque()
         r, _ = get_dimensions(X)
         y_pred = self.stream.current_sample_y
+        if getattr(self.stream, 'item_dictionary', None) is None:  # Otherwise, the stream already encodes them
+            y_pred = self._data.items.encode(y_pred)
         for i in range(r):
             predictions.append(y_pred)
         return np.array(predictions)
@@ -2,7 +2,7 @@ from skmultiflow.core import BaseSKMObject, ClassifierMixin
 from skmultiflow.utils import get_dimensions
 from collections import defaultdict
 import numpy as np
-from utils.shared_data import SharedData as Data
+from utils.shared_data import SharedData
 
 
 class PopularClassifier(BaseSKMObject, ClassifierMixin):
@@ -19,29 +19,40 @@ class PopularClassifier(BaseSKMObject, ClassifierMixin):
     sliding_window: boolean (default=False)
         Whether to keep counts only within the sliding window
     """
+
+    supports_batch = True
+
     def __init__(self, event_type=None, sliding_window=False):
         super().__init__()
+        self._data = SharedData  # Replaced by the evaluation context in configure()
         self.event_type = event_type
         self.sliding_window = sliding_window
         self._rec_tracker = defaultdict(list)
-        self._num_examples = 0
 
-    def configure(self, **kwargs):
-        self.counts = np.zeros(len(Data.classes))
+    def configure(self, context=None, **kwargs):
+        self._data = SharedData.current() if context is None else context
+        self.counts = np.zeros(len(self._data.items))
+        if self.sliding_window:
+            self._data.window.subscribe(self._forget)
 
     def partial_fit(self, X, y, classes=None, sample_weight=None):
         if y is not None:
-            row_cnt, _ = get_dimensions(X)
-            for i in range(row_cnt):
-                # decrement oldest item count if sliding window is enabled
-                if self.sliding_window and self._num_examples > Data.window.max_size:
-                    y_tail = Data.window.get_targets_matrix()[0]
-                    y_tail_idx = np.searchsorted(Data.classes, y_tail)[0]
-                    self.counts[y_tail_idx] -= 1  # forget observation
-                if self.event_type is None or X[Data.eid] == self.event_type:
-                    y_idx = np.searchsorted(Data.classes, y)[0]
-                    self.counts[y_idx] += 1
-                self._num_examples += 1
+            if len(self._data.items) > len(self.counts):
+                self._grow()
+            if self.event_type is None:
+                np.add.at(self.counts, y, 1)
+            else:
+                np.add.at(self.counts, y[X[:, self._data.eid] == self.event_type], 1)
+
+    def _grow(self):
+        """Makes room for the items added to an open catalog (amortized doubling)."""
+        size = max(len(self._data.items), 2 * len(self.counts))
+        self.counts = np.append(self.counts, np.zeros(size - len(self.counts)))
+
+    def _forget(self, X, session, item):
+        """Decrements the count of the observation evicted from the sliding window."""
+        if self.event_type is None or X[self._data.eid] == self.event_type:
+            self.counts[item] -= 1
 
     def predict(self, X):
         predictions = []
@@ -52,26 +63,23 @@ class PopularClassifier(BaseSKMObject, ClassifierMixin):
             if len(nonzero > 0):
                 sorted_desc = np.argsort(y_proba[i][nonzero])[::-1]
                 sorted_ids = nonzero[sorted_desc]
-                if not Data.allow_reminders:
-                    sorted_ids = sorted_ids[~np.isin(sorted_ids, Data.session_vector)]
-                if not Data.allow_repeated:
-                    session = X[i, Data.sid]
+                if not self._data.allow_reminders:
+                    sorted_ids = sorted_ids[~np.isin(sorted_ids, self._data.session_vectors[i])]
+                if not self._data.allow_repeated:
+                    session = X[i, self._data.sid]
                     sorted_ids = sorted_ids[~np.isin(sorted_ids, self._rec_tracker[session])]
-                    self._rec_tracker[session].extend(sorted_ids[:Data.rec_size])
-                y_pred = Data.classes[sorted_ids[:Data.rec_size]]
+                    self._rec_tracker[session].extend(sorted_ids[:self._data.display_size])
+                y_pred = sorted_ids[:self._data.rec_size]
             else:
-                y_pred = np.array([])
+                y_pred = np.array([], dtype=int)
             predictions.append(y_pred)
-        return np.array(predictions)
+        return np.array(predictions, dtype=object)  # Lists may differ in length
 
     def predict_proba(self, X):
-        predictions = []
         r, _ = get_dimensions(X)
-        for i in range(r):
-            y_proba = np.zeros(len(Data.classes))
-            nonzero = np.nonzero(self.counts)[0]
-            if len(nonzero) > 0:
-                y_proba[nonzero] = self.counts[nonzero] / max(self.counts[nonzero])
-                y_proba[Data.session_vector[-1]] = 0.0
-            predictions.append(y_proba)
-        return np.array(predictions)
+        y_proba = np.zeros((r, len(self._data.items)))
+        nonzero = np.nonzero(self.counts)[0]
+        if len(nonzero) > 0:
+            y_proba[:, nonzero] = self.counts[nonzero] / max(self.counts[nonzero])
+            y_proba[np.arange(r), [session_vector[-1] for session_vector in self._data.session_vectors]] = 0.0
+        return y_proba
@@ -2,7 +2,7 @@ from skmultiflow.core import BaseSKMObject, ClassifierMixin
 from skmultiflow.utils import get_dimensions
 from collections import deque
 import numpy as np
-from utils.shared_data import SharedData as data
+from utils.shared_data import SharedData
 
 
 class RandomClassifier(BaseSKMObject, ClassifierMixin):
@@ -10,6 +10,10 @@ class RandomClassifier(BaseSKMObject, ClassifierMixin):
 
     def __init__(self):
         super().__init__()
+        self._data = SharedData  # Replaced by the evaluation context in configure()
+
+    def configure(self, context=None, **kwargs):
+        self._data = SharedData.current() if context is None else context
 
     def partial_fit(self, X, y, classes=None, sample_weight=None):
         return
@@ -18,10 +22,10 @@ class RandomClassifier(BaseSKMObject, ClassifierMixin):
         predictions = deque()
         r, _ = get_dimensions(X)
         for i in range(r):
-            y_prev = data.classes[data.session_vector[-1]]
+            y_prev = self._data.session_vector[-1]
             y_pred = [y_prev]
             while y_prev in y_pred:
-                y_pred = np.random.choice(data.classes, data.rec_size)
+                y_pred = np.random.choice(len(self._data.items), self._data.rec_size)
             predictions.append(y_pred)
         return np.array(predictions)
 
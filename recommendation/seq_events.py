@@ -3,7 +3,7 @@ from skmultiflow.core import BaseSKMObject, ClassifierMixin
 from skmultiflow.utils import get_dimensions
 from scipy.sparse import lil_matrix
 from collections import defaultdict
-from utils.shared_data import SharedData as Data
+from utils.shared_data import SharedData
 
 
 class SeqEventsClassifier(BaseSKMObject, ClassifierMixin):
@@ -31,61 +31,70 @@ class SeqEventsClassifier(BaseSKMObject, ClassifierMixin):
             Whether or not to keep associations only for the events of the sliding window
     """
 
+    supports_batch = True
+
     def __init__(self,
                  source_event_type=None,
                  target_event_type=None,
                  sliding_window=False,
                  steps_back=0):  # 0 means whole session
         super().__init__()
+        self._data = SharedData  # Replaced by the evaluation context in configure()
         self.source_event_type = source_event_type
         self.target_event_type = target_event_type
-        if Data.eid is None:
+        if self._data.eid is None:
             self.source_event_type == None
             self.target_event_type == None
         self.sliding_window = sliding_window
         self.steps_back = steps_back if steps_back > 0 else float('inf')
         self._rec_tracker = defaultdict(list)
-        self._num_examples = 0
 
-    def configure(self, **kwargs):
-        self.matrix = lil_matrix((len(Data.classes), len(Data.classes)), dtype=float)
+    def configure(self, context=None, **kwargs):
+        self._data = SharedData.current() if context is None else context
+        self.matrix = lil_matrix((len(self._data.items), len(self._data.items)), dtype=float)
+        if self.sliding_window:
+            self._data.window.subscribe(self._remove_oldest_associations)
 
     def update_matrix(self, row, col, value):
         self.matrix[row, col] += value
 
     def partial_fit(self, X, y, classes=None, sample_weight=None):
         if y is not None:
+            if len(self._data.items) > self.matrix.shape[0]:
+                self._grow()
             row_cnt, _ = get_dimensions(X)
             for i in range(row_cnt):
                 self._partial_fit(X[i], y[i])
 
-    def _partial_fit(self, X, y):
-        y_idx = np.searchsorted(Data.classes, y)
-        if self.sliding_window and self._num_examples > Data.window.max_size:
-            self._remove_oldest_associations()
-        self._num_examples += 1
-        session = X[Data.sid]
+    def _grow(self):
+        """Makes room for the items added to an open catalog (amortized doubling)."""
+        size = max(len(self._data.items), 2 * self.matrix.shape[0])
+        self.matrix.resize((size, size))
+
+    def _partial_fit(self, X, y_idx):
+        session = X[self._data.sid]
         target_ok = True if self.target_event_type is None \
-            else self.target_event_type == X[Data.eid]
-        X_slice, y_slice = Data.window.get_slice(session, Data.sid)
+            else self.target_event_type == X[self._data.eid]
+        X_slice, y_slice = self._data.window.get_slice(session, self._data.sid)
         num_prev_items = min(len(X_slice), self.steps_back)
         for i in range(1, num_prev_items + 1):
             source_ok = True if self.source_event_type is None \
-                else self.source_event_type == X_slice[-i][Data.eid]
+                else self.source_event_type == X_slice[-i][self._data.eid]
             if source_ok and target_ok:
-                y_o_idx = np.searchsorted(Data.classes, y_slice[-i][0])
-                self.update_matrix(y_o_idx, y_idx, 1 / i)
-
-    def _remove_oldest_associations(self):
-        x_tail = Data.window.get_attributes_matrix()[0]
-        y_tail = Data.window.get_targets_matrix()[0]
-        session_tail = x_tail[Data.sid]
-        y_tail_idx = np.searchsorted(Data.classes, y_tail)[0]
-        _, y_slice = Data.window.get_slice(session_tail, Data.sid)
-        max_length = min(len(y_slice), self.steps_back + 1)
-        for i in range(1, max_length):
-            y_o_idx = np.searchsorted(Data.classes, y_slice[i, 0])
-            self.update_matrix(y_tail_idx, y_o_idx, -1 / i)
+                self.update_matrix(y_slice[-i][0], y_idx, 1 / i)
+
+    def _remove_oldest_associations(self, X, session, y_idx):
+        """Removes the sequences starting at the event evicted from the sliding window."""
+        source_ok = True if self.source_event_type is None \
+            else self.source_event_type == X[self._data.eid]
+        if source_ok:
+            X_slice, y_slice = self._data.window.get_slice(session, self._data.sid)
+            num_next_items = min(len(X_slice), self.steps_back)
+            for i in range(1, num_next_items + 1):
+                target_ok = True if self.target_event_type is None \
+                    else self.target_event_type == X_slice[i - 1][self._data.eid]
+                if target_ok:
+                    self.update_matrix(y_idx, y_slice[i - 1][0], -1 / i)
 
     def predict(self, X):
         predictions = []
@@ -96,24 +105,24 @@ class SeqEventsClassifier(BaseSKMObject, ClassifierMixin):
             if len(nonzero > 0):
                 sorted_desc = np.argsort(y_proba[i][nonzero])[::-1]
                 sorted_ids = nonzero[sorted_desc]
-                if not Data.allow_reminders:
-                    sorted_ids = sorted_ids[~np.isin(sorted_ids, Data.session_vector)]
-                if not Data.allow_repeated:
-                    session = X[i, Data.sid]
+                if not self._data.allow_reminders:
+                    sorted_ids = sorted_ids[~np.isin(sorted_ids, self._data.session_vectors[i])]
+                if not self._data.allow_repeated:
+                    session = X[i, self._data.sid]
                     sorted_ids = sorted_ids[~np.isin(sorted_ids, self._rec_tracker[session])]
-                    self._rec_tracker[session].extend(sorted_ids[:Data.rec_size])
-                y_pred = Data.classes[sorted_ids[:Data.rec_size]]
+                    self._rec_tracker[session].extend(sorted_ids[:self._data.display_size])
+                y_pred = sorted_ids[:self._data.rec_size]
             else:
-                y_pred = np.array([])
+                y_pred = np.array([], dtype=int)
             predictions.append(y_pred)
-        return np.array(predictions)
+        return np.array(predictions, dtype=object)  # Lists may differ in length
 
     def predict_proba(self, X):
         predictions = []
         r, _ = get_dimensions(X)
         for i in range(r):
-            y_proba = np.zeros(len(Data.classes))
-            y_prev_idx = Data.session_vector[-1]
+            y_proba = np.zeros(len(self._data.items))
+            y_prev_idx = self._data.session_vectors[i][-1]
             seq_counts = np.array(self.matrix.data[y_prev_idx])
             if len(seq_counts) > 0:
                 seq_events = np.array(self.matrix.rows[y_prev_idx])
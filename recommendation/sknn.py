@@ -4,7 +4,7 @@ from collections import deque
 import numpy as np
 from collections import Counter
 from collections import defaultdict
-from utils.shared_data import SharedData as Data
+from utils.shared_data import SharedData
 
 
 class SKNNClassifier(BaseSKMObject, ClassifierMixin):
@@ -33,9 +33,12 @@ class SKNNClassifier(BaseSKMObject, ClassifierMixin):
         Whether to look for neighbors only within the sliding window
     """
 
+    supports_batch = True
+
     def __init__(self, k=100, sample_size=0, sample_recent=True,
                  sliding_window=True, similarity='cosine'):
         super().__init__()
+        self._data = SharedData  # Replaced by the evaluation context in configure()
         self.k = k
         self.similarity = similarity
         self.sample_size = sample_size  # sample size of 0 means all sessions
@@ -45,33 +48,29 @@ class SKNNClassifier(BaseSKMObject, ClassifierMixin):
         self.session_items = defaultdict(set)
         self.item_sessions = defaultdict(set)
         self.ordered_sessions = np.array([], dtype=int)
-        self._num_examples = 0
+
+    def configure(self, context=None, **kwargs):
+        self._data = SharedData.current() if context is None else context
+        if self.sliding_window:
+            self._data.window.subscribe(self._forget)
 
     def partial_fit(self, X, y, classes=None, sample_weight=None):
         r, _ = get_dimensions(X)
         for i in range(r):
-            # Delete oldest session-item pair
-            if self.sliding_window and self._num_examples > Data.window.max_size:
-                x_tail = Data.window.get_attributes_matrix()[0]
-                y_tail = Data.window.get_targets_matrix()[0]
-                session_tail = x_tail[Data.sid]
-                item_tail = np.searchsorted(Data.classes, y_tail)[0]
-                _, y_slice = Data.window.get_slice(session_tail, Data.sid)
-                occurrences = np.nonzero(y_slice[:, 0] == y_tail[0])[0]
-                if len(occurrences) == 1:  # only delete if no duplicates exist
-                    try:
-                        self.session_items[session_tail].remove(item_tail)
-                        self.item_sessions[item_tail].remove(session_tail)
-                    except KeyError:
-                        pass
             # Add session-item pair
-            session = X[i, Data.sid]
-            item = np.searchsorted(Data.classes, y[0])
+            session = X[i, self._data.sid]
+            item = y[i]
             self.session_items[session].add(item)
             self.item_sessions[item].add(session)
             self.ordered_sessions = self.ordered_sessions[self.ordered_sessions != session]
             self.ordered_sessions = np.append(self.ordered_sessions, session)
-            self._num_examples += 1
+
+    def _forget(self, X, session, item):
+        """Deletes the session-item pair evicted from the sliding window."""
+        _, y_slice = self._data.window.get_slice(session, self._data.sid)
+        if item not in y_slice[:, 0]:  # only delete if no duplicates remain
+            self.session_items[session].discard(item)
+            self.item_sessions[item].discard(session)
 
     def predict(self, X):
         predictions = deque()
@@ -82,41 +81,42 @@ class SKNNClassifier(BaseSKMObject, ClassifierMixin):
             if len(nonzero > 0):
                 sorted_desc = np.argsort(y_proba[i][nonzero])[::-1]
                 sorted_ids = nonzero[sorted_desc]
-                if not Data.allow_reminders:
-                    sorted_ids = sorted_ids[~np.isin(sorted_ids, Data.session_vector)]
-                if not Data.allow_repeated:
-                    session = X[i, Data.sid]
+                if not self._data.allow_reminders:
+                    sorted_ids = sorted_ids[~np.isin(sorted_ids, self._data.session_vectors[i])]
+                if not self._data.allow_repeated:
+                    session = X[i, self._data.sid]
                     sorted_ids = sorted_ids[~np.isin(sorted_ids,
                                                      self._rec_tracker[session])]
-                    self._rec_tracker[session].extend(sorted_ids[:Data.rec_size])
-                y_pred = Data.classes[sorted_ids[:Data.rec_size]]
+                    self._rec_tracker[session].extend(sorted_ids[:self._data.display_size])
+                y_pred = sorted_ids[:self._data.rec_size]
             else:
-                y_pred = np.array([])
+                y_pred = np.array([], dtype=int)
             predictions.append(y_pred)
-        return np.array(predictions)
+        return np.array(predictions, dtype=object)  # Lists may differ in length
 
     def predict_proba(self, X):
         predictions = deque()
         r, _ = get_dimensions(X)
         for i in range(r):
-            y_proba = np.zeros(len(Data.classes))
-            scored_neighbors = self._find_neighbors()
+            y_proba = np.zeros(len(self._data.items))
+            session_vector = self._data.session_vectors[i]
+            scored_neighbors = self._find_neighbors(session_vector)
             for neighbor in scored_neighbors:
                 neighbor_items = list(self.session_items[neighbor[0]])
                 y_proba[neighbor_items] += neighbor[1]
             nonzero = np.nonzero(y_proba)[0]
             if len(nonzero) > 0:
                 y_proba[nonzero] /= max(y_proba[nonzero])
-                y_proba[Data.session_vector[-1]] = 0.0
+                y_proba[session_vector[-1]] = 0.0
             predictions.append(y_proba)
         return np.array(predictions)
 
-    def _find_neighbors(self):
+    def _find_neighbors(self, session_vector):
         neighbors = set()
         if self.sample_size == 0:  # Consider all sessions
             neighbors = set(self.session_items.keys())
         else:
-            for item in Data.session_vector:
+            for item in session_vector:
                 neighbors |= self.item_sessions[item]
             if len(neighbors) > self.sample_size:
                 if self.sample_recent:
@@ -127,13 +127,13 @@ class SKNNClassifier(BaseSKMObject, ClassifierMixin):
                                                       self.sample_size,
                                                       replace=False))
 
-        nearest_neighbors = self._get_nearest(neighbors)
+        nearest_neighbors = self._get_nearest(neighbors, session_vector)
         return nearest_neighbors
 
-    def _get_nearest(self, neighbors):
+    def _get_nearest(self, neighbors, session_vector):
         neighbors_scores = Counter()
         if len(neighbors) > 0:
-            set_current = set(Data.session_vector)
+            set_current = set(session_vector)
             for neighbor in neighbors:
                 set_neighbor = self.session_items[neighbor]
                 neighbors_scores[neighbor] = self._calc_score(set_current, set_neighbor)
@@ -0,0 +1,21 @@
+"""
+The :mod:`streams` module includes FlowRec-native data streams.
+"""
+
+from .session_file_stream import SessionFileStream
+from .memmap_stream import MemmapStream
+from .tail_stream import TailStream
+from .multi_file_stream import MultiFileStream
+from .memmap_stream import build_cache
+from .compressed_file import open_file
+from .timestamps import decode_times
+from .pipeline import PipelineStream
+from .pipeline import PipelineStage
+from .pipeline import EventTypeFilter
+from .pipeline import ColumnProjection
+from .pipeline import ConsecutiveDuplicateFilter
+from .pipeline import MinSessionLength
+
+__all__ = ["SessionFileStream", "MemmapStream", "TailStream", "MultiFileStream", "build_cache", "open_file", "decode_times",
+           "PipelineStream", "PipelineStage", "EventTypeFilter", "ColumnProjection",
+           "ConsecutiveDuplicateFilter", "MinSessionLength"]
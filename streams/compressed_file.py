@@ -0,0 +1,93 @@
+import io
+import os
+import bz2
+import gzip
+import lzma
+import threading
+from queue import Queue, Full
+
+COMPRESSIONS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+def open_file(filepath, block_size=1 << 20, prefetch=8):
+    """ Opens a file for reading in binary mode, decompressing .gz, .bz2 and .xz files on the fly.
+
+    Compressed files are decompressed in a background thread, `block_size` bytes at a time,
+    and at most `prefetch` blocks are kept ahead of the reader. Decompression thus overlaps
+    with parsing and evaluation (zlib, bz2 and lzma release the GIL while they work).
+
+    Parameters
+    ----------
+    filepath: str
+        Path to the file. The compression is inferred from its extension.
+
+    block_size: int (Default=1048576)
+        The number of decompressed bytes per block.
+
+    prefetch: int (Default=8)
+        The maximum number of decompressed blocks waiting to be read.
+
+    Returns
+    -------
+    io.BufferedReader
+        The (decompressed) content of the file. It is not seekable if the file is compressed.
+
+    """
+    opener = COMPRESSIONS.get(os.path.splitext(filepath)[1].lower())
+    if opener is None:
+        return open(filepath, 'rb')
+    return io.BufferedReader(_DecompressingReader(opener, filepath, block_size, prefetch), buffer_size=block_size)
+
+
+class _DecompressingReader(io.RawIOBase):
+    """ Raw binary stream of the blocks decompressed by a background thread. """
+
+    def __init__(self, opener, filepath, block_size, prefetch):
+        super().__init__()
+        self._queue = Queue(maxsize=prefetch)
+        self._stop = threading.Event()
+        self._block = memoryview(b'')
+        self._done = False
+        self._thread = threading.Thread(target=self._decompress, args=(opener, filepath, block_size), daemon=True)
+        self._thread.start()
+
+    def _decompress(self, opener, filepath, block_size):
+        try:
+            with opener(filepath, 'rb') as file:
+                for block in iter(lambda: file.read(block_size), b''):
+                    if not self._put(block):
+                        return
+            self._put(b'')
+        except BaseException as exc:  # Raised again in the reading thread
+            self._put(exc)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._block and not self._done:
+            item = self._queue.get()
+            if isinstance(item, BaseException):
+                self._done = True
+                raise item
+            self._done = not item
+            self._block = memoryview(item)
+        n_bytes = min(len(buffer), len(self._block))
+        buffer[:n_bytes] = self._block[:n_bytes]
+        self._block = self._block[n_bytes:]
+        return n_bytes
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+        super().close()
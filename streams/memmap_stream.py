@@ -0,0 +1,315 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+from skmultiflow.data.base_stream import Stream
+from utils.data_structures import ItemDictionary
+from streams.compressed_file import open_file
+from streams.timestamps import decode_times, decode_time
+
+_CACHE_VERSION = 1
+
+
+def build_cache(filepath, cache_dir=None, target_idx=-1, time_idx=None, time_unit='s', dtype=float,
+                chunk_size=100000):
+    """ Writes the binary cache of a CSV file of session events, unless an up-to-date one exists.
+
+    The features are stored as a row-major `dtype` matrix, and the items as int32 indices into
+    the (sorted) item dictionary, so that the cache can be memory-mapped by MemmapStream.
+
+    Parameters
+    ----------
+    filepath: str
+        Path to the CSV file (with a header line), possibly compressed (.gz, .bz2 or .xz).
+
+    cache_dir: str (Default=None)
+        Directory of the caches. By default, a `.flowrec_cache` directory next to the CSV file.
+
+    target_idx: int (Default=-1)
+        The index of the column that contains the items (targets).
+
+    time_idx: int (Default=None)
+        The index of the column that contains the timestamps. If set, they are decoded into
+        int64 epoch values (from ISO-8601 strings or epoch values), once per chunk.
+
+    time_unit: str (Default='s')
+        The unit of the epoch values ('s', 'ms', 'us' or 'ns').
+
+    dtype: data type (Default=float)
+        The data type of the feature matrix.
+
+    chunk_size: int (Default=100000)
+        The number of rows parsed at a time.
+
+    Returns
+    -------
+    str
+        The path of the cache directory.
+
+    Notes
+    -----
+    The cache is keyed by the column configuration (directory name) and by the content hash of the
+    CSV file (stored in the metadata). The hash is only recomputed when the size or modification time
+    of the file changed, so opening an up-to-date cache does not read the CSV file.
+
+    """
+    filepath = os.path.abspath(filepath)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(filepath), '.flowrec_cache')
+    config = json.dumps({'version': _CACHE_VERSION, 'target_idx': target_idx, 'time_idx': time_idx,
+                         'time_unit': time_unit, 'dtype': np.dtype(dtype).str})
+    name = os.path.splitext(os.path.basename(filepath))[0]
+    path = os.path.join(cache_dir, '{}-{}'.format(name, hashlib.sha1(config.encode()).hexdigest()[:12]))
+
+    stat = os.stat(filepath)
+    meta = _read_meta(path)
+    if meta is not None and meta['source_size'] == stat.st_size:
+        if meta['source_mtime'] == stat.st_mtime:
+            return path
+        if meta['source_hash'] == _hash_file(filepath):  # Touched, but not modified
+            meta['source_mtime'] = stat.st_mtime
+            _write_meta(path, meta)
+            return path
+
+    print('Building the cache of {}...'.format(filepath))
+    tmp_path = '{}.tmp{}'.format(path, os.getpid())
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    columns = list(pd.read_csv(filepath, nrows=0).columns)
+    target_name = columns[target_idx]
+    time_name = None if time_idx is None else columns[time_idx]
+    feature_names = [c for c in columns if c != target_name]
+
+    # Items are indexed in order of appearance, then re-indexed in sorted order (as in a closed catalog)
+    items = ItemDictionary(allow_new=True)
+    n_samples = 0
+    with open_file(filepath) as source, open(os.path.join(tmp_path, 'X.bin'), 'wb') as x_file, \
+            open(os.path.join(tmp_path, 'y.bin'), 'wb') as y_file:
+        for chunk in pd.read_csv(source, chunksize=chunk_size):
+            if time_name is not None:
+                chunk[time_name] = decode_times(chunk[time_name].values, unit=time_unit)
+            x_file.write(np.ascontiguousarray(chunk[feature_names].to_numpy(dtype=dtype)).tobytes())
+            y_file.write(items.encode(chunk[target_name].values).tobytes())
+            n_samples += len(chunk)
+    order = np.argsort(items.items, kind='stable')
+    rank = np.empty(len(order), dtype=np.int32)
+    rank[order] = np.arange(len(order), dtype=np.int32)
+    if n_samples > 0:
+        y = np.memmap(os.path.join(tmp_path, 'y.bin'), dtype=np.int32, mode='r+', shape=(n_samples,))
+        for start in range(0, n_samples, chunk_size):
+            y[start:start + chunk_size] = rank[y[start:start + chunk_size]]
+        y.flush()
+        del y
+    sorted_items = items.items[order]
+    if sorted_items.dtype == object:
+        sorted_items = sorted_items.astype(str)  # Saved without pickling
+    np.save(os.path.join(tmp_path, 'items.npy'), sorted_items)
+
+    _write_meta(tmp_path, {'version': _CACHE_VERSION,
+                           'source': filepath,
+                           'source_size': stat.st_size,
+                           'source_mtime': stat.st_mtime,
+                           'source_hash': _hash_file(filepath),
+                           'n_samples': n_samples,
+                           'feature_names': feature_names,
+                           'target_name': target_name,
+                           'dtype': np.dtype(dtype).str})
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _hash_file(filepath, block_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(filepath, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_meta(path):
+    try:
+        with open(os.path.join(path, 'meta.json')) as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('version') == _CACHE_VERSION else None
+
+
+def _write_meta(path, meta):
+    with open(os.path.join(path, 'meta.json'), 'w') as file:
+        json.dump(meta, file, indent=2)
+
+
+class MemmapStream(Stream):
+    """ Stream of session events memory-mapped from a binary cache of a CSV file.
+
+    The first time a file is used, it is parsed once into a binary cache (see build_cache()).
+    Later runs map the cache into memory without parsing or copying it, and also get the item
+    dictionary from the cache: the targets returned by next_sample() are already item indices,
+    so that the evaluator neither scans the stream for its items nor encodes them.
+
+    Parameters
+    ----------
+    filepath: str
+        Path to the CSV file (with a header line), possibly compressed (.gz, .bz2 or .xz).
+
+    target_idx: int (Default=-1)
+        The index of the column that contains the items (targets).
+
+    time_idx: int (Default=None)
+        The index of the column that contains the timestamps. If set, they are decoded into
+        int64 epoch values (from ISO-8601 strings or epoch values) when the cache is built.
+
+    time_unit: str (Default='s')
+        The unit of the epoch values ('s', 'ms', 'us' or 'ns').
+
+    cache_dir: str (Default=None)
+        Directory of the caches. By default, a `.flowrec_cache` directory next to the CSV file.
+
+    dtype: data type (Default=float)
+        The data type of the feature matrix.
+
+    chunk_size: int (Default=100000)
+        The number of rows parsed at a time when building the cache.
+
+    Notes
+    -----
+    Since the item dictionary is complete, the open_catalog parameter of the evaluator has no effect.
+
+    Examples
+    --------
+    >>> stream = MemmapStream('events.csv')
+    >>> stream.prepare_for_use()
+    >>> X, y = stream.next_sample(10)
+    >>> items = stream.item_dictionary.decode(y)
+
+    """
+
+    def __init__(self, filepath, target_idx=-1, time_idx=None, time_unit='s', cache_dir=None, dtype=float,
+                 chunk_size=100000):
+        super().__init__()
+        self.filepath = filepath
+        self.target_idx = target_idx
+        self.time_idx = time_idx
+        self.time_unit = time_unit
+        self.cache_dir = cache_dir
+        self.dtype = dtype
+        self.chunk_size = chunk_size
+        self.name = os.path.splitext(os.path.basename(filepath))[0]
+        self.cache_path = None
+        self.item_dictionary = None
+        self.X = None
+        self.y = None
+        self.n_samples = 0
+
+    def prepare_for_use(self):
+        """ Builds the cache if needed, and maps it into memory. """
+        self.cache_path = build_cache(self.filepath, cache_dir=self.cache_dir, target_idx=self.target_idx,
+                                      time_idx=self.time_idx, time_unit=self.time_unit, dtype=self.dtype,
+                                      chunk_size=self.chunk_size)
+        meta = _read_meta(self.cache_path)
+        self.n_samples = meta['n_samples']
+        self.feature_names = meta['feature_names']
+        self.target_names = [meta['target_name']]
+        self.n_features = len(self.feature_names)
+        self.n_num_features = self.n_features
+        self.n_targets = 1
+        self.item_dictionary = ItemDictionary(np.load(os.path.join(self.cache_path, 'items.npy')))
+        self.target_values = self.item_dictionary.items.tolist()
+        self._map()
+        self.restart()
+
+    def _map(self):
+        if self.n_samples > 0:
+            self.X = np.memmap(os.path.join(self.cache_path, 'X.bin'), dtype=np.dtype(self.dtype), mode='r',
+                               shape=(self.n_samples, self.n_features))
+            self.y = np.memmap(os.path.join(self.cache_path, 'y.bin'), dtype=np.int32, mode='r',
+                               shape=(self.n_samples,))
+        else:
+            self.X = np.empty((0, self.n_features), dtype=self.dtype)
+            self.y = np.empty(0, dtype=np.int32)
+
+    def next_sample(self, batch_size=1):
+        """ Returns the next `batch_size` samples (fewer at the end of the stream).
+
+        Parameters
+        ----------
+        batch_size: int (Default=1)
+            The number of samples to return.
+
+        Returns
+        -------
+        tuple or tuple list
+            Returns the next batch_size samples (X, y), where y holds item indices,
+            or (None, None) at the end of the stream.
+
+        """
+        stop = min(self.sample_idx + batch_size, self.n_samples)
+        if stop <= self.sample_idx:
+            self.current_sample_x, self.current_sample_y = None, None
+        else:
+            self.current_sample_x = np.asarray(self.X[self.sample_idx:stop])
+            self.current_sample_y = np.asarray(self.y[self.sample_idx:stop])
+        self.sample_idx = max(stop, self.sample_idx)
+        return self.current_sample_x, self.current_sample_y
+
+    def seek(self, sample_idx):
+        """ Moves to the given row of the stream, in constant time.
+
+        Parameters
+        ----------
+        sample_idx: int
+            The index of the next sample to return.
+
+        """
+        self.sample_idx = int(min(max(sample_idx, 0), self.n_samples))
+
+    def seek_time(self, timestamp, time_column_index):
+        """ Moves to the first event at or after a timestamp, with a binary search on the time column.
+
+        Parameters
+        ----------
+        timestamp: float or str
+            The timestamp to start from (epoch value, or ISO-8601 string).
+
+        time_column_index: int
+            The index of the feature column that contains the timestamps (in ascending order).
+
+        """
+        timestamp = decode_time(timestamp, unit=self.time_unit)
+        low, high = 0, self.n_samples
+        while low < high:
+            middle = (low + high) // 2
+            if self.X[middle, time_column_index] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        self.sample_idx = low
+
+    def has_more_samples(self):
+        return self.sample_idx < self.n_samples
+
+    def n_remaining_samples(self):
+        return self.n_samples - self.sample_idx
+
+    def restart(self):
+        self.sample_idx = 0
+        self.current_sample_x = None
+        self.current_sample_y = None
+
+    def __getstate__(self):
+        # Memory maps would be pickled as copies of the data: they are mapped again when unpickled
+        state = self.__dict__.copy()
+        state['X'], state['y'] = None, None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.cache_path is not None:
+            self._map()
+
+    def get_data_info(self):
+        return self.name
@@ -0,0 +1,147 @@
+import os
+import glob
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from streams.prefetching_stream import PrefetchingStream
+from streams.compressed_file import open_file
+from streams.timestamps import decode_times
+
+
+class MultiFileStream(PrefetchingStream):
+    """ Stream of the session events of a sequence of CSV files (e.g. one file per day), read as one stream.
+
+    The files are parsed in worker processes: while the evaluation consumes a file, the
+    next `n_workers` files are parsed in parallel, so that parsing neither stalls the
+    evaluation nor competes with it for the GIL. The parsed files are then queued in
+    order (at most `prefetch` of them) by a background thread.
+
+    Parameters
+    ----------
+    files: str or list
+        The paths of the CSV files (with a header line, possibly compressed), in the order of
+        the stream, or a glob pattern (e.g. 'logs/2019-03-*.csv'), in which case the matching
+        files are taken in sorted order.
+
+    target_idx: int (Default=-1)
+        The index of the column that contains the items (targets).
+
+    time_idx: int (Default=None)
+        The index of the column that contains the timestamps. If set, they are decoded into
+        int64 epoch values (from ISO-8601 strings or epoch values), once per file.
+
+    time_unit: str (Default='s')
+        The unit of the epoch values ('s', 'ms', 'us' or 'ns').
+
+    n_workers: int (Default=2)
+        The number of worker processes, i.e. of files parsed ahead of the evaluation.
+
+    prefetch: int (Default=2)
+        The maximum number of parsed files waiting to be consumed.
+
+    dtype: data type (Default=float)
+        The data type of the feature matrix.
+
+    Raises
+    ------
+    ValueError: If no file matches, or if the columns of a file differ from those of the first one.
+
+    Notes
+    -----
+    Each file is parsed in full, so that up to n_workers + prefetch + 1 files are held in memory.
+    The items are returned as they are in the files, and are encoded by the item dictionary of the
+    evaluator, which is shared by all the files. target_values requires a scan of the target column
+    of all the files (done by the worker processes): use EvaluatePrequential(open_catalog=True) to skip it.
+
+    Examples
+    --------
+    >>> stream = MultiFileStream('logs/2019-03-*.csv.gz', n_workers=4)
+    >>> stream.prepare_for_use()
+    >>> X, y = stream.next_sample(10)
+
+    """
+
+    def __init__(self, files, target_idx=-1, time_idx=None, time_unit='s', n_workers=2, prefetch=2, dtype=float):
+        super().__init__(target_idx=target_idx, time_idx=time_idx, time_unit=time_unit, prefetch=prefetch,
+                         dtype=dtype)
+        self.files = sorted(glob.glob(files)) if isinstance(files, str) else list(files)
+        if not self.files:
+            raise ValueError('No file matches {}.'.format(files))
+        self.n_workers = n_workers
+        self.name = os.path.basename(os.path.dirname(os.path.abspath(self.files[0])))
+        self._target_values = None
+
+    def prepare_for_use(self):
+        """ Reads the header of the first file and starts the background reader. """
+        with open_file(self.files[0]) as file:
+            self._set_columns(pd.read_csv(file, nrows=0).columns)
+        self.restart()
+
+    @property
+    def target_values(self):
+        """ The unique items of the stream (computed on first access, with a parallel scan of the target columns). """
+        if self._target_values is None and self._target_column is not None:
+            values = np.array([])
+            with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+                for items in executor.map(_read_items, self.files, [self._target_column] * len(self.files)):
+                    values = np.union1d(values, items)
+            self._target_values = values.tolist()
+        return self._target_values
+
+    @target_values.setter
+    def target_values(self, values):
+        self._target_values = values
+
+    def _read_chunks(self):
+        """ Yields the parsed files, as (X, y), while the worker processes parse the next ones. """
+        executor = ProcessPoolExecutor(max_workers=self.n_workers)
+        futures = deque()
+        try:
+            for filepath in self.files:
+                futures.append(executor.submit(_parse_file, filepath, self._columns, self._target_column,
+                                               self.feature_names, self._time_column, self.time_unit, self.dtype))
+                if len(futures) > self.n_workers:
+                    yield from self._result(futures.popleft())
+            while futures:
+                yield from self._result(futures.popleft())
+        finally:  # Also when the reader is stopped: the files not being parsed yet are dropped
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _result(future):
+        X, y = future.result()
+        if len(y) > 0:
+            yield X, y
+
+    def _parse(self, chunk):
+        return chunk  # Already split into (X, y) by the worker process
+
+    def restart(self):
+        """ Restarts the stream from the beginning of the first file. """
+        self._start_reader()
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self._target_column is not None:
+            self.restart()
+
+
+def _parse_file(filepath, columns, target_column, feature_names, time_column, time_unit, dtype):
+    """ Parses a CSV file into its feature matrix and target vector (run by a worker process). """
+    with open_file(filepath) as file:
+        data = pd.read_csv(file)
+    if list(data.columns) != columns:
+        raise ValueError('The columns of {} ({}) differ from those of the first file ({}).'.format(
+            filepath, list(data.columns), columns))
+    if time_column is not None:
+        data[time_column] = decode_times(data[time_column].values, unit=time_unit)
+    return data[feature_names].to_numpy(dtype=dtype), data[target_column].values
+
+
+def _read_items(filepath, target_column):
+    """ Returns the unique items of a CSV file (run by a worker process). """
+    with open_file(filepath) as file:
+        return pd.unique(pd.read_csv(file, usecols=[target_column]).iloc[:, 0].values)
@@ -0,0 +1,308 @@
+import numpy as np
+from streams.prefetching_stream import PrefetchingStream
+
+_MISSING = object()
+
+
+class PipelineStream(PrefetchingStream):
+    """ Stream that preprocesses the events of another stream with a pipeline of stages.
+
+    The events of the source stream are read in chunks of `chunk_size` samples and go
+    through the stages, which are lazy generators over the chunks (see PipelineStage).
+    The stages work on whole chunks with vectorized operations, so that the events they
+    drop never reach the per-event loop of the evaluator. The pipeline runs in a
+    background thread, ahead of the evaluation.
+
+    Parameters
+    ----------
+    stream: Stream
+        The source stream (prepared by prepare_for_use()).
+
+    stages: list
+        The pipeline stages (PipelineStage), applied in order.
+
+    chunk_size: int (Default=10000)
+        The number of samples read from the source stream at a time.
+
+    prefetch: int (Default=4)
+        The maximum number of processed chunks waiting to be consumed.
+
+    Notes
+    -----
+    The column indices passed to the evaluator (and to the stages following a ColumnProjection)
+    refer to the projected columns. The item dictionary and target values of the source stream,
+    if any, are those of the pipeline stream.
+
+    Examples
+    --------
+    >>> stream = PipelineStream(SessionFileStream('events.csv'),
+    ...                         [EventTypeFilter(event_column_index=2, event_types=[0]),
+    ...                          ConsecutiveDuplicateFilter(session_column_index=0),
+    ...                          MinSessionLength(session_column_index=0, min_length=2)])
+    >>> stream.prepare_for_use()
+
+    """
+
+    def __init__(self, stream, stages, chunk_size=10000, prefetch=4):
+        super().__init__(prefetch=prefetch)
+        self.stream = stream
+        self.stages = stages
+        self.chunk_size = chunk_size
+        self._fill_batches = getattr(stream, '_fill_batches', True)
+        self._prepared = False
+
+    def prepare_for_use(self):
+        self.stream.prepare_for_use()
+        self.name = self.stream.name
+        feature_names = self.stream.feature_names
+        for stage in self.stages:
+            feature_names = stage.get_feature_names(feature_names)
+        self.feature_names = feature_names
+        self.target_names = self.stream.target_names
+        self.n_features = len(feature_names)
+        self.n_num_features = self.n_features
+        self.n_targets = self.stream.n_targets
+        self._prepared = True
+        self._start_reader()
+
+    @property
+    def target_values(self):
+        return self.stream.target_values if hasattr(self, 'stream') else None
+
+    @target_values.setter
+    def target_values(self, values):
+        pass  # Those of the source stream
+
+    @property
+    def item_dictionary(self):
+        return getattr(self.stream, 'item_dictionary', None)
+
+    def _read_source(self):
+        while self.stream.has_more_samples():
+            X, y = self.stream.next_sample(self.chunk_size)
+            if X is None or len(y) == 0:
+                break
+            yield X, y
+
+    def _read_chunks(self):
+        chunks = self._read_source()
+        for stage in self.stages:
+            chunks = stage(chunks)
+        return chunks
+
+    def _parse(self, chunk):
+        return chunk  # Already split into (X, y) by the source stream
+
+    def is_restartable(self):
+        return self.stream.is_restartable()
+
+    def restart(self):
+        self._stop_reader()
+        self.stream.restart()
+        self._start_reader()
+
+    def close(self):
+        super().close()
+        if hasattr(self.stream, 'close'):
+            self.stream.close()
+
+    def __setstate__(self, state):
+        # The source stream may have been read ahead by the reader: the pipeline restarts from its beginning
+        self.__dict__.update(state)
+        if self._prepared:
+            self.restart()
+
+
+class PipelineStage(object):
+    """ Base class of the stages of a PipelineStream.
+
+    A stage is called with an iterator over the chunks (X, y) of the previous stage, and
+    returns an iterator over its output chunks (usually a generator). Each call starts
+    with a fresh state, so that the stages are restarted with the stream.
+
+    """
+
+    def __call__(self, chunks):
+        raise NotImplementedError
+
+    def get_feature_names(self, feature_names):
+        """ Returns the names of the output features, given the names of the input features. """
+        return feature_names
+
+
+class EventTypeFilter(PipelineStage):
+    """ Keeps the events of the given types only.
+
+    Unlike rec_triggers in EvaluatePrequential, which only restricts the evaluated events,
+    the other events are dropped altogether (neither evaluated, nor used for training).
+
+    Parameters
+    ----------
+    event_column_index: int
+        The index of the column that contains the event types.
+
+    event_types: list
+        The event types to keep.
+
+    """
+
+    def __init__(self, event_column_index, event_types):
+        self.event_column_index = event_column_index
+        self.event_types = event_types
+
+    def __call__(self, chunks):
+        for X, y in chunks:
+            mask = np.isin(X[:, self.event_column_index], self.event_types)
+            if mask.any():
+                yield X[mask], y[mask]
+
+
+class ColumnProjection(PipelineStage):
+    """ Keeps the given feature columns only, in the given order.
+
+    Parameters
+    ----------
+    columns: list
+        The indices of the feature columns to keep.
+
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+
+    def __call__(self, chunks):
+        for X, y in chunks:
+            yield X[:, self.columns], y
+
+    def get_feature_names(self, feature_names):
+        return [feature_names[i] for i in self.columns]
+
+
+class ConsecutiveDuplicateFilter(PipelineStage):
+    """ Collapses the consecutive events of a session on the same item (e.g. repeated clicks) into one.
+
+    Parameters
+    ----------
+    session_column_index: int
+        The index of the column that contains the session identifiers.
+
+    max_sessions: int (Default=100000)
+        The maximum number of sessions whose last item is kept. Beyond that, the least
+        recently active ones are forgotten.
+
+    Notes
+    -----
+    The last item of each session is kept from one chunk to the next, for the `max_sessions`
+    most recently active sessions: the first event of a forgotten session that continues
+    is never collapsed.
+
+    """
+
+    def __init__(self, session_column_index, max_sessions=100000):
+        self.session_column_index = session_column_index
+        self.max_sessions = max_sessions
+
+    def __call__(self, chunks):
+        last_items = {}  # Session -> last item, least recently active first
+        for X, y in chunks:
+            sessions = X[:, self.session_column_index]
+            order = np.argsort(sessions, kind='stable')
+            sorted_sessions, sorted_items = sessions[order], y[order]
+            first = np.ones(len(order), dtype=bool)  # First event of its session in the chunk
+            first[1:] = sorted_sessions[1:] != sorted_sessions[:-1]
+            duplicate = np.zeros(len(order), dtype=bool)
+            duplicate[1:] = ~first[1:] & (sorted_items[1:] == sorted_items[:-1])
+            first_idx = np.flatnonzero(first)
+            duplicate[first_idx] = [last_items.get(session, _MISSING) == item for session, item in
+                                    zip(sorted_sessions[first_idx].tolist(), sorted_items[first_idx].tolist())]
+            last = np.append(first[1:], True)  # Last event of its session in the chunk
+            for session, item in zip(sorted_sessions[last].tolist(), sorted_items[last].tolist()):
+                last_items.pop(session, None)  # Re-inserted as the most recently active session
+                last_items[session] = item
+            while len(last_items) > self.max_sessions:
+                del last_items[next(iter(last_items))]
+            keep = np.empty(len(order), dtype=bool)
+            keep[order] = ~duplicate
+            if keep.any():
+                yield X[keep], y[keep]
+
+
+class MinSessionLength(PipelineStage):
+    """ Drops the sessions with less than `min_length` events.
+
+    Since sessions are not known in advance, the events of a session are held back until
+    the session reaches `min_length` events. They are then released, before the other events
+    of the chunk in which the session reached that length.
+
+    Parameters
+    ----------
+    session_column_index: int
+        The index of the column that contains the session identifiers.
+
+    min_length: int
+        The minimum number of events of a session.
+
+    max_pending: int (Default=100000)
+        The maximum number of sessions held back. Beyond that, the oldest ones are dropped
+        (and start again from zero events if they continue).
+
+    max_released: int (Default=100000)
+        The maximum number of released sessions remembered. Beyond that, the least recently
+        active ones are forgotten: if they continue, their events are counted again from zero
+        (and held back until they reach `min_length` events).
+
+    """
+
+    def __init__(self, session_column_index, min_length, max_pending=100000, max_released=100000):
+        self.session_column_index = session_column_index
+        self.min_length = min_length
+        self.max_pending = max_pending
+        self.max_released = max_released
+
+    def __call__(self, chunks):
+        released = {}  # Sessions with at least min_length events, least recently active first (values unused)
+        pending = {}  # Session -> [number of events, list of held-back (X, y) parts]
+        for X, y in chunks:
+            sessions, inverse, counts = np.unique(X[:, self.session_column_index], return_inverse=True,
+                                                  return_counts=True)
+            inverse = inverse.ravel()
+            previous = np.empty(len(sessions), dtype=np.int64)
+            for k, session in enumerate(sessions.tolist()):
+                if released.pop(session, False):
+                    released[session] = True  # Re-inserted as the most recently active session
+                    previous[k] = self.min_length
+                else:
+                    previous[k] = pending.get(session, (0,))[0]
+            total = previous + counts
+
+            # Held-back events of the sessions reaching min_length in this chunk
+            parts = []
+            for k in np.flatnonzero((total >= self.min_length) & (previous < self.min_length)):
+                session = sessions[k].item()
+                released[session] = True
+                if previous[k] > 0:
+                    parts.extend(pending.pop(session)[1])
+            while len(released) > self.max_released:
+                del released[next(iter(released))]
+
+            # Events of the sessions that are still too short
+            short = np.flatnonzero(total < self.min_length)
+            if len(short) > 0:
+                order = np.argsort(inverse, kind='stable')
+                ends = np.cumsum(counts)
+                for k in short:
+                    rows = order[ends[k] - counts[k]:ends[k]]
+                    session = sessions[k].item()
+                    entry = pending.pop(session, [0, []])  # Re-inserted as the most recent session
+                    entry[0] = total[k]
+                    entry[1].append((X[rows], y[rows]))
+                    pending[session] = entry
+                while len(pending) > self.max_pending:
+                    del pending[next(iter(pending))]
+
+            keep = (total >= self.min_length)[inverse]
+            parts.append((X[keep], y[keep]))
+            X_out = np.concatenate([part[0] for part in parts])
+            if len(X_out) > 0:
+                yield X_out, np.concatenate([part[1] for part in parts])
+
@@ -0,0 +1,206 @@
+import threading
+from queue import Queue, Full, Empty
+import numpy as np
+from skmultiflow.data.base_stream import Stream
+from streams.timestamps import decode_times
+
+
+class PrefetchingStream(Stream):
+    """ Base class of the streams parsed into chunks by a background reader thread.
+
+    The reader thread parses the chunks yielded by _read_chunks() (DataFrames with
+    the feature and target columns), and puts them into a bounded queue of at most
+    `prefetch` chunks, ahead of the evaluation. When the queue is full, the reader
+    waits for the evaluation to catch up.
+
+    Parameters
+    ----------
+    target_idx: int (Default=-1)
+        The index of the column that contains the items (targets).
+
+    time_idx: int (Default=None)
+        The index of the column that contains the timestamps. If set, they are decoded into int64
+        epoch values (see decode_times()), once per chunk.
+
+    time_unit: str (Default='s')
+        The unit of the epoch values ('s', 'ms', 'us' or 'ns'). Note that the feature matrix only
+        holds nanoseconds exactly with an integer dtype.
+
+    prefetch: int (Default=4)
+        The maximum number of parsed chunks waiting to be consumed.
+
+    dtype: data type (Default=float)
+        The data type of the feature matrix.
+
+    Notes
+    -----
+    Subclasses implement _read_chunks(), set the column attributes in prepare_for_use()
+    and start the reader with _start_reader().
+
+    """
+
+    _END = None  # Marks the end of the data in the queue
+
+    # Whether next_sample() waits for the next chunks to fill the batch (otherwise, it returns the rows already parsed)
+    _fill_batches = True
+
+    def __init__(self, target_idx=-1, time_idx=None, time_unit='s', prefetch=4, dtype=float):
+        super().__init__()
+        self.target_idx = target_idx
+        self.time_idx = time_idx
+        self.time_unit = time_unit
+        self.prefetch = prefetch
+        self.dtype = dtype
+        self._columns = None
+        self._target_column = None
+        self._time_column = None
+        self._queue = None
+        self._reader = None
+        self._stop = None
+        self._chunk = None  # (X, y) of the chunk being consumed
+        self._offset = 0  # Position in the chunk being consumed
+        self._exhausted = False
+
+    def _set_columns(self, columns):
+        """ Sets the column attributes of the stream from the names of the columns of the data. """
+        self._columns = list(columns)
+        self._target_column = self._columns[self.target_idx]
+        self._time_column = None if self.time_idx is None else self._columns[self.time_idx]
+        self.feature_names = [c for c in self._columns if c != self._target_column]
+        self.target_names = [self._target_column]
+        self.n_features = len(self.feature_names)
+        self.n_num_features = self.n_features
+        self.n_targets = 1
+
+    def _read_chunks(self):
+        """ Yields the raw chunks of data, as DataFrames (run by the reader thread). """
+        raise NotImplementedError
+
+    def _parse(self, chunk):
+        """ Splits a chunk into its feature matrix and target vector. """
+        if self._time_column is not None:
+            chunk[self._time_column] = decode_times(chunk[self._time_column].values, unit=self.time_unit)
+        y = chunk[self._target_column].values
+        X = chunk[self.feature_names].to_numpy(dtype=self.dtype)
+        return X, y
+
+    def _start_reader(self, sample_idx=0):
+        """ Stops the current reader, if any, and starts a new one (the next samples come from _read_chunks()). """
+        self._stop_reader()
+        self._queue = Queue(maxsize=self.prefetch)
+        self._stop = threading.Event()
+        self._chunk = None
+        self._offset = 0
+        self._exhausted = False
+        self.sample_idx = sample_idx
+        self.current_sample_x = None
+        self.current_sample_y = None
+        self._reader = threading.Thread(target=self._produce, args=(self._queue, self._stop), daemon=True)
+        self._reader.start()
+
+    def _produce(self, queue, stop):
+        """ Body of the background reader: parses the chunks into the queue, until the end or a stop request. """
+        try:
+            for chunk in self._read_chunks():
+                parsed = self._parse(chunk)
+                if not self._put(queue, stop, parsed):
+                    return
+            self._put(queue, stop, self._END)
+        except BaseException as exc:  # Raised again in the consumer thread
+            self._put(queue, stop, exc)
+
+    @staticmethod
+    def _put(queue, stop, item):
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _next_chunk(self, wait=True):
+        """ Gets the next parsed chunk (waiting for it if `wait`). Returns False at the end of the data,
+        or if no chunk is ready and `wait` is False. """
+        if self._exhausted:
+            return False
+        try:
+            item = self._queue.get(block=wait)
+        except Empty:
+            return False
+        if isinstance(item, BaseException):
+            self._exhausted = True
+            raise item
+        if item is self._END:
+            self._exhausted = True
+            self._chunk = None
+            return False
+        self._chunk = item
+        self._offset = 0
+        return True
+
+    def _has_buffered_rows(self):
+        return self._chunk is not None and self._offset < len(self._chunk[1])
+
+    def next_sample(self, batch_size=1):
+        """ Returns the next `batch_size` samples (fewer at the end of the data).
+
+        Parameters
+        ----------
+        batch_size: int (Default=1)
+            The number of samples to return.
+
+        Returns
+        -------
+        tuple or tuple list
+            Returns the next batch_size samples (X, y), or (None, None) at the end of the data.
+
+        """
+        X_parts, y_parts = [], []
+        n_missing = batch_size
+        while n_missing > 0 and (self._has_buffered_rows() or
+                                 self._next_chunk(wait=self._fill_batches or len(y_parts) == 0)):
+            X, y = self._chunk
+            stop = min(self._offset + n_missing, len(y))
+            X_parts.append(X[self._offset:stop])
+            y_parts.append(y[self._offset:stop])
+            n_missing -= stop - self._offset
+            self._offset = stop
+
+        if len(y_parts) == 0:
+            self.current_sample_x, self.current_sample_y = None, None
+        elif len(y_parts) == 1:
+            self.current_sample_x, self.current_sample_y = X_parts[0], y_parts[0]
+        else:
+            self.current_sample_x, self.current_sample_y = np.concatenate(X_parts), np.concatenate(y_parts)
+        self.sample_idx += batch_size - n_missing
+        return self.current_sample_x, self.current_sample_y
+
+    def has_more_samples(self):
+        while not self._has_buffered_rows():
+            if not self._next_chunk():
+                return False
+        return True
+
+    def n_remaining_samples(self):
+        return -1
+
+    def close(self):
+        """ Stops the background reader. """
+        self._stop_reader()
+
+    def _stop_reader(self):
+        if self._reader is not None:
+            self._stop.set()
+            self._reader.join()
+            self._reader = None
+
+    def __getstate__(self):
+        # The reader thread cannot be pickled (subclasses restart it when unpickled)
+        state = self.__dict__.copy()
+        for key in ['_queue', '_reader', '_stop', '_chunk']:
+            state[key] = None
+        return state
+
+    def get_data_info(self):
+        return self.name
@@ -0,0 +1,206 @@
+import os
+import numpy as np
+import pandas as pd
+from streams.prefetching_stream import PrefetchingStream
+from streams.compressed_file import open_file
+from streams.timestamps import decode_time
+
+
+class SessionFileStream(PrefetchingStream):
+    """ Stream of session events read from a CSV file in chunks.
+
+    Unlike skmultiflow's FileStream, the file is never loaded in full: a background
+    thread reads and parses it chunk by chunk, and keeps at most `prefetch` parsed
+    chunks in a bounded queue, ahead of the evaluation. Memory usage is thus flat,
+    and parsing overlaps with training and testing.
+
+    Compressed files (.gz, .bz2 and .xz) are decompressed on the fly by another
+    background thread, pipelined with parsing (see open_file()).
+
+    Parameters
+    ----------
+    filepath: str
+        Path to the CSV file (with a header line), possibly compressed.
+
+    target_idx: int (Default=-1)
+        The index of the column that contains the items (targets).
+
+    time_idx: int (Default=None)
+        The index of the column that contains the timestamps. If set, they are decoded into
+        int64 epoch values (from ISO-8601 strings or epoch values), once per chunk.
+
+    time_unit: str (Default='s')
+        The unit of the epoch values ('s', 'ms', 'us' or 'ns').
+
+    chunk_size: int (Default=100000)
+        The number of rows parsed at a time.
+
+    prefetch: int (Default=4)
+        The maximum number of parsed chunks waiting to be consumed.
+
+    dtype: data type (Default=float)
+        The data type of the feature matrix.
+
+    Notes
+    -----
+    The number of samples is unknown until the end of the file is reached, so
+    n_remaining_samples() returns -1. Computing target_values requires a scan of the
+    target column: use EvaluatePrequential(open_catalog=True) to skip it.
+
+    seek() and seek_time() move the reader to a byte offset of the file, which is found
+    without parsing the skipped rows (by counting line breaks, or by a binary search on
+    the time column). Fields must not contain quoted line breaks or commas. In compressed
+    files, the skipped data is still decompressed, and seek_time() is a linear scan.
+
+    Examples
+    --------
+    >>> stream = SessionFileStream('events.csv', chunk_size=50000)
+    >>> stream.prepare_for_use()
+    >>> X, y = stream.next_sample(10)
+
+    """
+
+    def __init__(self, filepath, target_idx=-1, time_idx=None, time_unit='s', chunk_size=100000, prefetch=4,
+                 dtype=float):
+        super().__init__(target_idx=target_idx, time_idx=time_idx, time_unit=time_unit, prefetch=prefetch,
+                         dtype=dtype)
+        self.filepath = filepath
+        self.chunk_size = chunk_size
+        self.name = os.path.splitext(os.path.basename(filepath))[0]
+        self._target_values = None
+        self._data_start = 0  # Byte offset of the first row (after the header)
+        self._start = 0  # Byte offset from which the reader parses the file
+        self._start_idx = 0  # Index of the row at that offset
+
+    def prepare_for_use(self):
+        """ Reads the header of the file and starts the background reader. """
+        self._set_columns(pd.read_csv(self.filepath, nrows=0).columns)
+        with open_file(self.filepath) as file:
+            self._data_start = len(file.readline())
+        self.restart()
+
+    @property
+    def target_values(self):
+        """ The unique items of the stream (computed on first access, with a scan of the target column). """
+        if self._target_values is None and self._target_column is not None:
+            values = np.array([])
+            with open_file(self.filepath) as file:
+                for chunk in pd.read_csv(file, usecols=[self._target_column], chunksize=self.chunk_size):
+                    values = np.union1d(values, chunk.iloc[:, 0].values)
+            self._target_values = values.tolist()
+        return self._target_values
+
+    @target_values.setter
+    def target_values(self, values):
+        self._target_values = values
+
+    def _read_chunks(self):
+        """ Yields the raw chunks of the file from the start offset of the reader, as DataFrames. """
+        with open_file(self.filepath) as file:
+            self._skip_to(file, self._start)
+            if file.peek(1):  # pandas fails on empty input
+                yield from pd.read_csv(file, header=None, names=self._columns, chunksize=self.chunk_size)
+
+    def seek(self, sample_idx):
+        """ Moves to the given row of the file (skipped rows are not parsed).
+
+        Parameters
+        ----------
+        sample_idx: int
+            The index of the next sample to return.
+
+        """
+        start, n_rows = self._data_start, 0
+        with open_file(self.filepath) as file:
+            self._skip_to(file, start)
+            while n_rows < sample_idx:
+                block = file.read(1 << 20)
+                if not block:
+                    break
+                n_lines = block.count(b'\n')
+                if n_rows + n_lines >= sample_idx:  # The row starts in this block
+                    position = -1
+                    for _ in range(sample_idx - n_rows):
+                        position = block.index(b'\n', position + 1)
+                    start, n_rows = start + position + 1, sample_idx
+                else:
+                    start, n_rows = start + len(block), n_rows + n_lines
+        self._restart_at(start, n_rows)
+
+    def seek_time(self, timestamp, time_column_index):
+        """ Moves to the first event at or after a timestamp, with a binary search on the file.
+
+        Parameters
+        ----------
+        timestamp: float or str
+            The timestamp to start from (epoch value, or ISO-8601 string).
+
+        time_column_index: int
+            The index of the feature column that contains the timestamps (in ascending order).
+
+        """
+        column = self._columns.index(self.feature_names[time_column_index])
+        timestamp = decode_time(timestamp, unit=self.time_unit)
+        with open_file(self.filepath) as file:
+            if not file.seekable():  # Compressed file
+                low, n_rows = self._data_start, 0
+                self._skip_to(file, low)
+                for line in file:
+                    if line.strip() and decode_time(line.split(b',')[column], unit=self.time_unit) >= timestamp:
+                        break
+                    low, n_rows = low + len(line), n_rows + 1
+                self._restart_at(low, n_rows)
+                return
+            # Invariant: the first row at or after the timestamp starts in [low, high] (both are row starts)
+            low, high = self._data_start, os.fstat(file.fileno()).st_size
+            while low < high:
+                file.seek((low + high) // 2 - 1)
+                file.readline()  # Moves to the first row that starts after the middle
+                start = file.tell() if file.tell() < high else low
+                file.seek(start)
+                line = file.readline()
+                if line.strip() and decode_time(line.split(b',')[column], unit=self.time_unit) < timestamp:
+                    low = start + len(line)
+                else:
+                    high = start
+            n_rows = self._count_lines(file, self._data_start, low)
+        self._restart_at(low, n_rows)
+
+    @staticmethod
+    def _skip_to(file, offset, block_size=1 << 20):
+        """ Moves to a byte offset, by reading and discarding the data if the file is not seekable. """
+        if file.seekable():
+            file.seek(offset)
+        else:
+            while offset > 0:
+                n_bytes = len(file.read(min(offset, block_size)))
+                if n_bytes == 0:
+                    break
+                offset -= n_bytes
+
+    @staticmethod
+    def _count_lines(file, start, stop, block_size=1 << 20):
+        file.seek(start)
+        n_lines = 0
+        while start < stop:
+            block = file.read(min(block_size, stop - start))
+            if not block:
+                break
+            n_lines += block.count(b'\n')
+            start += len(block)
+        return n_lines
+
+    def restart(self):
+        """ Restarts the stream from the beginning of the file. """
+        self._restart_at(self._data_start, 0)
+
+    def _restart_at(self, start, sample_idx):
+        self._start = start
+        self._start_idx = sample_idx
+        self._start_reader(sample_idx)
+
+    def __setstate__(self, state):
+        # The reader is restarted from the last seek position
+        self.__dict__.update(state)
+        if self._target_column is not None:
+            self._restart_at(self._start, self._start_idx)
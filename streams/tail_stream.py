@@ -0,0 +1,187 @@
+import io
+import os
+import stat
+import select
+import socket
+import time
+from timeit import default_timer as timer
+import pandas as pd
+from streams.prefetching_stream import PrefetchingStream
+
+
+class TailStream(PrefetchingStream):
+    """ Stream of the session events appended to a growing CSV file, or received from a socket or a pipe.
+
+    A background thread follows the source, parses the complete lines received so far
+    into a chunk, and puts the chunks into a bounded queue. next_sample() returns at most
+    `batch_size` of the events already received (waiting only if none is), so that the
+    evaluation processes the live events in micro-batches. When `prefetch` chunks are
+    waiting, the reader stops reading the source until the evaluation catches up
+    (backpressure, which a socket propagates to its sender).
+
+    Parameters
+    ----------
+    source: str, tuple or file object
+        | The source of the events, one CSV line per event:
+        | a path to a file, which is followed as it grows (or to a Unix domain socket),
+        | a (host, port) tuple, to connect to a TCP socket,
+        | a file object with a file descriptor, e.g. sys.stdin.buffer or a pipe.
+
+    columns: list (Default=None)
+        The names of the columns. If None, they are read from the first line of the source.
+
+    target_idx: int (Default=-1)
+        The index of the column that contains the items (targets).
+
+    time_idx: int (Default=None)
+        The index of the column that contains the timestamps. If set, they are decoded into
+        int64 epoch values (from ISO-8601 strings or epoch values), once per chunk.
+
+    time_unit: str (Default='s')
+        The unit of the epoch values ('s', 'ms', 'us' or 'ns').
+
+    from_end: bool (Default=False)
+        If True, the events already in the file are skipped (files only).
+
+    idle_timeout: float (Default=None)
+        The stream ends when no event is received during this number of seconds.
+        If None, it only ends when the socket or pipe is closed (never, for a file).
+
+    poll_interval: float (Default=0.2)
+        The number of seconds to wait before checking the source again when no data is available.
+
+    block_size: int (Default=65536)
+        The maximum number of bytes read (and parsed into a chunk) at a time.
+
+    prefetch: int (Default=16)
+        The maximum number of parsed chunks waiting to be consumed.
+
+    dtype: data type (Default=float)
+        The data type of the feature matrix.
+
+    Notes
+    -----
+    The items are not known beforehand: use EvaluatePrequential(open_catalog=True).
+    The stream cannot be restarted, so the evaluation runs in a single process (n_jobs=1),
+    with max_samples and max_time setting how long it lasts.
+
+    Examples
+    --------
+    >>> stream = TailStream('/var/log/clicks.csv', from_end=True)
+    >>> stream.prepare_for_use()
+    >>> evaluator = EvaluatePrequential(session_column_index=0, open_catalog=True, batch_size=100,
+    ...                                 max_samples=float('inf'))
+    >>> evaluator.evaluate(stream=stream, model=[PopularClassifier()])
+
+    """
+
+    _fill_batches = False
+
+    def __init__(self, source, columns=None, target_idx=-1, time_idx=None, time_unit='s', from_end=False,
+                 idle_timeout=None, poll_interval=0.2, block_size=1 << 16, prefetch=16, dtype=float):
+        super().__init__(target_idx=target_idx, time_idx=time_idx, time_unit=time_unit, prefetch=prefetch,
+                         dtype=dtype)
+        self.source = source
+        self.columns = columns
+        self.from_end = from_end
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+        self.block_size = block_size
+        self.name = str(source) if isinstance(source, (str, tuple)) else getattr(source, 'name', 'tail')
+        self._handle = None
+        self._pending = b''  # Data received after the last complete line
+
+    def prepare_for_use(self):
+        """ Opens the source, reads the header line (if `columns` is None) and starts the background reader. """
+        self._open()
+        columns = self.columns
+        if columns is None:
+            header = self._read_line()
+            if header is None:
+                raise ValueError('The source {} ended before its header line.'.format(self.name))
+            columns = [name.strip() for name in header.decode().split(',')]
+        self._set_columns(columns)
+        if self.from_end and self._is_file():
+            self._handle.seek(0, io.SEEK_END)
+            self._pending = b''
+            if self._handle.tell() > 0:  # Skips the end of a partially written line
+                self._handle.seek(-1, io.SEEK_CUR)
+                if self._handle.read(1) != b'\n':
+                    self._read_line()
+        self._start_reader()
+
+    def _open(self):
+        if isinstance(self.source, tuple):
+            self._handle = socket.create_connection(self.source)
+        elif isinstance(self.source, str) and stat.S_ISSOCK(os.stat(self.source).st_mode):
+            self._handle = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._handle.connect(self.source)
+        elif isinstance(self.source, str):
+            self._handle = open(self.source, 'rb')
+        else:
+            self._handle = self.source
+
+    def _is_file(self):
+        return isinstance(self.source, str) and not isinstance(self._handle, socket.socket)
+
+    def _read(self):
+        """ Returns the data available in the source (empty if there is none yet), or None at its end. """
+        if self._is_file():
+            return self._handle.read(self.block_size)
+        ready, _, _ = select.select([self._handle], [], [], self.poll_interval)
+        if not ready:
+            return b''
+        if isinstance(self._handle, socket.socket):
+            data = self._handle.recv(self.block_size)
+        else:
+            data = os.read(self._handle.fileno(), self.block_size)
+        return data if data else None
+
+    def _read_line(self):
+        """ Waits for the next complete line of the source (None at its end). """
+        while b'\n' not in self._pending:
+            data = self._read()
+            if data is None:
+                return None
+            if not data and self._is_file():
+                time.sleep(self.poll_interval)
+            self._pending += data
+        line, self._pending = self._pending.split(b'\n', 1)
+        return line
+
+    def _read_chunks(self):
+        """ Yields the complete lines received from the source, as DataFrames, until its end or the idle timeout. """
+        last_data_time = timer()
+        while not self._stop.is_set():
+            data = self._read()
+            if data is None:
+                break
+            if not data:
+                if self.idle_timeout is not None and timer() - last_data_time > self.idle_timeout:
+                    break
+                if self._is_file():
+                    self._stop.wait(self.poll_interval)
+                continue
+            last_data_time = timer()
+            self._pending += data
+            end = self._pending.rfind(b'\n') + 1
+            if end > 0:
+                lines, self._pending = self._pending[:end], self._pending[end:]
+                if lines.strip():
+                    yield pd.read_csv(io.BytesIO(lines), header=None, names=self._columns)
+        if self._pending.strip() and not self._stop.is_set():  # Last line, without line break
+            yield pd.read_csv(io.BytesIO(self._pending), header=None, names=self._columns)
+        self._pending = b''
+
+    def is_restartable(self):
+        return False
+
+    def restart(self):
+        raise NotImplementedError('{} cannot be restarted.'.format(type(self).__name__))
+
+    def close(self):
+        """ Stops the background reader and closes the source. """
+        super().close()
+        if self._handle is not None and self._handle is not self.source:
+            self._handle.close()
+            self._handle = None
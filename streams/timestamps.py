@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+TIME_UNITS = ('s', 'ms', 'us', 'ns')
+
+
+def decode_times(values, unit='s'):
+    """ Decodes timestamps into int64 epoch values, in bulk.
+
+    Parameters
+    ----------
+    values: array-like
+        The timestamps: ISO-8601 strings (UTC unless they have an offset), datetimes,
+        or epoch values (already in `unit`, truncated to integers).
+
+    unit: str (Default='s')
+        The unit of the epoch values: 's', 'ms', 'us' or 'ns'.
+
+    Returns
+    -------
+    numpy.ndarray
+        The int64 epoch values.
+
+    Examples
+    --------
+    >>> decode_times(['2019-03-01T10:00:00', '2019-03-01T10:00:30+00:00'])
+    array([1551434400, 1551434430])
+
+    """
+    if unit not in TIME_UNITS:
+        raise ValueError('Unsupported time unit: {} (expected one of {}).'.format(unit, TIME_UNITS))
+    values = np.asarray(values)
+    if values.dtype.kind in 'iub':
+        return values.astype(np.int64)
+    if values.dtype.kind == 'f':
+        return np.floor(values).astype(np.int64)
+    if values.dtype.kind != 'M':
+        values = pd.to_datetime(values, utc=True).tz_convert(None).values
+    return values.astype('datetime64[{}]'.format(unit)).astype(np.int64)
+
+
+def decode_time(value, unit='s'):
+    """ Decodes a single timestamp (epoch value, possibly as a string, or ISO-8601 string) into an epoch value. """
+    if isinstance(value, bytes):
+        value = value.decode()
+    if isinstance(value, str):
+        value = value.strip().strip('"')
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return decode_times([value], unit=unit)[0]
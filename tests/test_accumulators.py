@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from utils.data_structures import GroupedAccumulator, WindowAccumulator
+
+
+def _rows(n_rows, seed=0):
+    random = np.random.RandomState(seed)
+    return np.column_stack([random.randint(2, size=n_rows), random.rand(n_rows)])
+
+
+def test_window_sums_after_wraparound():
+    window = WindowAccumulator(5, width=2)
+    rows = _rows(8)
+    for row in rows:
+        window.add_element(row)
+
+    assert window.get_current_size() == 5 and window.is_full()
+    np.testing.assert_allclose(window.get_sums(), rows[3:].sum(axis=0))
+    assert window.get_sum(1) == pytest.approx(rows[3:, 1].sum())
+
+
+def test_window_sums_are_recomputed_after_max_size_evictions():
+    window = WindowAccumulator(5, width=2)
+    window._sums += 1e-3  # Drift, dropped when the sums are recomputed from the buffer
+    rows = _rows(10)
+    for row in rows:
+        window.add_element(row)
+
+    np.testing.assert_allclose(window.get_sums(), rows[5:].sum(axis=0))
+    window.add_element(rows[0])
+    np.testing.assert_allclose(window.get_sums(), rows[6:].sum(axis=0) + rows[0])
+
+
+@pytest.mark.parametrize('batch_sizes', [[3, 1, 4, 2, 7], [12], [2, 9, 1, 1, 6], [4, 4, 4, 4, 4, 4, 4]])
+def test_window_batches_match_single_rows(batch_sizes):
+    rows = _rows(sum(batch_sizes))
+    window = WindowAccumulator(5, width=2)
+    start = 0
+    for batch_size in batch_sizes:
+        window.add_elements(rows[start:start + batch_size])
+        start += batch_size
+        np.testing.assert_allclose(window.get_sums(), rows[max(start - 5, 0):start].sum(axis=0))
+        assert window.get_current_size() == min(start, 5)
+
+    for row in rows[:3]:  # Single rows after batches
+        window.add_element(row)
+    np.testing.assert_allclose(window.get_sums(), np.concatenate((rows[start - 2:], rows[:3])).sum(axis=0))
+
+
+def test_window_clear():
+    window = WindowAccumulator(3)
+    window.add_elements(np.ones((4, 1)))
+    window.clear()
+    window.add_element([2.0])
+
+    assert window.get_current_size() == 1
+    np.testing.assert_array_equal(window.get_sums(), [2.0])
+
+
+def test_grouped_sums_grow_with_the_group_ids():
+    groups = GroupedAccumulator(width=2, n_groups=2)
+    groups.add_element(1, [1.0, 0.5])
+    groups.add_elements(np.array([0, 5, 1, 5]), np.array([[1, 1.0], [0, 0.0], [1, 0.25], [1, 0.5]]))
+    groups.add_element(3, [2.0, 1.5], count=3)
+
+    assert groups.get_n_groups() == 6
+    np.testing.assert_array_equal(groups.get_counts(), [1, 2, 0, 3, 0, 2])
+    np.testing.assert_array_equal(groups.get_sums(), [[1, 1.0], [2, 0.75], [0, 0], [2, 1.5], [0, 0], [1, 0.5]])
+
+    groups.clear()
+    groups.add_elements(np.array([], dtype=np.int64), np.empty((0, 2)))
+    assert groups.get_n_groups() == 0
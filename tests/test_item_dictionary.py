@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from utils.data_structures import ItemDictionary
+
+
+def test_closed_catalog_round_trip():
+    items = ItemDictionary([30, 10, 20, 10])
+
+    np.testing.assert_array_equal(items.items, [10, 20, 30])
+    codes = items.encode([[20, 30], [10, 20]])
+    np.testing.assert_array_equal(codes, [[1, 2], [0, 1]])
+    np.testing.assert_array_equal(items.decode(codes), [[20, 30], [10, 20]])
+    assert 30 in items and 25 not in items
+    assert len(items) == 3
+
+
+def test_closed_catalog_rejects_unknown_items():
+    items = ItemDictionary([1, 2])
+    with pytest.raises(KeyError):
+        items.encode([1, 3])
+    assert len(items) == 2
+
+
+def test_open_catalog_indexes_items_by_first_appearance():
+    items = ItemDictionary(allow_new=True)
+    codes = items.encode([30, 10, 30, 20])
+
+    np.testing.assert_array_equal(codes, [0, 1, 0, 2])
+    np.testing.assert_array_equal(items.decode(codes), [30, 10, 30, 20])
+    assert items._recent == {30: 0, 10: 1, 20: 2}  # Not merged yet
+    assert 10 in items and 40 not in items
+
+
+def test_open_catalog_extends_known_items():
+    items = ItemDictionary(['b', 'a'], allow_new=True)
+    codes = items.encode(['c', 'a', 'a_long_identifier', 'c'])
+
+    np.testing.assert_array_equal(codes, [2, 0, 3, 2])
+    np.testing.assert_array_equal(items.decode([3, 1]), ['a_long_identifier', 'b'])
+
+
+def test_open_catalog_merges_recent_items():
+    items = ItemDictionary(allow_new=True)
+    stream = np.random.RandomState(0).permutation(5000)
+    codes = np.concatenate([items.encode(stream[start:start + 100]) for start in range(0, 5000, 100)])
+
+    assert len(items._recent) < len(items)  # Recent items were merged into the sorted arrays
+    np.testing.assert_array_equal(codes, np.arange(5000))
+    np.testing.assert_array_equal(items.encode(stream), np.arange(5000))
+    np.testing.assert_array_equal(items.decode(np.arange(5000)), stream)
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+import utils.constants as constants
+from metrics import ClassificationMeasurements, SegmentedMeasurements
+
+
+def _results(n_sessions=30, seed=0):
+    """Random results of consecutive sessions (session, true item, top-5 predicted items)."""
+    random = np.random.RandomState(seed)
+    results = []
+    for session in range(n_sessions):
+        for _ in range(random.randint(1, 8)):
+            results.append((session, random.randint(10), random.permutation(10)[:5]))
+    return results
+
+
+def _margins(measurements, results):
+    for session, y_true, y_pred in results:
+        measurements.add_result(y_true, y_pred, session=session)
+    return measurements.get_recall_margin(), measurements.get_mrr_margin()
+
+
+def _session_margins(results, mean_column):
+    """Margin of error of a ratio estimator over the sessions, computed directly from the results."""
+    sessions = sorted(set(result[0] for result in results))
+    values = np.zeros((len(sessions), 3))
+    for session, y_true, y_pred in results:
+        rank = np.flatnonzero(y_pred == y_true)
+        values[sessions.index(session)] += [len(rank), 1 / (rank[0] + 1) if len(rank) else 0.0, 1]
+    mean = values[:, mean_column].sum() / values[:, 2].sum()
+    residuals = values[:, mean_column] - mean * values[:, 2]
+    n = len(sessions)
+    return 1.96 * np.sqrt(n / (n - 1) * np.dot(residuals, residuals)) / values[:, 2].sum()
+
+
+def test_session_margins():
+    results = _results()
+    recall_margin, mrr_margin = _margins(ClassificationMeasurements(rec_size=5), results)
+
+    assert recall_margin == pytest.approx(_session_margins(results, 0))
+    assert mrr_margin == pytest.approx(_session_margins(results, 1))
+
+
+def test_folded_sessions_give_the_same_margins():
+    results = _results()
+    measurements = ClassificationMeasurements(rec_size=5, max_sessions=3)
+    margins = _margins(measurements, results)
+
+    assert len(measurements.session_totals) == 3
+    assert measurements.n_folded_sessions == 27
+    assert margins == pytest.approx(_margins(ClassificationMeasurements(rec_size=5), results))
+
+
+def test_batch_results_are_totaled_per_session():
+    results = _results()
+    measurements = ClassificationMeasurements(rec_size=5, max_sessions=4)
+    sessions, y_true, y_pred = zip(*results)
+    for start in range(0, len(results), 16):
+        stop = start + 16
+        measurements.add_results(np.array(y_true[start:stop]), np.array(y_pred[start:stop]),
+                                 sessions=np.array(sessions[start:stop]))
+
+    margins = measurements.get_recall_margin(), measurements.get_mrr_margin()
+    assert margins == pytest.approx(_margins(ClassificationMeasurements(rec_size=5), results))
+
+
+def _segment_results(measurements, segment, **kwargs):
+    return {label: (n_events, recall, mrr) for kind, label, n_events, recall, mrr in measurements.get_results(**kwargs)
+            if kind == segment}
+
+
+def test_segments_by_event_type_accept_any_number():
+    measurements = SegmentedMeasurements([constants.SEGMENT_EVENT_TYPE], rec_size=2)
+    y_pred = np.array([[1, 2], [1, 2], [1, 2], [1, 2]])
+    measurements.add_results(np.array([1, 2, 3, 1]), y_pred, event_types=np.array([-1.0, 300.0, -1.0, 0.0]))
+    measurements.add_results(np.array([2]), y_pred[:1], event_types=np.array([300.0]))
+
+    assert list(_segment_results(measurements, constants.SEGMENT_EVENT_TYPE)) == ['-1', '0', '300']
+    assert _segment_results(measurements, constants.SEGMENT_EVENT_TYPE)['-1'] == (2, 0.5, 0.5)
+    assert _segment_results(measurements, constants.SEGMENT_EVENT_TYPE)['300'] == (2, 1.0, 0.5)
+
+
+def test_segments_by_session_length():
+    # Session 1 has 3 events (2 evaluated), session 2 has 6 (5 evaluated), session 3 is still at its second event
+    results = [(1, 2, 1), (2, 2, 0), (1, 3, 1), (2, 3, 1), (2, 4, 1), (2, 5, 0), (3, 2, 1), (2, 6, 1)]
+    sessions, positions, hits = (np.array(values) for values in zip(*results))
+    y_pred = np.column_stack([np.where(hits == 1, 7, 8), np.full(len(hits), 9)])
+    lengths = {1: 3, 2: 6, 3: 2}
+
+    for max_sessions in [100, 2]:  # Session 1 is folded once session 3 starts, when at most 2 are kept
+        measurements = SegmentedMeasurements([constants.SEGMENT_SESSION_LENGTH], rec_size=2,
+                                             max_sessions=max_sessions)
+        for start in range(0, len(results), 3):
+            measurements.add_results(np.full(len(results[start:start + 3]), 7), y_pred[start:start + 3],
+                                     positions=positions[start:start + 3], sessions=sessions[start:start + 3])
+        expected = {'2': (1, 1.0, 1.0), '3': (2, 1.0, 1.0), '6-10': (5, 0.6, 0.6)}
+        assert _segment_results(measurements, constants.SEGMENT_SESSION_LENGTH, session_lengths=lengths) == expected
+        assert len(measurements.session_totals) == min(max_sessions, 3)
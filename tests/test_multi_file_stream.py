@@ -0,0 +1,83 @@
+import gzip
+
+import numpy as np
+import pytest
+
+from streams import MultiFileStream
+
+
+def _write_day(path, first_item, n_rows):
+    lines = ['session,time,item'] + ['{},{},{}'.format(item // 3, 10 * item, item)
+                                     for item in range(first_item, first_item + n_rows)]
+    data = ('\n'.join(lines) + '\n').encode()
+    if str(path).endswith('.gz'):
+        with gzip.open(str(path), 'wb') as file:
+            file.write(data)
+    else:
+        path.write_bytes(data)
+
+
+@pytest.fixture
+def days(tmp_path):
+    # Files of different sizes (later files may be parsed first), one of them empty and one compressed
+    sizes = [40, 3, 0, 25, 1, 12]
+    first_items = np.cumsum([0] + sizes[:-1])
+    for day, (first_item, n_rows) in enumerate(zip(first_items, sizes)):
+        _write_day(tmp_path / 'day{}.csv{}'.format(day, '.gz' if day == 3 else ''), first_item, n_rows)
+    return tmp_path, sum(sizes)
+
+
+def _read_all(stream, batch_size):
+    X_parts, y_parts = [], []
+    while stream.has_more_samples():
+        X, y = stream.next_sample(batch_size)
+        X_parts.append(X)
+        y_parts.append(y)
+    return np.concatenate(X_parts), np.concatenate(y_parts)
+
+
+@pytest.mark.parametrize('n_workers, batch_size', [(1, 1), (2, 7), (3, 100)])
+def test_files_are_read_in_order(days, n_workers, batch_size):
+    directory, n_rows = days
+    stream = MultiFileStream(str(directory / 'day*'), n_workers=n_workers, prefetch=1)
+    stream.prepare_for_use()
+    X, y = _read_all(stream, batch_size)
+
+    np.testing.assert_array_equal(y, np.arange(n_rows))
+    np.testing.assert_array_equal(X, np.column_stack([np.arange(n_rows) // 3, 10 * np.arange(n_rows)]))
+    assert stream.sample_idx == n_rows
+    stream.close()
+
+
+def test_files_are_read_in_the_given_order(days):
+    directory, _ = days
+    stream = MultiFileStream([str(directory / 'day4.csv'), str(directory / 'day1.csv')])
+    stream.prepare_for_use()
+
+    np.testing.assert_array_equal(_read_all(stream, 2)[1], [68, 40, 41, 42])
+    stream.close()
+
+
+def test_close_before_the_end(days):
+    directory, _ = days
+    stream = MultiFileStream(str(directory / 'day*'), n_workers=2, prefetch=1)
+    stream.prepare_for_use()
+    stream.next_sample(5)
+    reader = stream._reader
+
+    stream.close()
+    assert not reader.is_alive()
+    stream.restart()
+    np.testing.assert_array_equal(stream.next_sample(3)[1], [0, 1, 2])
+    stream.close()
+
+
+def test_files_with_other_columns_are_rejected(days):
+    directory, _ = days
+    (directory / 'day9.csv').write_bytes(b'session,item\n1,2\n')
+    stream = MultiFileStream(str(directory / 'day*'))
+    stream.prepare_for_use()
+
+    with pytest.raises(ValueError):
+        _read_all(stream, 10)
+    stream.close()
@@ -0,0 +1,54 @@
+import numpy as np
+
+from streams import ConsecutiveDuplicateFilter, MinSessionLength
+
+
+def _chunks(sessions, items, chunk_size):
+    X = np.column_stack([sessions, np.arange(len(sessions))]).astype(float)
+    y = np.asarray(items)
+    return [(X[start:start + chunk_size], y[start:start + chunk_size]) for start in range(0, len(y), chunk_size)]
+
+
+def _run(stage, sessions, items, chunk_size=3):
+    parts = list(stage(_chunks(sessions, items, chunk_size)))
+    if not parts:
+        return [], []
+    events = np.concatenate([X[:, 1] for X, _ in parts]).astype(int)
+    return events.tolist(), np.concatenate([y for _, y in parts]).tolist()
+
+
+def test_consecutive_duplicates_are_collapsed_across_chunks():
+    sessions = [1, 1, 2, 1, 2, 2, 1, 2]
+    items = [5, 5, 7, 5, 7, 8, 6, 8]
+    events, kept = _run(ConsecutiveDuplicateFilter(session_column_index=0), sessions, items)
+
+    assert events == [0, 2, 5, 6]
+    assert kept == [5, 7, 8, 6]
+
+
+def test_duplicate_filter_forgets_the_least_recently_active_sessions():
+    sessions = [1, 2, 3, 1, 3, 2]
+    items = [5, 6, 7, 5, 7, 6]
+    stage = ConsecutiveDuplicateFilter(session_column_index=0, max_sessions=2)
+
+    # Session 1 is forgotten when session 3 starts, then session 2 when session 1 continues
+    assert _run(stage, sessions, items, chunk_size=1)[0] == [0, 1, 2, 3, 5]
+    assert _run(ConsecutiveDuplicateFilter(session_column_index=0), sessions, items)[0] == [0, 1, 2]
+
+
+def test_short_sessions_are_held_back_then_released():
+    sessions = [1, 2, 1, 3, 2, 2, 4, 1]
+    events, _ = _run(MinSessionLength(session_column_index=0, min_length=2), sessions, list(range(8)))
+
+    # Session 1 reaches 2 events in the first chunk, session 2 in the second one; 3 and 4 never do
+    assert events == [0, 2, 1, 4, 5, 7]
+
+
+def test_released_sessions_are_forgotten_beyond_the_limit():
+    sessions = [1, 1, 2, 2, 3, 3, 1, 2, 1]
+    stage = MinSessionLength(session_column_index=0, min_length=2, max_released=2)
+
+    # Session 1 is forgotten when session 3 is released: its next event is held back until it has two again
+    assert _run(stage, sessions, list(range(9)), chunk_size=2)[0] == [0, 1, 2, 3, 4, 5, 7, 6, 8]
+    stage = MinSessionLength(session_column_index=0, min_length=2)
+    assert _run(stage, sessions, list(range(9)), chunk_size=2)[0] == [0, 1, 2, 3, 4, 5, 6, 7, 8]
@@ -0,0 +1,149 @@
+import numpy as np
+import pytest
+
+from utils.data_structures import RingInstanceWindow
+
+
+def _sample(session, time, item):
+    return np.array([[session, time, 0]], dtype=float), np.array([item])
+
+
+def _window(**kwargs):
+    kwargs.setdefault('max_size', 4)
+    return RingInstanceWindow(columns={0: np.int64, 1: np.float64, 2: np.int8}, target_dtype=np.int32, **kwargs)
+
+
+def test_wraparound_keeps_chronological_order():
+    window = _window()
+    for t in range(10):
+        window.add_element(*_sample(t % 3, t, 100 + t))
+
+    assert window.n_samples == 4
+    np.testing.assert_array_equal(window.get_column(1), [6, 7, 8, 9])
+    np.testing.assert_array_equal(window.get_targets_matrix().ravel(), [106, 107, 108, 109])
+    np.testing.assert_array_equal(window.get_attributes_matrix()[:, 0], [0, 1, 2, 0])
+
+
+def test_delete_element_removes_the_oldest_sample():
+    window = _window()
+    for t in range(6):
+        window.add_element(*_sample(0, t, t))
+    window.delete_element()
+    window.add_element(*_sample(0, 6, 6))
+
+    np.testing.assert_array_equal(window.get_targets_matrix().ravel(), [3, 4, 5, 6])
+
+
+def test_window_without_maximum_size_grows_after_wraparound():
+    window = _window(max_size=None, max_age=1500, time_column=1)
+    for t in range(3000):
+        window.add_element(*_sample(t % 7, t, t))
+
+    assert window.n_samples == 1501
+    np.testing.assert_array_equal(window.get_targets_matrix().ravel(), np.arange(1499, 3000))
+
+
+def test_session_index_follows_evictions():
+    window = _window(index_column=0)
+    for t, session in enumerate([1, 2, 1, 3, 1, 2]):
+        window.add_element(*_sample(session, t, 100 + t))
+
+    # Events 0 (session 1) and 1 (session 2) were overwritten
+    X, y = window.get_slice(1, feature_index=0)
+    np.testing.assert_array_equal(y.ravel(), [102, 104])
+    np.testing.assert_array_equal(X[:, 1], [2, 4])
+    np.testing.assert_array_equal(window.get_slice(2, feature_index=0)[1].ravel(), [105])
+    assert window.contains(3)
+
+    window.delete_element()  # Event 2, session 1
+    window.delete_element()  # Event 3, session 3
+    assert not window.contains(3)
+    np.testing.assert_array_equal(window.get_slice(1, feature_index=0)[1].ravel(), [104])
+    assert len(window.get_slice(3, feature_index=0)[1]) == 0
+
+
+def test_session_index_matches_scan_after_growing():
+    window = _window(max_size=None, index_column=0, max_age=1500, time_column=1)
+    for t in range(2000):
+        window.add_element(*_sample(t % 5, t, t))
+
+    for session in range(5):
+        indexed = window.get_slice(session, feature_index=0)[1].ravel()
+        scanned = window.get_slice([session], feature_index=0)[1].ravel()  # Searches the column
+        np.testing.assert_array_equal(indexed, scanned)
+        np.testing.assert_array_equal(indexed, [t for t in range(499, 2000) if t % 5 == session])
+
+
+def test_subscribers_are_notified_of_evictions_oldest_first():
+    window = _window(max_size=3, index_column=0, target_encoder=lambda target: target - 100)
+    evictions = []
+    window.subscribe(lambda X, key, item: evictions.append((X[1], key, item, window.n_samples)))
+    for t, session in enumerate([1, 2, 1, 3, 2]):
+        window.add_element(*_sample(session, t, 100 + t))
+    window.delete_element()
+
+    # Overwritten samples are notified after the new sample was inserted, deleted ones after their removal
+    assert evictions == [(0, 1, 0, 3), (1, 2, 1, 3), (2, 1, 2, 2)]
+
+
+def test_make_room_evicts_before_a_batch_is_added():
+    window = _window(max_size=4, index_column=0)
+    evicted = []
+    window.subscribe(lambda X, key, item: evicted.append(item))
+    window.make_room(3)  # Empty window
+    for t in range(4):
+        window.add_element(*_sample(0, t, t))
+    window.make_room(2)
+
+    assert evicted == [0, 1]
+    assert window.n_samples == 2
+    for t in range(4, 6):
+        window.add_element(*_sample(0, t, t))
+    assert evicted == [0, 1]
+    np.testing.assert_array_equal(window.get_targets_matrix().ravel(), [2, 3, 4, 5])
+
+
+def test_expired_samples_are_notified_in_order():
+    window = _window(max_size=None, index_column=0, max_age=10, time_column=1)
+    evicted = []
+    window.subscribe(lambda X, key, item: evicted.append((X[1], item)))
+    for time in [0, 2.5, 4, 11, 12.75]:
+        window.add_element(*_sample(0, time, int(time)))
+    window.add_element(*_sample(0, 16, 16))
+
+    assert evicted == [(0, 0), (2.5, 2), (4, 4)]
+    np.testing.assert_array_equal(window.get_column(1), [11, 12.75, 16])
+
+
+def test_unsubscribed_callbacks_are_not_notified():
+    window = _window(max_size=1)
+    evicted = []
+
+    def callback(X, key, item):
+        evicted.append(item)
+
+    window.subscribe(callback)
+    window.add_element(*_sample(0, 0, 0))
+    window.add_element(*_sample(0, 1, 1))
+    window.unsubscribe(callback)
+    window.add_element(*_sample(0, 2, 2))
+
+    assert evicted == [0]
+
+
+def test_typed_columns_keep_fractional_timestamps():
+    window = _window()
+    window.add_element(np.array([[7, 1500000000.25, -3]]), np.array([1]))
+
+    assert window.get_column(0).dtype == np.int64
+    assert window.get_column(2).dtype == np.int8
+    np.testing.assert_array_equal(window.get_attributes_matrix(), [[7, 1500000000.25, -3]])
+
+
+@pytest.mark.parametrize('sample', [[1, 0, 128], [1, 0, -129], [1.5, 0, 0], [1, 0, np.nan]])
+def test_values_that_do_not_fit_their_column_are_rejected(sample):
+    window = _window()
+    window.add_element(*_sample(0, 0, 0))
+    with pytest.raises(ValueError):
+        window.add_element(np.array([sample], dtype=float), np.array([1]))
+    assert window.n_samples == 1
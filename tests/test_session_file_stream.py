@@ -0,0 +1,124 @@
+import gzip
+
+import numpy as np
+import pytest
+
+from streams import SessionFileStream
+
+N_ROWS = 50
+
+
+def _write_events(path, times):
+    lines = ['session,time,event,item'] + ['{},{},0,{}'.format(i // 5, time, 100 + i) for i, time in enumerate(times)]
+    data = ('\n'.join(lines) + '\n').encode()
+    if str(path).endswith('.gz'):
+        with gzip.open(str(path), 'wb') as file:
+            file.write(data)
+    else:
+        path.write_bytes(data)
+    return str(path)
+
+
+@pytest.fixture(params=['events.csv', 'events.csv.gz'])
+def events(request, tmp_path):
+    # Timestamps in ascending order, each one shared by two consecutive rows
+    return _write_events(tmp_path / request.param, [1000 + 10 * (i // 2) for i in range(N_ROWS)])
+
+
+def _stream(filepath, **kwargs):
+    kwargs.setdefault('chunk_size', 7)
+    stream = SessionFileStream(filepath, **kwargs)
+    stream.prepare_for_use()
+    return stream
+
+
+def _read_all(stream, batch_size=4):
+    items = []
+    while stream.has_more_samples():
+        X, y = stream.next_sample(batch_size)
+        items.extend(y)
+    return items
+
+
+def test_batches_span_chunks_in_order(events):
+    stream = _stream(events, prefetch=1)
+    X, y = stream.next_sample(10)  # Spans two chunks
+
+    assert X.shape == (10, 3)
+    np.testing.assert_array_equal(y, np.arange(100, 110))
+    np.testing.assert_array_equal(X[:, 1], [1000, 1000, 1010, 1010, 1020, 1020, 1030, 1030, 1040, 1040])
+    assert stream.sample_idx == 10
+    assert _read_all(stream) == list(range(110, 100 + N_ROWS))
+    assert stream.next_sample(3) == (None, None)
+    stream.close()
+
+
+def test_close_stops_a_blocked_reader(events):
+    stream = _stream(events, prefetch=1, chunk_size=2)
+    stream.next_sample()
+    reader = stream._reader
+    reader.join(0.2)  # The reader waits for room in the full queue
+    assert reader.is_alive()
+
+    stream.close()
+    assert not reader.is_alive()
+    stream.close()  # Closing twice is harmless
+
+
+def test_restart_reads_from_the_start(events):
+    stream = _stream(events)
+    stream.next_sample(12)
+    stream.restart()
+
+    assert stream.sample_idx == 0
+    assert _read_all(stream) == list(range(100, 100 + N_ROWS))
+    stream.close()
+
+
+def _row_offsets(filepath):
+    """Byte offsets of the rows of an events file (of its decompressed data), followed by its size."""
+    with (gzip.open(filepath) if filepath.endswith('.gz') else open(filepath, 'rb')) as file:
+        lines = file.readlines()
+    return np.cumsum([len(line) for line in lines]).tolist()  # The first line is the header
+
+
+@pytest.mark.parametrize('sample_idx', [0, 1, 6, 7, 13, 49])
+def test_seek_moves_to_the_byte_offset_of_the_row(events, sample_idx):
+    stream = _stream(events)
+    stream.seek(sample_idx)
+
+    assert stream._start == _row_offsets(events)[sample_idx]
+    assert stream.sample_idx == sample_idx
+    assert _read_all(stream) == list(range(100 + sample_idx, 100 + N_ROWS))
+    stream.close()
+
+
+def test_seek_past_the_end(events):
+    stream = _stream(events)
+    stream.seek(N_ROWS + 10)
+
+    assert stream._start == _row_offsets(events)[N_ROWS]
+    assert not stream.has_more_samples()
+    assert stream.sample_idx == N_ROWS
+    stream.close()
+
+
+@pytest.mark.parametrize('timestamp, sample_idx', [(0, 0), (1000, 0), (1001, 2), (1010, 2), (1125, 26),
+                                                   (1240, 48), (1241, N_ROWS), (5000, N_ROWS)])
+def test_seek_time_moves_to_the_first_row_at_or_after_the_timestamp(events, timestamp, sample_idx):
+    stream = _stream(events)
+    stream.seek_time(timestamp, time_column_index=1)
+
+    assert stream._start == _row_offsets(events)[sample_idx]
+    assert stream.sample_idx == sample_idx
+    assert _read_all(stream) == list(range(100 + sample_idx, 100 + N_ROWS))
+    stream.close()
+
+
+def test_seek_time_in_a_file_with_a_single_row(tmp_path):
+    filepath = _write_events(tmp_path / 'single.csv', [1000])
+    for timestamp, sample_idx in [(999, 0), (1000, 0), (1001, 1)]:
+        stream = _stream(filepath)
+        stream.seek_time(timestamp, time_column_index=1)
+        assert stream.sample_idx == sample_idx
+        stream.close()
@@ -0,0 +1,55 @@
+import numpy as np
+
+from utils.data_structures import RingInstanceWindow, SessionStore
+
+
+def test_vectors_keep_the_items_of_each_session_in_order():
+    store = SessionStore(initial_capacity=2)
+    for session, item in [(1, 10), (2, 20), (1, 11), (1, 12), (2, 21), (1, 13)]:
+        store.append(session, item)
+
+    np.testing.assert_array_equal(store.get_vector(1), [10, 11, 12, 13])
+    np.testing.assert_array_equal(store.get_vector(2), [20, 21])
+    assert len(store.get_vector(3)) == 0
+    assert 1 in store and 3 not in store
+    assert len(store) == 2
+
+
+def test_removing_items_shrinks_and_forgets_sessions():
+    store = SessionStore()
+    for item in range(3):
+        store.append(1, item)
+    store.append(2, 5)
+
+    store.remove_oldest(1)
+    np.testing.assert_array_equal(store.get_vector(1), [1, 2])
+    store.forget(None, 2, 5)
+    assert 2 not in store
+    store.remove_oldest(1)
+    store.remove_oldest(1)
+    assert 1 not in store and len(store) == 0
+    store.remove_oldest(1)  # Unknown sessions are ignored
+
+
+def test_space_of_removed_items_is_reused():
+    store = SessionStore(initial_capacity=4)
+    for item in range(100):
+        store.append(1, item)
+        if item >= 2:
+            store.remove_oldest(1)
+
+    np.testing.assert_array_equal(store.get_vector(1), [98, 99])
+    assert len(store._sessions[1][0]) == 4
+
+
+def test_store_follows_the_window_evictions():
+    window = RingInstanceWindow(max_size=3, index_column=0, columns=[0])
+    store = SessionStore()
+    window.subscribe(store.forget)
+    for session, item in [(1, 10), (2, 20), (1, 11), (2, 21), (1, 12)]:
+        window.add_element(np.array([[session]]), np.array([item]))
+        store.append(session, item)
+
+    for session in [1, 2]:
+        expected = window.get_slice(session, feature_index=0)[1].ravel()
+        np.testing.assert_array_equal(store.get_vector(session), expected)
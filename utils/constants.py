@@ -20,6 +20,8 @@ GMEAN = 'gmean'
 PRECISION = 'precision'
 RECALL = 'recall'
 MRR = 'mrr'
+HIT_RATE = 'hitrate'
+NDCG = 'ndcg'
 
 PLOT_TYPES = [ACCURACY,
               KAPPA,
@@ -38,6 +40,8 @@ PLOT_TYPES = [ACCURACY,
               PRECISION,
               RECALL,
               MRR,
+              HIT_RATE,
+              NDCG,
               F1_SCORE,
               GMEAN,
 
@@ -54,9 +58,17 @@ CLASSIFICATION_METRICS = [ACCURACY,
                           GMEAN,
                           F1_SCORE,
                           MRR,
+                          HIT_RATE,
+                          NDCG,
                           DATA_POINTS,
                           RUNNING_TIME,
                           MODEL_SIZE]
+RANKING_METRICS = [HIT_RATE,  # Also computed at the cutoffs of the evaluator
+                   RECALL,
+                   PRECISION,
+                   F1_SCORE,
+                   MRR,
+                   NDCG]
 REGRESSION_METRICS = [MSE,
                       MAE,
                       TRUE_VS_PREDICTED,
@@ -87,6 +99,14 @@ TASK_TYPES = [CLASSIFICATION,
               MULTI_TARGET_CLASSIFICATION,
               MULTI_TARGET_REGRESSION,
               UNDEFINED]
+SEGMENT_POSITION = 'position'
+SEGMENT_SESSION_LENGTH = 'session_length'
+SEGMENT_EVENT_TYPE = 'event_type'
+SEGMENT_POPULARITY = 'popularity'
+SEGMENTS = [SEGMENT_POSITION,
+            SEGMENT_SESSION_LENGTH,
+            SEGMENT_EVENT_TYPE,
+            SEGMENT_POPULARITY]
 MEAN = 'mean'
 CURRENT = 'current'
 Y_TRUE = 'y_true'
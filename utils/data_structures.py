@@ -1,4 +1,6 @@
 import numpy as np
+from collections import defaultdict
+from collections import deque
 from scipy.sparse import lil_matrix
 
 np.set_printoptions(suppress=True)
@@ -339,6 +341,242 @@ class FastComplexBuffer(object):
                + ' - width: ' + str(self.width)
 
 
+class WindowAccumulator(object):
+    """ WindowAccumulator
+
+    Keeps the last `max_size` rows of numeric values (e.g. the hit flag and the
+    reciprocal rank of each recommendation) in a preallocated circular buffer,
+    along with the running sum of each column. Adding a row and reading the
+    sums are O(1) operations, and memory only depends on the window size.
+
+    Since subtracting the evicted values accumulates floating-point errors,
+    the sums are recomputed from the buffer once every `max_size` evictions
+    (amortized O(1) per row).
+
+    Parameters
+    ----------
+    max_size: int
+        The number of rows kept in the window.
+
+    width: int (Default: 1)
+        The number of values per row.
+
+    Examples
+    --------
+    >>> window = WindowAccumulator(2, width=2)
+    >>> for hit, rrank in [(1, 0.5), (0, 0.0), (1, 1.0)]:
+    ...     window.add_element([hit, rrank])
+    >>> window.get_sums()
+    array([1., 1.])
+
+    """
+
+    def __init__(self, max_size, width=1):
+        super().__init__()
+        self.max_size = max_size
+        self.width = width
+        self._values = np.zeros((max_size, width))
+        self._sums = np.zeros(width)
+        self._head = 0  # Buffer position of the oldest row
+        self._n_rows = 0
+        self._n_evictions = 0  # Since the sums were last recomputed
+
+    def add_element(self, values):
+        """ add_element
+
+        Adds a row of values to the window, evicting the oldest row if the window is full.
+
+        Parameters
+        ----------
+        values: list or numpy.ndarray
+            The `width` values of the row.
+
+        """
+        if self._n_rows < self.max_size:
+            position = (self._head + self._n_rows) % self.max_size
+            self._n_rows += 1
+        else:
+            position = self._head
+            self._head = (self._head + 1) % self.max_size
+            self._sums -= self._values[position]
+            self._n_evictions += 1
+        self._values[position] = values
+        if self._n_evictions >= self.max_size:
+            self._sums = self._values.sum(axis=0)
+            self._n_evictions = 0
+        else:
+            self._sums += self._values[position]
+
+    def add_elements(self, rows):
+        """ add_elements
+
+        Adds several rows of values to the window at once, evicting the oldest rows as needed.
+
+        Parameters
+        ----------
+        rows: numpy.ndarray of shape (n_rows, width)
+            The rows, from the oldest to the newest.
+
+        """
+        n_new = len(rows)
+        if n_new >= self.max_size:  # Only the last rows remain
+            self._values[:] = rows[n_new - self.max_size:]
+            self._head, self._n_rows, self._n_evictions = 0, self.max_size, 0
+            self._sums = self._values.sum(axis=0)
+            return
+        positions = (self._head + self._n_rows + np.arange(n_new)) % self.max_size
+        n_evicted = max(self._n_rows + n_new - self.max_size, 0)  # The last rows overwrite the oldest ones
+        if n_evicted > 0:
+            self._sums -= self._values[positions[n_new - n_evicted:]].sum(axis=0)
+            self._head = (self._head + n_evicted) % self.max_size
+            self._n_evictions += n_evicted
+        self._n_rows += n_new - n_evicted
+        self._values[positions] = rows
+        if self._n_evictions >= self.max_size:
+            self._sums = self._values.sum(axis=0)
+            self._n_evictions = 0
+        else:
+            self._sums += rows.sum(axis=0)
+
+    def get_sums(self):
+        """ Returns the sum of each column over the rows of the window. """
+        return self._sums
+
+    def get_sum(self, column=0):
+        """ Returns the sum of a column over the rows of the window. """
+        return self._sums[column]
+
+    def get_current_size(self):
+        return self._n_rows
+
+    def is_full(self):
+        return self._n_rows == self.max_size
+
+    def clear(self):
+        self._values[:] = 0
+        self._sums[:] = 0
+        self._head = 0
+        self._n_rows = 0
+        self._n_evictions = 0
+
+    def get_info(self):
+        return 'WindowAccumulator: max_size: ' + str(self.max_size) \
+               + ' - current_size: ' + str(self._n_rows) \
+               + ' - width: ' + str(self.width)
+
+
+class GroupedAccumulator(object):
+    """ GroupedAccumulator
+
+    Keeps the running sum of each column of rows of numeric values (e.g. the hit
+    flag and the reciprocal rank of each recommendation), grouped by an integer
+    group id (e.g. a segment of the events), along with the number of rows of each
+    group. The sums are kept in preallocated arrays, which double in size when a
+    larger group id arrives, so that adding a row is an amortized O(1) operation
+    and memory only depends on the number of groups.
+
+    Parameters
+    ----------
+    width: int (Default: 1)
+        The number of values per row.
+
+    n_groups: int (Default: 16)
+        The initial number of groups of the arrays.
+
+    Examples
+    --------
+    >>> groups = GroupedAccumulator(width=2)
+    >>> for group, hit, rrank in [(0, 1, 0.5), (2, 0, 0.0), (0, 1, 1.0)]:
+    ...     groups.add_element(group, [hit, rrank])
+    >>> groups.get_sums()
+    array([[2. , 1.5],
+           [0. , 0. ],
+           [0. , 0. ]])
+    >>> groups.get_counts()
+    array([2, 0, 1])
+
+    """
+
+    def __init__(self, width=1, n_groups=16):
+        super().__init__()
+        self.width = width
+        self._sums = np.zeros((n_groups, width))
+        self._counts = np.zeros(n_groups, dtype=np.int64)
+        self._n_groups = 0  # Highest group id added, plus one
+
+    def add_element(self, group, values, count=1):
+        """ add_element
+
+        Adds a row of values to a group.
+
+        Parameters
+        ----------
+        group: int
+            The (non-negative) group id.
+
+        values: list or numpy.ndarray
+            The `width` values of the row.
+
+        count: int (Default: 1)
+            The number of rows the values stand for (e.g. if they are the sums of several rows).
+
+        """
+        if group >= self._n_groups:
+            self._reserve(group + 1)
+        self._sums[group] += values
+        self._counts[group] += count
+
+    def add_elements(self, groups, rows):
+        """ add_elements
+
+        Adds several rows of values at once, to their respective groups.
+
+        Parameters
+        ----------
+        groups: numpy.ndarray of shape (n_rows,)
+            The (non-negative) group id of each row.
+
+        rows: numpy.ndarray of shape (n_rows, width)
+            The rows.
+
+        """
+        if len(groups) == 0:
+            return
+        groups = np.asarray(groups, dtype=np.int64)
+        self._reserve(groups.max() + 1)
+        n_groups = len(self._counts)
+        for column in range(self.width):
+            self._sums[:, column] += np.bincount(groups, weights=rows[:, column], minlength=n_groups)
+        self._counts += np.bincount(groups, minlength=n_groups)
+
+    def _reserve(self, n_groups):
+        self._n_groups = max(self._n_groups, n_groups)
+        if n_groups > len(self._counts):
+            capacity = max(n_groups, 2 * len(self._counts))
+            self._sums = np.concatenate((self._sums, np.zeros((capacity - len(self._counts), self.width))))
+            self._counts = np.concatenate((self._counts, np.zeros(capacity - len(self._counts), dtype=np.int64)))
+
+    def get_sums(self):
+        """ Returns the sum of each column of each group, as an array of shape (n_groups, width). """
+        return self._sums[:self._n_groups]
+
+    def get_counts(self):
+        """ Returns the number of rows of each group. """
+        return self._counts[:self._n_groups]
+
+    def get_n_groups(self):
+        return self._n_groups
+
+    def clear(self):
+        self._sums[:] = 0
+        self._counts[:] = 0
+        self._n_groups = 0
+
+    def get_info(self):
+        return 'GroupedAccumulator: n_groups: ' + str(self._n_groups) \
+               + ' - width: ' + str(self.width)
+
+
 class ConfusionMatrix(object):
     """ ConfusionMatrix
 
@@ -425,17 +663,17 @@ class ConfusionMatrix(object):
 
         else:
             m, n = self.confusion_matrix.shape
-            if (i <= m) and (i >= 0) and (j <= n) and (j >= 0):
+            if (i < m) and (i >= 0) and (j < n) and (j >= 0):
                 return self._update(i, j, weight)
 
-            else:
-                max_value = np.max(i, j)
-                if max_value > m + 1:
-                    return False
+            elif (i < 0) or (j < 0):
+                return False
 
-                else:
-                    self.reshape(max_value, max_value)
-                    return self._update(i, j, weight)
+            else:
+                # Grow with amortized doubling (labels may be added to an open catalog)
+                size = max(i + 1, j + 1, 2 * m)
+                self.reshape(size, size)
+                return self._update(i, j, weight)
 
     def remove(self, i=None, j=None):
         """ remove
@@ -465,7 +703,7 @@ class ConfusionMatrix(object):
             return False
 
         m, n = self.confusion_matrix.shape
-        if (i <= m) and (i >= 0) and (j <= n) and (j >= 0):
+        if (i < m) and (i >= 0) and (j < n) and (j >= 0):
             return self._remove(i, j)
 
         else:
@@ -481,13 +719,8 @@ class ConfusionMatrix(object):
 
         if (m != n) or (m < i) or (n < j):
             return False
-        aux = self.confusion_matrix.copy()
-        # self.confusion_matrix = np.zeros((m, n), self.dtype)
-        self.confusion_matrix = lil_matrix((m, n), dtype=self.dtype)
-
-        for p in range(i):
-            for q in range(j):
-                self.confusion_matrix[p, q] = aux[p, q]
+        self.confusion_matrix.resize((m, n))
+        self.n_targets = m
 
         return True
 
@@ -1096,3 +1329,699 @@ class InstanceWindow(object):
                ' - n_samples: ' + str(self.n_samples) + \
                ' - max_size: ' + str(self.max_size) + \
                ' - dtype: ' + str(self.dtype)
+
+
+class RingInstanceWindow(InstanceWindow):
+    """ RingInstanceWindow
+
+    An InstanceWindow backed by preallocated circular buffers. Adding a
+    sample and evicting the oldest one are O(1) operations, whereas the
+    InstanceWindow copies the whole buffer on every insertion.
+
+    Samples are stored column by column, each column with its own data type,
+    and only the projected columns are kept. Matrices returned by the window
+    keep the original layout of the samples, with NaN in the columns that are
+    not stored, so that column indices remain valid. Samples are always
+    returned in chronological order: the ordered matrices are rebuilt lazily
+    and cached until the window is modified. Single columns are returned as
+    views of the underlying storage as long as the buffer has not wrapped
+    around. In all cases, the returned arrays are only valid until the window
+    is modified.
+
+    Optionally, the window maintains a hash index from the values of one
+    feature column (typically the session identifier) to the buffer positions
+    holding them. The index is updated on every insertion and eviction, so that
+    slicing on that column costs time proportional to the size of the slice
+    rather than to the size of the window.
+
+    Models that keep statistics over the window can subscribe to evictions
+    instead of guessing which sample is about to leave it. Subscribers are
+    notified right after the new sample has been inserted, once per evicted
+    sample, with the evicted attributes, the value of the indexed column and
+    the encoded target. Before training models on a batch of samples and adding
+    them, make_room() evicts the samples that all but the last of them would
+    replace, so that each eviction is notified while the rest of the window
+    (e.g. the other samples of the same session) is in place.
+
+    Optionally, the window also evicts samples by age: when a sample is added,
+    all the samples older than `max_age` (measured on a time column, relative
+    to the new sample) are evicted at once, oldest first. Without a maximum
+    size, the circular buffer then grows with the traffic, by doubling.
+
+    Parameters
+    ----------
+    n_features: int
+        The total number of features to be expected.
+
+    n_targets: int
+        The total number of target tasks to be expected.
+
+    categorical_list: list
+        A list with the indexes from all the categorical attributes.
+
+    max_size: int
+        The window's maximum length (capacity of the circular buffer).
+        If None, the window has no maximum length (use max_age).
+
+    dtype: data type
+        A data type supported by numpy, by default it is a float.
+        Used for the stored feature columns that have no explicit data type.
+
+    index_column: int (Default: None)
+        The index of the feature column to build the hash index on. If None,
+        no index is maintained.
+
+    target_encoder: callable (Default: None)
+        Function mapping a target value to the item passed to subscribers.
+        If None, the raw target value is passed.
+
+    columns: dict or list (Default: None)
+        The feature columns to store, as a list of indices or as a dictionary
+        mapping indices to data types. If None, all feature columns are stored.
+        The values of the columns with an integer data type are checked when
+        added: a value out of the range of the type, or with a fractional part,
+        raises a ValueError instead of being silently truncated.
+
+    target_dtype: data type (Default: None)
+        The data type of the targets. If None, dtype is used.
+
+    max_age: float (Default: None)
+        The maximum age of the samples, in the units of the time column. If None,
+        samples are only evicted when the window is full.
+
+    time_column: int (Default: None)
+        The index of the feature column that contains the timestamps (in
+        ascending order). Required with max_age.
+
+    Raises
+    ------
+    ValueError: If at any moment, an instance with a different number of
+    attributes than that of the n_attributes parameter is passed, a ValueError
+    is raised.
+
+    """
+
+    _INITIAL_CAPACITY = 1024  # Of the buffers of a window without maximum length
+
+    def __init__(self, n_features=0, n_targets=1, categorical_list=None, max_size=1000, dtype=float,
+                 index_column=None, target_encoder=None, columns=None, target_dtype=None, max_age=None,
+                 time_column=None):
+        super().__init__(n_features=n_features, n_targets=n_targets, categorical_list=categorical_list,
+                         max_size=max_size, dtype=dtype)
+        if max_size is None and max_age is None:
+            raise ValueError('The window requires a maximum size or a maximum age.')
+        if max_age is not None and time_column is None:
+            raise ValueError('Evicting samples by age requires a time column.')
+        self.index_column = index_column
+        self.target_encoder = target_encoder
+        self.columns = columns
+        self.target_dtype = dtype if target_dtype is None else target_dtype
+        self.max_age = max_age
+        self.time_column = time_column
+        self._capacity = self._INITIAL_CAPACITY if max_size is None else max_size  # Length of the buffers
+        self._subscribers = []
+        self._head = 0  # Buffer position of the oldest sample
+        self._columns = {}  # Feature index -> column buffer
+        self._integer_bounds = {}  # Feature index -> numpy.iinfo, of the integer columns
+        self._targets = None
+        self._ordered = None  # Cached chronological attributes and targets matrices
+        self._index = defaultdict(deque)  # Indexed value -> buffer positions, in chronological order
+        if self._n_attributes > 0:
+            self._allocate()
+
+    def _allocate(self):
+        if self.columns is None:
+            dtypes = {i: self.dtype for i in range(self._n_attributes)}
+        elif isinstance(self.columns, dict):
+            dtypes = self.columns
+        else:
+            dtypes = {i: self.dtype for i in self.columns}
+        if any(i >= self._n_attributes for i in dtypes):
+            raise ValueError('Column index out of range for samples with {} attributes.'
+                             .format(self._n_attributes))
+        if self.index_column is not None and self.index_column not in dtypes:
+            raise ValueError('The indexed column {} is not stored in the window.'.format(self.index_column))
+        if self.time_column is not None and self.time_column not in dtypes:
+            raise ValueError('The time column {} is not stored in the window.'.format(self.time_column))
+        self._columns = {i: np.zeros(self._capacity, dtype=dtype) for i, dtype in sorted(dtypes.items())}
+        self._integer_bounds = {i: np.iinfo(column.dtype) for i, column in self._columns.items()
+                                if column.dtype.kind in 'iu'}
+        self._targets = np.zeros((self._capacity, self._n_target_tasks), dtype=self.target_dtype)
+        self._buffer = None
+        self._head = 0
+        self._ordered = None
+        self._index.clear()
+
+    def add_element(self, X, y):
+        """ add_element
+
+        Adds a sample to the instance window, overwriting the oldest sample
+        if the window is full. With a maximum age, the expired samples are
+        then evicted.
+
+        X: numpy.ndarray of shape (1, n_features)
+            Feature matrix of a single sample.
+
+        y: numpy.ndarray of shape (1, 1)
+            Labels matrix of a single sample.
+
+        Raises
+        ------
+        ValueError: If at any moment, an instance with a different number of
+        attributes than that of the n_attributes parameter is passed, a ValueError
+        is raised.
+
+        """
+        try:
+            y = y.reshape(1, 1)
+        except ValueError:
+            raise ValueError('y must be 1-dimensional')
+
+        if self._n_attributes != X.size or self._targets is None:
+            if self._n_samples == 0:
+                self._n_attributes = X.size
+                self._n_target_tasks = y.size
+                self._allocate()
+            else:
+                raise ValueError("Number of attributes in X is different from the objects buffer dimension. "
+                                 "Call __configure() to correctly set up the InstanceWindow")
+
+        X = X.ravel()
+        self._check_values(X)
+        evicted = None
+        if self._n_samples == self._capacity and self.max_size is None:
+            self._grow()
+        if self._n_samples < self._capacity:
+            position = (self._head + self._n_samples) % self._capacity
+            self._n_samples += 1
+        else:  # Overwrite the oldest sample
+            position = self._head
+            if self._subscribers:
+                evicted = self._evicted_sample(position)
+            self._unindex(position)
+            self._head = (self._head + 1) % self._capacity
+        for i, column in self._columns.items():
+            column[position] = X[i]
+        self._targets[position] = y.ravel()
+        if self.index_column is not None:
+            self._index[self._columns[self.index_column][position]].append(position)
+        self._ordered = None
+        if evicted is not None:
+            self._notify(*evicted)
+        if self.max_age is not None:
+            self._evict_expired(X[self.time_column] - self.max_age)
+
+    def delete_element(self):
+        """ delete_element
+
+        Delete the oldest element from the sample window.
+
+        """
+        if self._n_samples > 0:
+            evicted = self._evicted_sample(self._head) if self._subscribers else None
+            self._unindex(self._head)
+            self._n_samples -= 1
+            self._head = (self._head + 1) % self._capacity
+            self._ordered = None
+            if evicted is not None:
+                self._notify(*evicted)
+
+    def make_room(self, n_samples, time=None):
+        """ make_room
+
+        Evicts, oldest first, the samples that adding n_samples samples would
+        evict: with a maximum age, the samples older than max_age relative to
+        `time` (the timestamp of the last of the new samples), and then those
+        that exceed the maximum size.
+
+        Parameters
+        ----------
+        n_samples: int
+            The number of samples about to be added.
+
+        time: float (Default: None)
+            The timestamp of the last of the new samples (only used with a maximum age).
+
+        """
+        if self._n_samples == 0:
+            return
+        if self.max_age is not None and time is not None:
+            self._evict_expired(time - self.max_age)
+        if self.max_size is not None:
+            for _ in range(min(self._n_samples + n_samples - self.max_size, self._n_samples)):
+                self.delete_element()
+
+    def _evict_expired(self, min_time):
+        """Evicts all the samples older than min_time, oldest first (one notification per sample)."""
+        column = self._columns[self.time_column]
+        if self._n_samples == 0 or column[self._head] >= min_time:
+            return
+        n_expired = 0
+        for start, stop in self._segments():  # Timestamps are in ascending order: binary search
+            n_segment = np.searchsorted(column[start:stop], min_time)
+            n_expired += n_segment
+            if n_segment < stop - start:
+                break
+        for _ in range(n_expired):
+            self.delete_element()
+
+    def _grow(self):
+        """Doubles the capacity of the buffers, moving the samples to their start in chronological order."""
+        positions = np.concatenate([np.arange(start, stop) for start, stop in self._segments()])
+        self._capacity *= 2
+        for i, column in self._columns.items():
+            self._columns[i] = np.zeros(self._capacity, dtype=column.dtype)
+            self._columns[i][:self._n_samples] = column[positions]
+        targets = self._targets
+        self._targets = np.zeros((self._capacity, self._n_target_tasks), dtype=targets.dtype)
+        self._targets[:self._n_samples] = targets[positions]
+        self._head = 0
+        if self.index_column is not None:
+            new_positions = np.empty(len(positions), dtype=np.int64)  # Old buffer position -> new one
+            new_positions[positions] = np.arange(len(positions))
+            for value, value_positions in self._index.items():
+                self._index[value] = deque(new_positions[list(value_positions)].tolist())
+
+    def subscribe(self, callback):
+        """Registers a function to be called whenever a sample is evicted from the window.
+
+        Parameters
+        ----------
+        callback: callable
+            Function with signature callback(X, key, item), where X is the
+            evicted attributes vector, key the value of the indexed column
+            (None if the window is not indexed) and item the encoded target.
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Removes a function previously registered with subscribe()."""
+        self._subscribers.remove(callback)
+
+    def _check_values(self, X):
+        """Raises a ValueError if a value cannot be stored exactly in its integer column."""
+        for i, bounds in self._integer_bounds.items():
+            value = X[i]
+            if not bounds.min <= value <= bounds.max or value != int(value):
+                raise ValueError('Value {} of column {} cannot be stored as {}.'.format(value, i, bounds.dtype))
+
+    def _evicted_sample(self, position):
+        X, y = self._rows([position])
+        key = None if self.index_column is None else self._columns[self.index_column][position]
+        return X[0], key, y[0, 0]
+
+    def _notify(self, X, key, target):
+        item = target if self.target_encoder is None else self.target_encoder(target)
+        for callback in self._subscribers:
+            callback(X, key, item)
+
+    def _unindex(self, position):
+        """Removes the oldest buffer position from the index (FIFO order guarantees it is the first one)."""
+        if self.index_column is not None:
+            value = self._columns[self.index_column][position]
+            positions = self._index[value]
+            positions.popleft()
+            if len(positions) == 0:
+                del self._index[value]
+
+    def _segments(self):
+        """Returns the (start, stop) buffer ranges holding the samples, in chronological order."""
+        end = self._head + self._n_samples
+        if end <= self._capacity:
+            return [(self._head, end)]
+        return [(self._head, self._capacity), (0, end - self._capacity)]
+
+    def _rows(self, positions):
+        """Gathers the samples at the given buffer positions into attributes and targets matrices."""
+        X = np.full((len(positions), self._n_attributes), np.nan)
+        for i, column in self._columns.items():
+            X[:, i] = column[positions]
+        if self._targets is None:
+            return X, np.empty((0, self._n_target_tasks), dtype=self.target_dtype)
+        return X, self._targets[positions]
+
+    def _ordered_buffer(self):
+        if self._ordered is None:
+            positions = np.concatenate([np.arange(start, stop) for start, stop in self._segments()])
+            self._ordered = self._rows(positions)
+        return self._ordered
+
+    def get_attributes_matrix(self):
+        return self._ordered_buffer()[0]
+
+    def get_targets_matrix(self):
+        return self._ordered_buffer()[1]
+
+    def get_column(self, feature_index=None):
+        """Returns the values of a stored column, in chronological order.
+
+        Parameters
+        ----------
+        feature_index : int, optional (default=None)
+            Index of the feature column. If None, the target column is returned.
+
+        Raises
+        ------
+        KeyError
+            The column is not stored in the window.
+
+        Returns
+        -------
+        numpy.ndarray
+            The column values, with the data type of the column.
+        """
+        if self._targets is None:
+            return np.empty(0)
+        column = self._targets[:, 0] if feature_index is None else self._columns[feature_index]
+        segments = self._segments()
+        if len(segments) == 1:
+            start, stop = segments[0]
+            return column[start:stop]
+        return np.concatenate([column[start:stop] for start, stop in segments])
+
+    def get_slice(self, values, feature_index=None):
+        """Returns subset of the buffer with certain feature or target equal to value(s)
+
+        Notes
+        ----------
+        If the search is done on the indexed column for a single value, the
+        buffer positions are taken from the index. Otherwise, the stored column
+        is searched directly, so that the chronological buffer does not need
+        to be rebuilt.
+
+        Parameters
+        ----------
+        feature_index : int, optional (default=None)
+            Index of feature column to search in. If None, search will be done in target.
+        values : array or scalar
+            Value(s) to search for. Must be of the same type as target column.
+
+        Returns
+        -------
+        tuple
+            A tuple of filtered attributes X and targets Y
+        """
+        if feature_index is not None and feature_index == self.index_column and np.ndim(values) == 0:
+            return self._rows(list(self._index.get(values, ())))
+        if self._targets is None or (feature_index is not None and feature_index not in self._columns):
+            # Instance window is empty or wrong column_index
+            return np.empty((0, 0), dtype=float), np.empty((0, 0), dtype=float)
+        column = self._targets[:, 0] if feature_index is None else self._columns[feature_index]
+        ids = np.concatenate([start + np.flatnonzero(np.isin(column[start:stop], values))
+                              for start, stop in self._segments()])
+        return self._rows(ids)
+
+    def contains(self, value):
+        """Checks whether the indexed column currently holds the given value.
+
+        Parameters
+        ----------
+        value: scalar
+            Value to look up in the index.
+
+        Returns
+        -------
+        bool
+            True if at least one sample in the window has the given value.
+
+        Raises
+        ------
+        ValueError
+            The window does not maintain an index.
+        """
+        if self.index_column is None:
+            raise ValueError('The window does not maintain an index.')
+        return value in self._index
+
+    @property
+    def buffer(self):
+        X, y = self._ordered_buffer()
+        return np.concatenate((X, y), axis=1)
+
+
+class SessionStore(object):
+    """ SessionStore
+
+    Keeps, for every session present in the observation window, the vector
+    of indexed items consumed so far (in time order).
+
+    Each session vector lives in its own growable array, so that appending
+    an item costs amortized O(1) and reading the vector returns a view
+    without copying. When the observation window evicts an event, the oldest
+    item of its session is dropped in O(1), and sessions with no remaining
+    items are forgotten. Membership tests answer whether a session is known
+    in the window.
+
+    Parameters
+    ----------
+    initial_capacity: int (Default: 8)
+        The initial capacity of a session vector.
+
+    dtype: data type (Default: numpy.int32)
+        The data type of the item indices.
+
+    Notes
+    -----
+    Vectors returned by get_vector() are views, only valid until the store
+    is modified.
+
+    """
+
+    def __init__(self, initial_capacity=8, dtype=np.int32):
+        super().__init__()
+        self.initial_capacity = initial_capacity
+        self.dtype = dtype
+        self._sessions = {}  # Session -> [buffer, start, stop]
+
+    def append(self, session, item):
+        """ Appends an item to the vector of a session.
+
+        Parameters
+        ----------
+        session: scalar
+            The session identifier.
+
+        item: int
+            The index of the item.
+
+        """
+        try:
+            entry = self._sessions[session]
+        except KeyError:
+            entry = [np.empty(self.initial_capacity, dtype=self.dtype), 0, 0]
+            self._sessions[session] = entry
+        buffer, start, stop = entry
+        if stop == len(buffer):
+            size = stop - start
+            if size > len(buffer) // 2:  # Grow
+                new_buffer = np.empty(2 * len(buffer), dtype=self.dtype)
+                new_buffer[:size] = buffer[start:stop]
+                entry[0] = buffer = new_buffer
+            else:  # Reclaim the space left by evicted items
+                buffer[:size] = buffer[start:stop]
+            entry[1], stop = 0, size
+        buffer[stop] = item
+        entry[2] = stop + 1
+
+    def remove_oldest(self, session):
+        """ Removes the oldest item from the vector of a session.
+
+        Parameters
+        ----------
+        session: scalar
+            The session identifier.
+
+        """
+        entry = self._sessions.get(session)
+        if entry is not None:
+            entry[1] += 1
+            if entry[1] == entry[2]:
+                del self._sessions[session]
+
+    def forget(self, X, session, item):
+        """ Eviction callback, to be registered with RingInstanceWindow.subscribe(). """
+        self.remove_oldest(session)
+
+    def get_vector(self, session):
+        """ Returns the vector of item indices of a session.
+
+        Parameters
+        ----------
+        session: scalar
+            The session identifier.
+
+        Returns
+        -------
+        numpy.ndarray
+            The item indices of the session, in time order (empty for unknown sessions).
+
+        """
+        entry = self._sessions.get(session)
+        if entry is None:
+            return np.empty(0, dtype=self.dtype)
+        return entry[0][entry[1]:entry[2]]
+
+    def clear(self):
+        self._sessions.clear()
+
+    def __contains__(self, session):
+        return session in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get_info(self):
+        return 'SessionStore: n_sessions: ' + str(len(self)) + \
+               ' - dtype: ' + str(self.dtype)
+
+
+class ItemDictionary(object):
+    """ ItemDictionary
+
+    Maps the item identifiers found in a stream to dense integer indices
+    (0 to n_items - 1), and back.
+
+    Items are encoded once, when they are read from the stream, so that
+    recommenders can work on indices only: the index of an item is its
+    position in the per-item arrays and matrices kept by the models.
+
+    The catalog is either closed, i.e. built from the items known up front,
+    or open, in which case items get an index the first time they are seen
+    and the dictionary grows with the stream.
+
+    Parameters
+    ----------
+    items: array-like (Default: None)
+        The item identifiers known up front. Duplicates are ignored, and indices
+        are assigned in the sorted order of the identifiers.
+
+    allow_new: bool (Default: False)
+        Whether unknown items get a new index when encoded (open catalog).
+        Otherwise, encoding an unknown item raises a KeyError.
+
+    dtype: data type (Default: numpy.int32)
+        The data type of the item indices.
+
+    Notes
+    -----
+    Lookups are vectorized binary searches over the sorted item identifiers.
+    In an open catalog, new items are first kept in a hash map, which is merged
+    into the sorted arrays once it gets large enough, so that adding an item
+    costs amortized O(log n).
+
+    Examples
+    --------
+    >>> items = ItemDictionary([30, 10, 20, 10])
+    >>> items.encode([10, 30])
+    array([0, 2], dtype=int32)
+    >>> items.decode([2, 1])
+    array([30, 20])
+    >>> items = ItemDictionary(allow_new=True)
+    >>> items.encode([30, 10, 30])
+    array([0, 1, 0], dtype=int32)
+
+    """
+
+    _MIN_MERGE_SIZE = 1024
+
+    def __init__(self, items=None, allow_new=False, dtype=np.int32):
+        super().__init__()
+        self.allow_new = allow_new
+        self.dtype = dtype
+        self._items = None if items is None else np.unique(items)  # Index -> item (grows by doubling)
+        if self._items is not None and self._items.dtype.kind in 'US':
+            self._items = self._items.astype(object)  # Fixed-width strings would truncate new items
+        self._n_items = 0 if items is None else len(self._items)
+        self._keys = self.items  # Sorted items
+        self._codes = np.arange(self._n_items, dtype=self.dtype)  # Indices of the sorted items
+        self._recent = {}  # Items added since the last merge -> index
+
+    @property
+    def items(self):
+        """ The item identifiers, ordered by index. """
+        if self._items is None:
+            return np.empty(0)
+        return self._items[:self._n_items]
+
+    def encode(self, y):
+        """ Returns the indices of the given items.
+
+        Parameters
+        ----------
+        y: array-like
+            The item identifiers.
+
+        Raises
+        ------
+        KeyError: If any of the items is unknown and the catalog is closed.
+
+        Returns
+        -------
+        numpy.ndarray
+            The indices of the items, with the same shape as y.
+
+        """
+        y = np.asarray(y)
+        codes = np.empty(y.shape, dtype=self.dtype)
+        if len(self._keys) > 0:
+            positions = np.searchsorted(self._keys, y)
+            positions[positions == len(self._keys)] = 0
+            found = self._keys[positions] == y
+            codes[found] = self._codes[positions[found]]
+        else:
+            found = np.zeros(y.shape, dtype=bool)
+        if not np.all(found):
+            codes[~found] = self._encode_missing(y[~found])
+        return codes
+
+    def _encode_missing(self, y):
+        codes = np.empty(len(y), dtype=self.dtype)
+        for i, item in enumerate(y):
+            code = self._recent.get(item)
+            if code is None:
+                if not self.allow_new:
+                    raise KeyError('Unknown item(s): {}'.format(np.unique(y[i:])))
+                code = self._add(item)
+            codes[i] = code
+        if len(self._recent) > max(self._MIN_MERGE_SIZE, len(self._keys) // 4):
+            self._merge()
+        return codes
+
+    def _add(self, item):
+        if self._items is None:
+            dtype = np.asarray(item).dtype
+            self._items = np.empty(self._MIN_MERGE_SIZE, dtype=object if dtype.kind in 'US' else dtype)
+        elif self._n_items == len(self._items):
+            items = np.empty(2 * len(self._items), dtype=self._items.dtype)
+            items[:self._n_items] = self._items
+            self._items = items
+        code = self._n_items
+        self._items[code] = item
+        self._n_items += 1
+        self._recent[item] = code
+        return code
+
+    def _merge(self):
+        """ Rebuilds the sorted lookup arrays to include the recently added items. """
+        order = np.argsort(self.items, kind='mergesort')
+        self._keys = self.items[order]
+        self._codes = order.astype(self.dtype)
+        self._recent.clear()
+
+    def decode(self, indices):
+        """ Returns the item identifiers of the given indices. """
+        return self.items[indices]
+
+    def __contains__(self, item):
+        if item in self._recent:
+            return True
+        position = np.searchsorted(self._keys, item)
+        return position < len(self._keys) and self._keys[position] == item
+
+    def __len__(self):
+        return self._n_items
+
+    def get_info(self):
+        return 'ItemDictionary: n_items: ' + str(len(self)) + \
+               ' - allow_new: ' + str(self.allow_new) + \
+               ' - dtype: ' + str(self.dtype)
@@ -1,37 +1,89 @@
-class SharedData:
-    """Holds useful shared data to be used by recommenders and some other classes.
+import threading
+
+_local = threading.local()
+
+
+class EvaluationContext:
+    """Holds useful shared data of one evaluation, to be used by recommenders and some other classes.
 
     Notes
     -----
-    Initialized by the evaluator (some of the variables are passed as arguments).
-    None of the variables should be set directly in this file.
+    Created and initialized by the evaluator (some of the variables are passed as arguments), and passed to the
+    recommenders through their configure() method. None of the variables should be set by the recommenders.
+    Each evaluation has its own context, so several evaluations can run in the same process.
     """
 
-    # =============================================================================
-    # Variables set by the user during evaluator instantiation
-    # =============================================================================
+    def __init__(self, sid=None, tid=None, eid=None, allow_reminders=True, allow_repeated=True, rec_size=10,
+                 window=None, display_size=None):
+        # =============================================================================
+        # Variables set by the user during evaluator instantiation
+        # =============================================================================
+
+        # Column identifiers in input data
+        self.sid = sid  # Session column index (session_column_index parameter in EvaluatePrequential)
+        self.tid = tid  # Timestamp column index (time_column_index parameter in EvaluatePrequential)
+        self.eid = eid  # Event type column index (event_column_index parameter in EvaluatePrequential)
+
+        # Whether to allow reminders and repeated recommendations
+        self.allow_reminders = allow_reminders  # allow_reminders parameter in EvaluatePrequential
+        self.allow_repeated = allow_repeated  # allow_repeated parameter in EvaluatePrequential
+
+        # Recommendation size: length of the lists returned by the models (the largest of the rec_size and cutoffs
+        # parameters in EvaluatePrequential), and number of their first items shown to the user (rec_size parameter),
+        # which are the ones tracked as recommended when repeated recommendations are not allowed
+        self.rec_size = rec_size
+        self.display_size = rec_size if display_size is None else display_size
+
+        # Sliding window of observations
+        self.window = window  # n_keep parameter in EvaluatePrequential
+
+        # =============================================================================
+        # Variables set automatically by the evaluator
+        # =============================================================================
+
+        # Dictionary mapping the items (labels) found in the input data to dense indices
+        self.items = None
+
+        # Array of all unique classes (labels) found in the input data, ordered by index (None for open catalogs)
+        self.classes = None
 
-    # Column identifiers in input data
-    sid = None  # Session column index (session_column_index parameter in EvaluatePrequential)
-    tid = None  # Timestamp column index (time_column_index parameter in EvaluatePrequential)
-    eid = None  # Event type column index (event_column_index parameter in EvaluatePrequential)
+        # Vector of indexed items (in time order) seen so far in the current session
+        self.session_vector = None
 
-    # Whether to allow reminders and repeated recommendations
-    allow_reminders = True  # allow_reminders parameter in EvaluatePrequential
-    allow_repeated = True  # allow_repeated parameter in EvaluatePrequential
+        # Session vectors of the rows passed to predict() and partial_fit() (a single one, unless the model supports
+        # batches, see batch_size parameter in EvaluatePrequential)
+        self.session_vectors = None
 
-    # Recommendation size
-    rec_size = 10  # rec_size parameter in EvaluatePrequential
+    def activate(self):
+        """Makes this context the one accessed through SharedData in the current thread."""
+        _local.context = self
+        return self
 
-    # Sliding window of observations
-    window = None  # n_keep parameter in EvaluatePrequential
 
-    # =============================================================================
-    # Variables set automatically by the evaluator
-    # =============================================================================
+_default_context = EvaluationContext()
 
-    # Array of all unique classes (labels) found in the input data
-    classes = None
 
-    # Vector of indexed items (in time order) seen so far in the current session
-    session_vector = None
+class _SharedDataType(type):
+    """Redirects the variables of SharedData to the context activated in the current thread."""
+
+    def __getattr__(cls, name):
+        return getattr(cls.current(), name)
+
+    def __setattr__(cls, name, value):
+        setattr(cls.current(), name, value)
+
+
+class SharedData(metaclass=_SharedDataType):
+    """Compatibility access to the shared data of the evaluation running in the current thread.
+
+    Notes
+    -----
+    Reading or setting a variable (e.g. SharedData.rec_size) reads or sets it in the EvaluationContext
+    activated by the evaluator in the current thread (or in a default context, if none was activated).
+    Recommenders should rather use the context passed to their configure() method.
+    """
+
+    @staticmethod
+    def current():
+        """Returns the context activated in the current thread."""
+        return getattr(_local, 'context', _default_context)
@@ -38,6 +38,10 @@ class EvaluationVisualizer(BaseListener):
     
     n_models: int
         The number of models to compare.
+
+    rec_size: int (Default: None)
+        The size of the recommendation lists, shown in the titles of the ranking metrics.
+        If None, the rec_size of the shared data.
     
     Raises
     ------
@@ -53,7 +57,7 @@ class EvaluationVisualizer(BaseListener):
     
     """
 
-    def __init__(self, task_type, n_wait, dataset_name, metrics, n_models, model_names, data_dict):
+    def __init__(self, task_type, n_wait, dataset_name, metrics, n_models, model_names, data_dict, rec_size=None):
         super().__init__()
 
         # Default values
@@ -67,6 +71,7 @@ class EvaluationVisualizer(BaseListener):
         # Configuration
         self.data_dict = data_dict
         self.n_wait = n_wait
+        self.rec_size = rec_size
         self.dataset_name = dataset_name
         self.n_models = n_models
 
@@ -281,7 +286,7 @@ class EvaluationVisualizer(BaseListener):
                         handle.append(line_obj[i])
                 self._set_fig_legend(handle)
 
-                N = Data.rec_size
+                N = Data.rec_size if self.rec_size is None else self.rec_size
 
                 if metric_id == constants.ACCURACY:
                     plot_tracker.sub_plot_obj.set_title('Accuracy')
@@ -295,6 +300,12 @@ class EvaluationVisualizer(BaseListener):
                 elif metric_id == constants.MRR:
                     plot_tracker.sub_plot_obj.set_title(f'MRR@{N}')
                     plot_tracker.sub_plot_obj.set_ylabel(f'MRR@{N}')
+                elif metric_id == constants.HIT_RATE:
+                    plot_tracker.sub_plot_obj.set_title(f'HitRate@{N}')
+                    plot_tracker.sub_plot_obj.set_ylabel(f'hitrate@{N}')
+                elif metric_id == constants.NDCG:
+                    plot_tracker.sub_plot_obj.set_title(f'NDCG@{N}')
+                    plot_tracker.sub_plot_obj.set_ylabel(f'NDCG@{N}')
                 elif metric_id == constants.F1_SCORE:
                     plot_tracker.sub_plot_obj.set_title(f'F1@{N}')
                     plot_tracker.sub_plot_obj.set_ylabel(f'F1@{N}')